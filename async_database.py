@@ -0,0 +1,60 @@
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from database import Database
+from metrics import DB_LATENCY
+from profiling import PROFILER
+
+
+class AsyncDatabase:
+    """
+    Асинхронный фасад над Database.
+    Все запросы выполняются в отдельном потоке базы данных, поэтому
+    медленные записи и ожидание блокировок не останавливают цикл событий бота.
+    Любой публичный метод Database доступен как корутина:
+
+        post = await db.get_content_by_message_id(message_id)
+    """
+
+    def __init__(self, db: Optional[Database] = None, db_path: str = "content_bot.db"):
+        # Один поток: SQLite всё равно сериализует запись, а соединение
+        # этого потока переиспользуется для всех запросов
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db")
+        if db is None:
+            db = self._executor.submit(Database, db_path).result()
+        self.db = db
+        self._methods = {}
+
+    def __getattr__(self, name: str):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        attr = getattr(self.db, name)
+        if not callable(attr):
+            return attr
+
+        method = self._methods.get(name)
+        if method is None:
+            @functools.wraps(attr)
+            async def method(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    # При включённом профилировании вызов профилируется в потоке базы
+                    return await self.run(PROFILER.call, f'db.{name}', attr, *args, **kwargs)
+                finally:
+                    DB_LATENCY.observe(time.perf_counter() - start, name)
+            self._methods[name] = method
+        return method
+
+    async def run(self, func, *args, **kwargs):
+        """Выполнение произвольной функции в потоке базы данных"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def close(self):
+        """Закрытие соединений и остановка потока базы данных"""
+        await self.run(self.db.close)
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Микробенчмарк категоризации по ключевым словам.
+Сравнивает прежний подход (отдельное регулярное выражение на каждое
+ключевое слово) с единым предкомпилированным выражением ContentAnalyzer.
+
+Запуск: python bench_analyzer.py [--posts 5000]
+"""
+
+import argparse
+import random
+import re
+import time
+
+from config import CATEGORY_KEYWORDS, CATEGORY_HASHTAGS
+from content_analyzer import ContentAnalyzer
+
+FILLER_WORDS = [
+    'сегодня', 'было', 'очень', 'круто', 'зал', 'утром', 'друзья', 'смотрите', 'видео', 'новый',
+    'неделя', 'спина', 'ноги', 'руки', 'пресс', 'кардио', 'отдых', 'сон', 'вода', 'белок',
+    'держим', 'темп', 'минут', 'раз', 'кг', 'на', 'и', 'в', 'с', 'по', 'не', 'это', 'мы', 'вы',
+]
+
+
+def legacy_categorize_by_keywords(category_keywords: dict, text: str) -> str:
+    """Прежняя реализация: регулярное выражение на каждое ключевое слово"""
+    category_scores = {}
+
+    for category, keywords in category_keywords.items():
+        score = 0
+        for keyword in keywords:
+            pattern = r'\b' + re.escape(keyword) + r'\b'
+            matches = re.findall(pattern, text)
+            score += len(matches)
+
+        if score > 0:
+            category_scores[category] = score
+
+    if category_scores:
+        return max(category_scores, key=category_scores.get)
+
+    return None
+
+
+def make_corpus(count: int, seed: int = 42) -> list:
+    """Синтетические посты реального размера (300–1500 символов)"""
+    rnd = random.Random(seed)
+    keywords = [keyword for words in CATEGORY_KEYWORDS.values() for keyword in words]
+    hashtags = [hashtag for tags in CATEGORY_HASHTAGS.values() for hashtag in tags]
+    corpus = []
+    for _ in range(count):
+        words = []
+        target = rnd.randint(300, 1500)
+        length = 0
+        while length < target:
+            word = rnd.choice(keywords) if rnd.random() < 0.08 else rnd.choice(FILLER_WORDS)
+            words.append(word)
+            length += len(word) + 1
+        if rnd.random() < 0.3:
+            words.append(rnd.choice(hashtags))
+        corpus.append(' '.join(words))
+    return corpus
+
+
+def run(posts: int = 5000) -> dict:
+    """Замер постов в секунду для обеих реализаций"""
+    analyzer = ContentAnalyzer()
+    corpus = [text.lower() for text in make_corpus(posts)]
+
+    start = time.perf_counter()
+    legacy = [legacy_categorize_by_keywords(analyzer.category_keywords, text) for text in corpus]
+    legacy_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    current = [analyzer._categorize_by_keywords(text) for text in corpus]
+    current_elapsed = time.perf_counter() - start
+
+    assert legacy == current, "Результаты категоризации различаются"
+
+    return {
+        'legacy_posts_per_sec': posts / legacy_elapsed,
+        'compiled_posts_per_sec': posts / current_elapsed,
+        'speedup': legacy_elapsed / current_elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк категоризации по ключевым словам')
+    parser.add_argument('--posts', type=int, default=5000, help='количество постов в корпусе')
+    args = parser.parse_args()
+
+    print(f"📊 Бенчмарк ContentAnalyzer: {args.posts} постов")
+    results = run(args.posts)
+    print(f"   прежний способ:      {results['legacy_posts_per_sec']:10.1f} постов/с")
+    print(f"   единое выражение:    {results['compiled_posts_per_sec']:10.1f} постов/с")
+    print(f"   ускорение:           {results['speedup']:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк слоя базы данных: вставки и выборки на базе из 100k постов.
+Сравнивает старый режим (новое соединение на каждый вызов) с
+долгоживущими соединениями Database, поштучную запись постов
+с медиафайлами (add_content + add_media_to_post) с пакетной upsert_posts
+и прежнюю выборку постов с медиафайлами (JOIN с LIMIT limit * 10) с двухфазной
+и с её результатом из кэша чтения.
+
+Запуск: python bench_database.py [--posts 100000] [--ops 2000] [--bulk 5000] [--albums 2000]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from database import Database
+
+
+class LegacyDatabase(Database):
+    """Database со старым поведением: новое соединение на каждый вызов"""
+
+    def _get_connection(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=60.0)
+
+
+CATEGORIES = ['power_results', 'sport_tips', 'challenges', 'memes', 'exercises', 'flood', 'other']
+
+
+def seed_posts(db: Database, count: int):
+    """Быстрое наполнение базы синтетическими постами"""
+    rows = [
+        (i, -100123, 'bench_channel', CATEGORIES[i % len(CATEGORIES)],
+         f'Пост {i}', f'Текст синтетического поста номер {i} #тренировка', 'photo', f'file_{i}')
+        for i in range(1, count + 1)
+    ]
+    with sqlite3.connect(db.db_path, timeout=60.0) as conn:
+        conn.executemany('''
+            INSERT INTO content
+            (message_id, channel_id, channel_username, category, title, text, media_type, media_file_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+        conn.commit()
+
+
+def measure(db: Database, posts: int, ops: int) -> dict:
+    """Замер вставок и выборок в секунду"""
+    start = time.perf_counter()
+    for i in range(ops):
+        db.add_content(
+            message_id=posts + i + 1,
+            channel_id=-100123,
+            channel_username='bench_channel',
+            category=CATEGORIES[i % len(CATEGORIES)],
+            title=f'Новый пост {i}',
+            text='Текст нового поста',
+            media_type='photo',
+            media_file_id=f'new_file_{i}'
+        )
+    insert_elapsed = time.perf_counter() - start
+
+    rnd = random.Random(42)
+    ids = [rnd.randint(1, posts) for _ in range(ops * 5)]
+    start = time.perf_counter()
+    for message_id in ids:
+        db.get_content_by_message_id(message_id)
+    lookup_elapsed = time.perf_counter() - start
+
+    return {
+        'inserts_per_sec': ops / insert_elapsed,
+        'lookups_per_sec': len(ids) / lookup_elapsed,
+    }
+
+
+def run(posts: int = 100000, ops: int = 2000) -> dict:
+    """Запуск бенчмарка для обоих режимов"""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, cls in (('legacy', LegacyDatabase), ('pooled', Database)):
+            db = cls(os.path.join(tmp, f'{name}.db'))
+            seed_posts(db, posts)
+            results[name] = measure(db, posts, ops)
+            db.close()
+    return results
+
+
+def make_batch(start: int, count: int, album_size: int) -> list:
+    """Посты для пакетной записи; каждый третий — альбом из album_size медиафайлов"""
+    batch = []
+    for i in range(start, start + count):
+        media = []
+        if i % 3 == 0:
+            media = [(i * 100 + part, 'photo', f'album_{i}_{part}') for part in range(album_size)]
+        batch.append({
+            'message_id': i * 100,
+            'channel_id': -100123,
+            'channel_username': 'bench_channel',
+            'category': CATEGORIES[i % len(CATEGORIES)],
+            'title': f'Пакетный пост {i}',
+            'text': 'Текст пакетного поста',
+            'media_type': 'photo',
+            'media_file_id': f'bulk_file_{i}',
+            'media': media,
+        })
+    return batch
+
+
+def run_bulk(rows: int = 5000, album_size: int = 5) -> dict:
+    """Постов в секунду: поштучная запись против upsert_posts"""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'rows.db'))
+        batch = make_batch(1, rows, album_size)
+        start = time.perf_counter()
+        for post in batch:
+            fields = {key: value for key, value in post.items() if key != 'media'}
+            db.add_content(**fields)
+            content_id = db.get_content_by_message_id(post['message_id'])['id']
+            for order, (message_id, media_type, media_file_id) in enumerate(post['media']):
+                db.add_media_to_post(content_id, message_id, media_type, media_file_id, media_order=order)
+        results['per_row_posts_per_sec'] = rows / (time.perf_counter() - start)
+        db.close()
+
+        db = Database(os.path.join(tmp, 'bulk.db'))
+        start = time.perf_counter()
+        # Пакетами, как при загрузке истории канала
+        for offset in range(0, rows, 1000):
+            db.upsert_posts(batch[offset:offset + 1000])
+        results['bulk_posts_per_sec'] = rows / (time.perf_counter() - start)
+        db.close()
+
+    results['speedup'] = results['bulk_posts_per_sec'] / results['per_row_posts_per_sec']
+    return results
+
+
+def legacy_content_with_media_files(db: Database, category: str, limit: int) -> list:
+    """Прежняя выборка: JOIN content и post_media с LIMIT limit * 10 и группировкой в Python"""
+    with db._get_connection() as conn:
+        cursor = conn.execute('''
+            SELECT c.*, pm.media_type, pm.media_file_id, pm.media_order
+            FROM content c
+            LEFT JOIN post_media pm ON c.id = pm.content_id
+            WHERE c.category = ?
+            ORDER BY c.created_at ASC, pm.media_order ASC
+            LIMIT ?
+        ''', (category, limit * 10))
+        columns = [description[0] for description in cursor.description]
+        posts = {}
+        for row in cursor.fetchall():
+            row = dict(zip(columns, row))
+            post = posts.setdefault(row['id'], {**row, 'media_files': []})
+            if row['media_type'] and row['media_file_id']:
+                post['media_files'].append({
+                    'media_type': row['media_type'],
+                    'media_file_id': row['media_file_id'],
+                    'media_order': row['media_order'] or 0
+                })
+        return list(posts.values())[:limit]
+
+
+def run_hydration(albums: int = 2000, album_size: int = 10, limit: int = 50, reads: int = 200) -> dict:
+    """
+    Выборок в секунду и полнота постов: прежний JOIN, двухфазная выборка
+    (запрос к SQLite напрямую, мимо кэша) и та же выборка из кэша чтения.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'albums.db'))
+        db.upsert_posts([{
+            'message_id': i * 100,
+            'channel_id': -100123,
+            'category': 'memes',
+            'title': f'Альбом {i}',
+            'media': [(i * 100 + part, 'photo', f'album_{i}_{part}') for part in range(album_size)],
+        } for i in range(1, albums + 1)])
+
+        for name, fetch in (('legacy', lambda: legacy_content_with_media_files(db, 'memes', limit)),
+                            ('two_phase', lambda: db._fetch_content_with_media_files('memes', limit)),
+                            ('cached', lambda: db.get_content_with_media_files('memes', limit))):
+            posts = fetch()
+            start = time.perf_counter()
+            for _ in range(reads):
+                fetch()
+            elapsed = time.perf_counter() - start
+            results[name] = {
+                'reads_per_sec': reads / elapsed,
+                'posts': len(posts),
+                'complete_posts': sum(1 for post in posts if len(post['media_files']) == album_size),
+            }
+        db.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк Database')
+    parser.add_argument('--posts', type=int, default=100000, help='количество постов в базе')
+    parser.add_argument('--ops', type=int, default=2000, help='количество вставок (выборок в 5 раз больше)')
+    parser.add_argument('--bulk', type=int, default=5000, help='количество постов для пакетной записи')
+    parser.add_argument('--albums', type=int, default=2000, help='количество альбомов из 10 медиафайлов')
+    args = parser.parse_args()
+
+    print(f"📊 Бенчмарк Database: {args.posts} постов, {args.ops} вставок")
+    results = run(args.posts, args.ops)
+    for name, metrics in results.items():
+        print(f"   {name:>7}: вставок/с {metrics['inserts_per_sec']:10.1f}   "
+              f"выборок/с {metrics['lookups_per_sec']:10.1f}")
+
+    print(f"📊 Запись {args.bulk} постов с медиафайлами")
+    bulk = run_bulk(args.bulk)
+    print(f"   поштучно:     {bulk['per_row_posts_per_sec']:10.1f} постов/с")
+    print(f"   upsert_posts: {bulk['bulk_posts_per_sec']:10.1f} постов/с")
+    print(f"   ускорение:    {bulk['speedup']:10.1f}x")
+
+    print(f"📊 Выборка 50 постов с медиафайлами из {args.albums} альбомов по 10 файлов")
+    for name, metrics in run_hydration(args.albums).items():
+        print(f"   {name:>9}: выборок/с {metrics['reads_per_sec']:8.1f}   "
+              f"постов {metrics['posts']:3d}, из них полных {metrics['complete_posts']:3d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Синтетические данные и заглушка Bot API для бенчмарков и нагрузочных тестов.
+Все генераторы детерминированы (seed), поэтому результаты разных коммитов
+можно сравнивать между собой.
+"""
+
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from telegram import Update
+from telegram.request import BaseRequest, RequestData
+
+from config import CATEGORY_HASHTAGS, CATEGORY_KEYWORDS, CHANNEL_USERNAME
+
+BENCH_TOKEN = '123456:BENCH'
+BENCH_CHANNEL_ID = -1001234567890
+BENCH_CHANNEL = CHANNEL_USERNAME.lstrip('@')
+
+_FILLER = ('сегодня', 'зал', 'неделя', 'план', 'результат', 'отдых', 'форма',
+           'команда', 'вечер', 'утро', 'прогресс', 'цель', 'друзья', 'спина')
+
+
+def make_texts(count: int, seed: int = 42) -> List[Tuple[str, str]]:
+    """Посты (заголовок, текст) с ключевыми словами и хештегами разных категорий"""
+    rng = random.Random(seed)
+    categories = [category for category in CATEGORY_KEYWORDS if CATEGORY_KEYWORDS[category]]
+    posts = []
+    for i in range(count):
+        category = categories[i % len(categories)]
+        words = rng.sample(_FILLER, 6) + rng.sample(CATEGORY_KEYWORDS[category], 2)
+        rng.shuffle(words)
+        hashtags = CATEGORY_HASHTAGS.get(category) or []
+        if hashtags and rng.random() < 0.7:
+            words.append(rng.choice(hashtags))
+        posts.append((f'Пост {i}', ' '.join(words)))
+    return posts
+
+
+def make_posts(count: int, seed: int = 42, album_every: int = 5) -> List[Dict]:
+    """Посты для Database.upsert_posts; каждый album_every-й — альбом из трёх фото"""
+    rng = random.Random(seed)
+    categories = list(CATEGORY_KEYWORDS)
+    posts = []
+    message_id = 1
+    for i, (title, text) in enumerate(make_texts(count, seed)):
+        parts = 3 if album_every and i % album_every == 0 else 1
+        post = {
+            'message_id': message_id,
+            'channel_id': BENCH_CHANNEL_ID,
+            'channel_username': BENCH_CHANNEL,
+            'category': rng.choice(categories),
+            'title': title,
+            'text': text,
+            'media_type': 'photo',
+            'media_file_id': f'photo_{message_id}',
+        }
+        if parts > 1:
+            post['media_group_id'] = f'album_{message_id}'
+            post['media'] = [(message_id + part, 'photo', f'photo_{message_id + part}') for part in range(parts)]
+        posts.append(post)
+        message_id += parts
+    return posts
+
+
+class FakeResponses:
+    """
+    Ответы Bot API по имени метода: правдоподобные Message, MessageId и True.
+    message_id новых сообщений растут отдельно в каждом чате, как в Telegram.
+    Параметры принимаются и в виде JSON-строк (так их отправляет PTB).
+    """
+
+    def __init__(self):
+        self._message_ids: Dict[int, int] = {}
+
+    def _message(self, chat_id) -> Dict:
+        chat_id = int(chat_id or 0)
+        message_id = self._message_ids.get(chat_id, 0) + 1
+        self._message_ids[chat_id] = message_id
+        return {
+            'message_id': message_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private' if chat_id > 0 else 'channel'},
+        }
+
+    @staticmethod
+    def _list(value) -> list:
+        if isinstance(value, str):
+            value = json.loads(value)
+        return value or []
+
+    def result(self, method: str, params: Dict):
+        chat_id = params.get('chat_id')
+        if method == 'getMe':
+            return {'id': 1, 'is_bot': True, 'first_name': 'Bench', 'username': 'bench_bot'}
+        if method in ('forwardMessages', 'copyMessages'):
+            return [{'message_id': self._message(chat_id)['message_id']}
+                    for _ in self._list(params.get('message_ids'))]
+        if method == 'copyMessage':
+            return {'message_id': self._message(chat_id)['message_id']}
+        if method == 'sendMediaGroup':
+            return [self._message(chat_id) for _ in self._list(params.get('media'))]
+        if method.startswith(('send', 'forward', 'edit')):
+            return self._message(chat_id)
+        return True
+
+
+class RecordingRequest(BaseRequest):
+    """
+    Заглушка Bot API на уровне запросов PTB: сеть не используется,
+    каждый вызов записывается, ответы собираются по имени метода.
+    latency — искусственная задержка ответа, секунды.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls: List[Tuple[str, Dict]] = []
+        self.responses = FakeResponses()
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        return None
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    def method_counts(self) -> Dict[str, int]:
+        return dict(Counter(method for method, _ in self.calls))
+
+    async def do_request(self, url: str, method: str, request_data: Optional[RequestData] = None,
+                         *args, **kwargs) -> Tuple[int, bytes]:
+        api_method = url.rsplit('/', 1)[-1]
+        params = request_data.parameters if request_data is not None else {}
+        self.calls.append((api_method, params))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        body = {'ok': True, 'result': self.responses.result(api_method, params)}
+        return 200, json.dumps(body).encode()
+
+
+def callback_update(update_id: int, user_id: int, data: str, bot) -> Update:
+    """Нажатие inline-кнопки пользователем user_id"""
+    return Update.de_json({
+        'update_id': update_id,
+        'callback_query': {
+            'id': str(update_id),
+            'from': {'id': user_id, 'is_bot': False, 'first_name': 'User'},
+            'chat_instance': str(user_id),
+            'data': data,
+            'message': {
+                'message_id': 1, 'date': 0, 'text': 'меню',
+                'chat': {'id': user_id, 'type': 'private'},
+            },
+        },
+    }, bot)
+
+
+def channel_post_update(update_id: int, message_id: int, text: str, bot) -> Update:
+    """Новый пост в канале BENCH_CHANNEL"""
+    return Update.de_json({
+        'update_id': update_id,
+        'channel_post': {
+            'message_id': message_id, 'date': 0, 'text': text,
+            'chat': {'id': BENCH_CHANNEL_ID, 'type': 'channel', 'username': BENCH_CHANNEL, 'title': 'Bench'},
+        },
+    }, bot)
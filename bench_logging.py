@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк стоимости логирования в горячих путях бота.
+Замеряет разбор поста канала (_build_post: текст, медиа, категория) и
+отправку поста (_send_post через пересылку альбома) при разных настройках:
+логирование выключено, INFO через очередь (по умолчанию), DEBUG через очередь
+и DEBUG с синхронной записью в файл из цикла событий (как было с basicConfig
+и подробными логами на уровне INFO).
+
+Запуск: python bench_logging.py [--ops 20000]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+
+from bot import ContentBot
+from content_analyzer import ContentAnalyzer
+from delivery import DeliveryScheduler
+from forward_strategy import ForwardStrategy
+from logging_setup import LOG_FORMAT, setup_logging, stop_logging
+
+
+class NullBot:
+    """Bot API без сети: пересылка сразу успешна"""
+
+    async def forward_messages(self, chat_id, from_chat_id, message_ids):
+        return tuple(message_ids)
+
+    async def forward_message(self, chat_id, from_chat_id, message_id):
+        return message_id
+
+
+def make_parts(group: int) -> list:
+    """Альбом из трёх фото с подписью у первой части"""
+    return [
+        SimpleNamespace(
+            message_id=group * 10 + i,
+            text=None,
+            caption=f'Жим лёжа {group}\nНовый рекорд #силовые #прогресс' if i == 0 else None,
+            media_group_id=f'group_{group}',
+            photo=[SimpleNamespace(file_id=f'photo_{group}_{i}')],
+        )
+        for i in range(3)
+    ]
+
+
+def make_post(n: int) -> dict:
+    return {
+        'message_id': n * 10, 'channel_id': -100123, 'title': f'Пост {n}', 'text': 'Текст',
+        'media_files': [{'message_id': n * 10 + i, 'media_type': 'photo', 'media_file_id': f'photo_{n}_{i}'}
+                        for i in range(3)],
+    }
+
+
+_log_file = None
+
+
+def teardown():
+    """Остановка логирования, закрытие обработчиков и файла журнала"""
+    global _log_file
+    stop_logging()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    if _log_file is not None:
+        _log_file.close()
+        _log_file = None
+
+
+def configure(mode: str, path: str):
+    """Настройка логирования для режима бенчмарка"""
+    global _log_file
+    teardown()
+    root = logging.getLogger()
+    if mode == 'off':
+        root.setLevel(logging.CRITICAL)
+    elif mode == 'sync-debug':
+        handler = logging.FileHandler(path, encoding='utf-8')
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        root.addHandler(handler)
+        root.setLevel(logging.DEBUG)
+    else:
+        level = 'DEBUG' if mode == 'queue-debug' else 'INFO'
+        _log_file = open(path, 'a', encoding='utf-8')
+        setup_logging(level, stream=_log_file)
+
+
+def measure(ops: int) -> dict:
+    """Разборов и отправок в секунду"""
+    bot = ContentBot.__new__(ContentBot)
+    bot.analyzer = ContentAnalyzer()
+    bot.application = SimpleNamespace(bot=NullBot())
+    bot.forwarding = ForwardStrategy()
+    # Без ограничений скорости: замеряется стоимость логирования, а не лимиты Telegram
+    bot.delivery = DeliveryScheduler(global_rate=1e9, global_burst=1e9, chat_rate=1e9, chat_burst=1e9)
+
+    albums = [make_parts(i) for i in range(ops)]
+    start = time.perf_counter()
+    for parts in albums:
+        bot._build_post(parts, [part.message_id for part in parts])
+    parse_elapsed = time.perf_counter() - start
+
+    async def send_all():
+        for n in range(ops):
+            await bot._send_post(1, make_post(n))
+        await bot.delivery.close()
+
+    start = time.perf_counter()
+    asyncio.run(send_all())
+    send_elapsed = time.perf_counter() - start
+
+    return {
+        'parses_per_sec': ops / parse_elapsed,
+        'sends_per_sec': ops / send_elapsed,
+    }
+
+
+def run(ops: int) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ('off', 'queue-info', 'queue-debug', 'sync-debug'):
+            configure(mode, os.path.join(tmp, f'{mode}.log'))
+            results[mode] = measure(ops)
+        teardown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк логирования')
+    parser.add_argument('--ops', type=int, default=20000, help='количество разборов и отправок')
+    args = parser.parse_args()
+
+    results = run(args.ops)
+    print(f"📊 Бенчмарк логирования: {args.ops} постов")
+    for mode, metrics in results.items():
+        print(f"   {mode:>11}: разборов/с {metrics['parses_per_sec']:10.1f}   "
+              f"отправок/с {metrics['sends_per_sec']:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
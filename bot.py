@@ -1,52 +1,177 @@
 import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup, KeyboardButton
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler, MessageHandler, filters, ContextTypes
-from telegram.error import TelegramError
+from telegram.error import TelegramError, RetryAfter, BadRequest
 from telegram.constants import MessageOriginType
+from telegram.request import BaseRequest
 import asyncio
+import functools
+import html
+import signal
+import time
 from datetime import datetime
+from typing import Optional, Sequence
 
-from config import BOT_TOKEN, CHANNEL_USERNAME
-from database import Database
+from config import (
+    BOT_TOKEN, CHANNEL_USERNAME, CATEGORY_PAGE_SIZE,
+    WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_SECRET, WEBHOOK_ALLOW_NO_SECRET, WEB_PORT, UPDATE_CONCURRENCY,
+    MEDIA_FAILURE_TTL, MEDIA_VERIFY_INTERVAL, LOG_LEVEL, LOG_JSON, LOG_LEVELS, ADMIN_IDS
+)
+from async_database import AsyncDatabase
 from content_analyzer import ContentAnalyzer
+from delivery import DeliveryScheduler
+from forward_strategy import ForwardStrategy, FORWARD, MEDIA, MAX_BATCH_MESSAGES
+from media_groups import MediaGroupAssembler
+from update_processor import PerChatUpdateProcessor
+from webhook_server import WebhookServer
+from logging_setup import setup_logging, stop_logging, parse_levels
+from metrics import REGISTRY, InstrumentedRequest, timed_handler
+from profiling import PROFILER, profiled_handler
 
-# Настройка логирования
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
+# Логирование настраивается в run() (см. logging_setup)
 logger = logging.getLogger(__name__)
 
+# Фрагменты текста BadRequest, означающие, что недоступен сам файл; ошибки подписи
+# (например, "can't parse entities") к файлу отношения не имеют
+MEDIA_ERRORS = (
+    'wrong file identifier', 'file reference', 'wrong remote file', 'file_id', 'file not found',
+    'wrong type of the web page content', 'failed to get http url content', 'media_empty',
+)
+
+
+def is_media_error(error: Exception) -> bool:
+    """Ошибка отправки относится к файлу, и его стоит считать недоступным"""
+    if not isinstance(error, BadRequest):
+        return False
+    message = error.message.lower()
+    return any(fragment in message for fragment in MEDIA_ERRORS)
+
+
+def check_webhook_secret(secret: Optional[str], allow_no_secret: bool):
+    """
+    Проверка настройки webhook: без секрета заголовок X-Telegram-Bot-Api-Secret-Token
+    не проверяется, и поддельные обновления на публичный адрес будут приняты.
+    Запуск без секрета возможен только явно (WEBHOOK_ALLOW_NO_SECRET) и с предупреждением.
+    """
+    if secret:
+        return
+    if not allow_no_secret:
+        raise RuntimeError("Режим webhook требует WEBHOOK_SECRET "
+                           "(или WEBHOOK_ALLOW_NO_SECRET=1 для запуска без проверки)")
+    logger.warning("⚠️ WEBHOOK_SECRET не задан: webhook принимает обновления без проверки "
+                   "X-Telegram-Bot-Api-Secret-Token")
+
+
 class ContentBot:
-    def __init__(self):
-        self.db = Database()
+    def __init__(self, token: str = None, request: Optional[BaseRequest] = None,
+                 db: Optional[AsyncDatabase] = None, base_url: str = None):
+        """
+        token, request, db и base_url подменяются в бенчмарках и нагрузочных тестах:
+        другой токен, запросы к заглушке Bot API и база во временном файле.
+        """
+        # Все обращения к базе идут через отдельный поток, не блокируя цикл событий
+        self.db = db or AsyncDatabase()
         self.analyzer = ContentAnalyzer()
-        self.application = Application.builder().token(BOT_TOKEN).build()
+        # Отправка постов с учётом лимитов Telegram
+        self.delivery = DeliveryScheduler()
+        self.forwarding = ForwardStrategy()
+        builder = Application.builder()
+        if base_url:
+            builder = builder.base_url(base_url)
+        self.application = (
+            builder
+            .token(token or BOT_TOKEN)
+            # Замер длительности и ошибок каждого запроса к Bot API
+            .request(request or InstrumentedRequest())
+            # Разные чаты обрабатываются параллельно, сообщения одного чата — по порядку
+            .concurrent_updates(PerChatUpdateProcessor(UPDATE_CONCURRENCY))
+            .build()
+        )
+        # Посты из канала сохраняются фоновой задачей, а не в обработчиках просмотра
+        self.ingest_queue = asyncio.Queue()
+        self.ingestion_task = None
+        # Части альбомов собираются в один пост до сохранения
+        self.channel_groups = MediaGroupAssembler(self._queue_channel_group)
+        self.forwarded_groups = MediaGroupAssembler(self._save_forwarded_group)
         self.setup_handlers()
-        # запуск keep_alive через post_init
-        self.application.post_init = self.start_keep_alive
+        self.register_metrics()
+        # запуск фоновых задач через post_init
+        self.application.post_init = self.start_background_tasks
+        self.application.post_stop = self.stop_background_tasks
+        self.application.post_shutdown = self.close_database
 
-    async def start_keep_alive(self, app: Application):
-        """Запуск фоновой задачи keep_alive после инициализации приложения"""
-        app.create_task(self.keep_alive())
+    async def start_background_tasks(self, app: Application):
+        """Запуск фоновой загрузки постов после инициализации приложения"""
+        # post_init выполняется до app.start(), поэтому задача создаётся напрямую;
+        # её остановку и ожидание выполняет stop_background_tasks
+        self.ingestion_task = asyncio.create_task(self.ingestion_worker(), name="ingestion_worker")
 
-    async def keep_alive(self):
-        """Периодически отправляет запрос к Telegram API чтобы бот не 'засыпал' на Render"""
-        while True:
-            try:
-                await self.application.bot.get_me()
-                logger.info("Keep-alive: getMe запрос отправлен")
-            except Exception as e:
-                logger.error(f"Keep-alive error: {e}")
-            await asyncio.sleep(20)  # интервал между запросами
+    async def stop_background_tasks(self, app: Application):
+        """Дообработка очереди постов и остановка фоновых задач"""
+        await self.delivery.close()
+        await self.forwarded_groups.flush_all()
+        await self.channel_groups.flush_all()
+        if self.ingestion_task is None:
+            return
+        try:
+            await asyncio.wait_for(self.ingest_queue.join(), timeout=10)
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ Не сохранено постов из очереди: {self.ingest_queue.qsize()}")
+        self.ingestion_task.cancel()
+        try:
+            await self.ingestion_task
+        except asyncio.CancelledError:
+            pass
+        self.ingestion_task = None
+
+    async def close_database(self, app: Application):
+        """Закрытие соединений с базой данных при остановке приложения"""
+        await self.db.close()
+
+    def get_status(self) -> dict:
+        """Состояние бота для /status"""
+        return {
+            "ingest_queue": self.ingest_queue.qsize(),
+            "active_chats": self.application.update_processor.active_chats,
+            "media_groups_pending": self.channel_groups.pending + self.forwarded_groups.pending,
+            "delivery": self.delivery.get_metrics(),
+            "forwarding": self.forwarding.get_metrics(),
+            "read_cache": self.db.cache.stats(),
+            "profiling": PROFILER.status(),
+        }
+
+    def register_metrics(self):
+        """Метрики состояния бота, вычисляемые при запросе /metrics"""
+        REGISTRY.gauge('bot_ingest_queue_depth', 'Постов в очереди на сохранение',
+                       self.ingest_queue.qsize)
+        REGISTRY.gauge('bot_send_queue_depth', 'Отправок в очереди планировщика доставки',
+                       lambda: self.delivery.queue_depth)
+        REGISTRY.gauge('bot_active_chats', 'Чатов с обрабатываемыми обновлениями',
+                       lambda: self.application.update_processor.active_chats)
+        REGISTRY.gauge('bot_media_groups_pending', 'Альбомов, ожидающих недостающих частей',
+                       lambda: self.channel_groups.pending + self.forwarded_groups.pending)
+        REGISTRY.gauge('bot_delivered_total', 'Доставленных отправок',
+                       lambda: self.delivery.delivered_total, kind='counter')
+        REGISTRY.gauge('bot_retry_after_total', 'Ответов RetryAfter от Telegram',
+                       lambda: self.delivery.retry_after_total, kind='counter')
+        REGISTRY.gauge('read_cache_requests_total', 'Обращения к кэшу чтения по результату',
+                       lambda: {('hit',): self.db.cache.hits, ('miss',): self.db.cache.misses},
+                       kind='counter', labelnames=['result'])
+        REGISTRY.gauge('read_cache_hit_ratio', 'Доля попаданий в кэш чтения',
+                       lambda: self.db.cache.stats()['hit_rate'])
 
     def setup_handlers(self):
-        """Настройка обработчиков команд и сообщений"""
-        self.application.add_handler(CommandHandler("start", self.start_command))
-        self.application.add_handler(CallbackQueryHandler(self.button_callback))
-        self.application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.text_message_handler))
-        self.application.add_handler(MessageHandler(filters.ChatType.CHANNEL, self.channel_message_handler))
-        self.application.add_handler(MessageHandler(filters.FORWARDED & filters.ChatType.PRIVATE, self.forwarded_message_handler))
+        """Настройка обработчиков команд и сообщений (с замером длительности и профилированием)"""
+        def wrap(callback):
+            return timed_handler(profiled_handler(callback))
+
+        self.application.add_handler(CommandHandler("start", wrap(self.start_command)))
+        self.application.add_handler(CommandHandler("profile", self.profile_command))
+        self.application.add_handler(CallbackQueryHandler(wrap(self.button_callback)))
+        # Текстовые посты канала должны попасть в channel_message_handler, а не в меню
+        self.application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND & ~filters.ChatType.CHANNEL, wrap(self.text_message_handler)))
+        self.application.add_handler(MessageHandler(filters.ChatType.CHANNEL, wrap(self.channel_message_handler)))
+        self.application.add_handler(MessageHandler(filters.FORWARDED & filters.ChatType.PRIVATE, wrap(self.forwarded_message_handler)))
         self.application.add_error_handler(self.error_handler)
 
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -60,62 +185,33 @@ class ContentBot:
         """
         keyboard = self.create_main_keyboard()
         await update.message.reply_text(welcome_text, reply_markup=keyboard)
-        await update.message.reply_text("🔄 Загружаю посты из каналов...")
-        await self.auto_load_new_posts()
-        self.db.update_all_stats()
-        total_posts = self.db.get_total_posts_count()
+        total_posts = await self.db.get_total_posts_count()
         await update.message.reply_text(
-            f"✅ Загрузка завершена!\n\n"
             f"📊 Всего постов в базе: {total_posts}\n\n"
             f"💡 Используйте кнопки меню для просмотра категорий!"
         )
 
-    async def button_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Обработчик нажатий на inline кнопки"""
-        query = update.callback_query
-        await query.answer()
-        data = query.data
-        if data.startswith("category_"):
-            category = data.replace("category_", "")
-            await self.show_category_content(query, category)
-        elif data == "stats":
-            self.db.update_all_stats()
-            stats = self.db.get_real_stats()
-            total_posts = self.db.get_total_posts_count()
-            if not stats:
-                await query.edit_message_text("📊 Статистика пока недоступна.")
-                return
-            stats_text = "📊 Статистика по категориям:\n\n"
-            for category, count in stats.items():
-                category_name = self.analyzer.get_category_name(category)
-                stats_text += f"📁 {category_name}: {count} постов\n"
-            stats_text += f"\n📈 Всего постов: {total_posts}"
-            await query.edit_message_text(stats_text)
-        elif data == "back_to_main":
-            welcome_text = """
-🏋️‍♂️ Добро пожаловать в Fitness Content Sorter Bot!
-Этот бот автоматически сортирует контент из каналов @nikitaFlooDed и Флудские ТРЕНИ по категориям.
+    async def profile_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Профилирование на ходу (только ADMIN_IDS): /profile on, /profile off, /profile"""
+        user = update.effective_user
+        if user is None or user.id not in ADMIN_IDS:
+            return
+        action = context.args[0].lower() if context.args else ''
+        if action == 'on':
+            PROFILER.enable()
+        elif action == 'off':
+            PROFILER.disable()
+
+        status = PROFILER.status()
+        lines = [
+            f"🔬 Профилирование {'включено' if status['enabled'] else 'выключено'}",
+            f"📁 Каталог: {status['directory']}, доля запросов: {status['sample_rate']}, "
+            f"профилировано: {status['profiled']}",
+        ]
+        for entry in status['slowest'][:10]:
+            lines.append(f"• {entry['ms']:.1f} мс — {entry['name']}")
+        await update.message.reply_text('\n'.join(lines))
 
-📋 Выберите категорию из меню ниже:
-        """
-        
-        keyboard = self.create_main_keyboard()
-        await update.message.reply_text(welcome_text, reply_markup=keyboard)
-        
-        # Загружаем посты при первом запуске
-        await update.message.reply_text("🔄 Загружаю посты из каналов...")
-        await self.auto_load_new_posts()
-        
-        # Обновляем статистику и получаем актуальные данные
-        self.db.update_all_stats()
-        total_posts = self.db.get_total_posts_count()
-        
-        await update.message.reply_text(
-            f"✅ Загрузка завершена!\n\n"
-            f"📊 Всего постов в базе: {total_posts}\n\n"
-            f"💡 Используйте кнопки меню для просмотра категорий!"
-        )
-    
     async def button_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик нажатий на inline кнопки"""
         query = update.callback_query
@@ -126,11 +222,14 @@ class ContentBot:
         if data.startswith("category_"):
             category = data.replace("category_", "")
             await self.show_category_content(query, category)
+        elif data.startswith("page:"):
+            _, category, direction, anchor_id = data.split(":")
+            await self.show_category_content(query, category, direction, int(anchor_id))
         elif data == "stats":
             # Показываем актуальную статистику
-            self.db.update_all_stats()  # Обновляем статистику
-            stats = self.db.get_real_stats()  # Получаем актуальные данные
-            total_posts = self.db.get_total_posts_count()
+            # Счётчики категорий поддерживаются базой, пересчёт не нужен
+            stats = await self.db.get_real_stats()
+            total_posts = sum(stats.values())
             
             if not stats:
                 await query.edit_message_text("📊 Статистика пока недоступна.")
@@ -158,157 +257,14 @@ class ContentBot:
         else:
             await query.edit_message_text("❓ Используйте кнопки меню для навигации.")
     
-    async def auto_load_new_posts(self):
-        """Автоматическая загрузка новых постов из канала"""
-        try:
-            logger.info("🔄 Автоматическая загрузка новых постов...")
-            
-            # Получаем последние сообщения из канала
-            try:
-                chat = await self.application.bot.get_chat(CHANNEL_USERNAME)
-                logger.info(f"✅ Канал найден: {chat.title}")
-                
-                # Проверяем права бота
-                try:
-                    member = await self.application.bot.get_chat_member(CHANNEL_USERNAME, self.application.bot.id)
-                    logger.info(f"👤 Права бота: {member.status}")
-                    
-                    if member.status not in ['administrator', 'member']:
-                        logger.warning(f"❌ Бот не имеет прав в канале: {member.status}")
-                        return
-                        
-                except Exception as e:
-                    logger.warning(f"❌ Не удалось проверить права бота: {e}")
-                    return
-                
-                # Получаем последние сообщения из канала
-                try:
-                    logger.info("📥 Получаю последние сообщения из канала...")
-                    
-                    # Получаем последние сообщения через get_updates
-                    messages = []
-                    
-                    try:
-                        updates = await self.application.bot.get_updates(limit=100, timeout=1)
-                        for update_item in updates:
-                            if update_item.channel_post and update_item.channel_post.chat.username == CHANNEL_USERNAME.replace('@', ''):
-                                messages.append(update_item.channel_post)
-                        logger.info(f"📥 Получено {len(messages)} сообщений через get_updates")
-                    except Exception as e:
-                        logger.warning(f"❌ get_updates не работает: {e}")
-                    
-                    # Если сообщений нет, попробуем получить через webhook или другие способы
-                    if not messages:
-                        logger.info("📥 Новых сообщений нет, попробуем получить через другие способы...")
-                        
-                        # Попробуем получить последние сообщения через get_chat
-                        try:
-                            # Получаем информацию о канале
-                            channel_info = await self.application.bot.get_chat(CHANNEL_USERNAME)
-                            logger.info(f"📊 Информация о канале: {channel_info.title}, ID: {channel_info.id}")
-                            
-                            # К сожалению, без webhook получить историю канала сложно
-                            # Но можем попробовать получить последние сообщения через другие методы
-                            logger.info("⚠️ Для получения истории канала нужен webhook или специальные права")
-                            
-                        except Exception as e:
-                            logger.warning(f"❌ Не удалось получить информацию о канале: {e}")
-                    
-                    logger.info(f"📥 Всего получено {len(messages)} сообщений из канала")
-                    
-                    if messages:
-                        processed_count = 0
-                        for message in messages:
-                            try:
-                                # Проверяем, не добавлен ли уже этот пост
-                                existing_post = self.db.get_content_by_message_id(message.message_id)
-                                if existing_post:
-                                    logger.info(f"Пост {message.message_id} уже существует в базе")
-                                    continue
-                                
-                                # Извлекаем информацию о контенте
-                                title, text = self.analyzer.extract_text_content(message)
-                                media_type, media_file_id = self.analyzer.extract_media_info(message)
-                                
-                                # Категоризируем контент
-                                category = self.analyzer.categorize_content(text, title)
-                                
-                                # Получаем username канала
-                                channel_username = message.chat.username or CHANNEL_USERNAME.replace('@', '')
-                                
-                                # Сохраняем в базу данных
-                                success = self.db.add_content(
-                                    message_id=message.message_id,
-                                    channel_id=message.chat.id,
-                                    channel_username=channel_username,
-                                    category=category,
-                                    title=title,
-                                    text=text,
-                                    media_type=media_type,
-                                    media_file_id=media_file_id
-                                )
-                                
-                                if success:
-                                    category_name = self.analyzer.get_category_name(category)
-                                    logger.info(f"✅ Новый пост {message.message_id} добавлен в категорию '{category_name}'")
-                                    processed_count += 1
-                                    
-                            except Exception as e:
-                                logger.error(f"❌ Ошибка при обработке сообщения {message.message_id}: {e}")
-                        
-                        if processed_count > 0:
-                            logger.info(f"✅ Автоматически обработано {processed_count} новых постов")
-                        else:
-                            logger.info("ℹ️ Новых постов для обработки не найдено")
-                    else:
-                        logger.info("ℹ️ Сообщений из канала не найдено")
-                        
-                except Exception as e:
-                    logger.warning(f"❌ Не удалось получить сообщения из канала: {e}")
-                    
-            except Exception as e:
-                logger.error(f"❌ Ошибка при доступе к каналу: {e}")
-                
-        except Exception as e:
-            logger.error(f"❌ Общая ошибка при автоматической загрузке: {e}")
-    
-    async def show_category_content(self, query, category: str):
-        """Показать контент выбранной категории с улучшенной обработкой медиа"""
-        # Сначала загружаем новые посты
-        await self.auto_load_new_posts()
-        
-        # Сначала пробуем получить контент с медиафайлами из таблицы post_media
-        content = self.db.get_content_with_media_files(category, limit=50)
-        
-        # Если не получилось, используем старый метод для получения постов
-        if not content:
-            logger.info(f"📁 Не удалось получить контент через get_content_with_media_files, используем старый метод")
-            content = self.db.get_content_by_category(category, limit=50)
-            
-            # Преобразуем старые посты в новый формат
-            for item in content:
-                media_type = item.get('media_type')
-                media_file_id = item.get('media_file_id')
-                
-                if media_type and media_file_id:
-                    # Создаем медиафайл в новом формате
-                    item['media_files'] = [{
-                        'media_type': media_type,
-                        'media_file_id': media_file_id,
-                        'media_order': 0
-                    }]
-                else:
-                    item['media_files'] = []
-        
+    async def show_category_content(self, query, category: str, direction: str = None, anchor_id: int = None):
+        """Показать одну страницу контента категории (от новых постов к старым)"""
         category_name = self.analyzer.get_category_name(category)
+        content, has_newer, has_older = await self.db.get_category_page(
+            category, CATEGORY_PAGE_SIZE, anchor_id=anchor_id, direction=direction or 'older'
+        )
         
-        logger.info(f"📁 Получено {len(content)} постов для категории '{category}'")
-        for i, item in enumerate(content, 1):
-            media_files = item.get('media_files', [])
-            logger.info(f"   {i}. Пост {item['id']}: '{item['title'][:30]}...' - медиафайлов: {len(media_files)}")
-            if media_files:
-                for j, media in enumerate(media_files, 1):
-                    logger.info(f"      {j}. {media['media_type']}: {media['media_file_id'][:20]}... (порядок: {media['media_order']})")
+        logger.info("📁 Получено %d постов для категории '%s' (курсор: %s %s)", len(content), category, direction, anchor_id)
         
         if not content:
             await query.edit_message_text(
@@ -319,179 +275,382 @@ class ContentBot:
             )
             return
         
-        # Показываем количество найденных постов
+        # Убираем кнопки, пока страница отправляется, чтобы не было повторных нажатий
         await query.edit_message_text(
-            f"📁 Категория: {category_name}\nНайдено постов: {len(content)}\n\nОтправляю посты...",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("🔙 Назад", callback_data="back_to_main")
-        ]])
+            f"📁 Категория: {category_name}\nПостов на странице: {len(content)}\n\nОтправляю посты..."
         )
         
-        # Отправляем каждый пост
+        # Отправляем посты через планировщик доставки
+        chat_id = query.from_user.id
+        # Внутри страницы посты идут от старых к новым: так новейший оказывается
+        # над кнопками навигации, а посты канала можно переслать одним запросом
+        delivered = await self._deliver_posts(chat_id, content[::-1])
+        
+        await query.edit_message_text(f"✅ Отправлено {delivered} постов из категории '{category_name}'")
+        # Навигация отправляется отдельным сообщением, чтобы оказаться под постами
+        await self._send(
+            self.application.bot.send_message, chat_id,
+            text=f"📁 {category_name}: листайте страницы кнопками ниже",
+            reply_markup=self.create_page_keyboard(category, content, has_newer, has_older)
+        )
+    
+    async def _send(self, call, chat_id: int, cost: int = 1, **kwargs):
+        """
+        Запрос к Bot API через планировщик доставки.
+        cost — сколько сообщений отправляет запрос (альбом, пакетная пересылка):
+        столько токенов списывается с ведер чата и бота. При RetryAfter
+        планировщик повторяет только этот запрос.
+        """
+        return await self.delivery.submit(chat_id, functools.partial(call, chat_id=chat_id, **kwargs), cost)
+    
+    async def _deliver_posts(self, chat_id: int, content: list) -> int:
+        """
+        Отправка постов в чат в исходном порядке.
+        Каждый запрос к API проходит через планировщик доставки (см. _send),
+        поэтому скорость ограничивается лимитами Telegram без фиксированных пауз.
+        Соседние посты одного канала пересылаются одним запросом.
+        Возвращает число отправленных постов.
+        """
+        delivered = 0
+        for method, posts in self._group_posts(content):
+            if len(posts) == 1:
+                delivered += await self._send_each(chat_id, posts)
+                continue
+            try:
+                delivered += await self._send_batch(chat_id, method, posts)
+            except Exception as e:
+                message_ids = ', '.join(str(item.get('message_id', 'unknown')) for item in posts)
+                logger.error(f"❌ Посты {message_ids} не отправлены: {e}")
+        
+        metrics = self.delivery.get_metrics()
+        logger.info(f"📤 Доставлено {delivered}/{len(content)} постов в чат {chat_id} "
+                    f"({metrics['delivered_per_sec']:.2f} отправок/с за минуту)")
+        return delivered
+    
+    @staticmethod
+    def _source_message_ids(item: dict) -> list:
+        """Сообщения поста в канале: сам пост и все части альбома, по возрастанию"""
+        message_ids = {item['message_id']}
+        message_ids.update(media['message_id'] for media in item.get('media_files', []) if media.get('message_id'))
+        return sorted(message_ids)
+    
+    def _group_posts(self, content: list) -> list:
+        """
+        Разбиение постов на пакеты [(способ, посты)] для forward_messages/copy_messages.
+        В пакет попадают подряд идущие посты одного канала с одинаковым способом
+        доставки; Telegram требует возрастающих message_id, поэтому пакет
+        прерывается, если порядок постов с ним не совпадает. Альбом всегда
+        целиком в одном пакете, всего не больше MAX_BATCH_MESSAGES сообщений.
+        """
+        groups = []
+        batch_key = None
+        batch_ids = []
         for item in content:
+            channel_id = item.get('channel_id')
+            method = self.forwarding.batch_method(channel_id, item['message_id'])
+            message_ids = self._source_message_ids(item)
+            if (method is not None and batch_key == (channel_id, method)
+                    and message_ids[0] > batch_ids[-1]
+                    and len(batch_ids) + len(message_ids) <= MAX_BATCH_MESSAGES):
+                groups[-1][1].append(item)
+                batch_ids.extend(message_ids)
+            else:
+                groups.append((method, [item]))
+                batch_key = (channel_id, method) if method is not None else None
+                batch_ids = message_ids
+        return groups
+    
+    async def _forward_source(self, chat_id: int, channel_id: int, message_ids: list, method: str) -> Sequence:
+        """Пересылка или копия сообщений канала; возвращает доставленные сообщения"""
+        bot = self.application.bot
+        if len(message_ids) == 1:
+            call = bot.forward_message if method == FORWARD else bot.copy_message
+            return (await self._send(call, chat_id, from_chat_id=channel_id, message_id=message_ids[0]),)
+        # Удалённые сообщения Telegram пропускает, альбомы остаются альбомами
+        call = bot.forward_messages if method == FORWARD else bot.copy_messages
+        return await self._send(call, chat_id, cost=len(message_ids), from_chat_id=channel_id, message_ids=message_ids)
+    
+    async def _send_each(self, chat_id: int, posts: list) -> int:
+        """Отправка постов по одному; возвращает число отправленных"""
+        delivered = 0
+        for item in posts:
             try:
-                title = item['title'] or "Без заголовка"
-                text = item['text'] or "Нет текста"
-                message_id = item['message_id']
-                channel_id = item.get('channel_id')
-                media_files = item.get('media_files', [])
-                
-                caption = f"📝 <b>{title}</b>\n\n{text}"
-                
-                # Пытаемся переслать оригинальное сообщение только если есть channel_id
-                if channel_id:
-                    try:
-                        await self.application.bot.forward_message(
-                            chat_id=query.from_user.id,
-                            from_chat_id=channel_id,
-                            message_id=message_id
-                        )
-                        logger.info(f"✅ Переслан оригинальный пост {message_id} из канала {channel_id}")
-                        continue
-                    except Exception as forward_error:
-                        logger.warning(f"⚠️ Не удалось переслать пост {message_id}: {forward_error}")
-                        # Продолжаем с отправкой через file_id
-                
-                # Отправляем контент с медиафайлами
-                if media_files:
-                    logger.info(f"📤 Отправляю пост {item['id']} с {len(media_files)} медиафайлами")
-                    if len(media_files) > 1:
-                        # Отправляем как медиа-группу
-                        logger.info(f"   📱 Отправляю как медиа-группу: {len(media_files)} файлов")
-                        await self._send_media_group(query.from_user.id, media_files, caption)
-                    else:
-                        # Отправляем как одиночное медиа
-                        logger.info(f"   📱 Отправляю как одиночное медиа: {media_files[0]['media_type']}")
-                        await self._send_single_media(query.from_user.id, media_files[0], caption)
-                else:
-                    logger.info(f"📤 Отправляю пост {item['id']} без медиафайлов")
-                    # Отправляем только текст
-                    await self.application.bot.send_message(
-                        chat_id=query.from_user.id,
-                        text=caption,
-                        parse_mode='HTML'
-                    )
-                
-                # Небольшая задержка между постами
-                await asyncio.sleep(0.5)
-                
+                await self._send_post(chat_id, item)
             except Exception as e:
-                logger.error(f"Ошибка при отправке поста {item.get('id', 'unknown')}: {e}")
-                # Отправляем упрощенную версию поста
+                logger.error(f"❌ Пост {item.get('message_id', 'unknown')} не отправлен: {e}")
+            else:
+                delivered += 1
+        return delivered
+    
+    async def _send_batch(self, chat_id: int, method: str, posts: list) -> int:
+        """
+        Отправка нескольких постов канала одним запросом; возвращает число отправленных постов.
+        Если часть оригиналов удалена, Telegram молча пропускает их и не сообщает,
+        какие именно. Тогда доставленная часть пакета удаляется, а посты пакета
+        отправляются по одному тут же (удалённые — через file_id) и при следующих
+        просмотрах. При ошибке запроса посты тоже отправляются по одному.
+        """
+        channel_id = posts[0]['channel_id']
+        post_ids = [item['message_id'] for item in posts]
+        message_ids = [message_id for item in posts for message_id in self._source_message_ids(item)]
+        try:
+            sent = await self._forward_source(chat_id, channel_id, message_ids, method)
+        except RetryAfter:
+            raise
+        except Exception as e:
+            logger.warning(f"⚠️ Пакет постов {post_ids} из канала {channel_id} не доставлен ({method}): {e}")
+            self.forwarding.record_batch_failure(channel_id, post_ids, method, e)
+            return await self._send_each(chat_id, posts)
+        
+        if len(sent) < len(message_ids):
+            logger.warning(f"⚠️ Пакет постов {post_ids} из канала {channel_id} доставлен не полностью: "
+                           f"{len(sent)}/{len(message_ids)} сообщений, отправляю по одному")
+            self.forwarding.record_batch_shortfall(channel_id, post_ids)
+            await self._retract(chat_id, sent)
+            return await self._send_each(chat_id, posts)
+        
+        self.forwarding.record_batch_success(channel_id, method)
+        logger.debug("✅ %d постов из канала %s доставлены одним запросом (%s)", len(posts), channel_id, method)
+        return len(posts)
+    
+    async def _retract(self, chat_id: int, sent: Sequence):
+        """Удаление доставленной части неполного пакета перед отправкой постов по одному"""
+        if not sent:
+            return
+        try:
+            await self._send(self.application.bot.delete_messages, chat_id,
+                             message_ids=[message.message_id for message in sent])
+        except Exception as e:
+            logger.warning(f"⚠️ Не удалось удалить неполный пакет в чате {chat_id}, посты могут повториться: {e}")
+    
+    async def _send_post(self, chat_id: int, item: dict):
+        """Отправка одного поста: пересылка или копия оригинала, иначе медиа по file_id или текст"""
+        title = item['title'] or "Без заголовка"
+        text = item['text'] or "Нет текста"
+        channel_id = item.get('channel_id')
+        media_files = item.get('media_files', [])
+        # Подпись отправляется с parse_mode='HTML': текст поста экранируется
+        caption = f"📝 <b>{html.escape(title)}</b>\n\n{html.escape(text)}"
+        
+        # Подробности поста только для отладки: отправка — горячий путь
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("📤 Отправляю пост %s: медиафайлов %d, заголовок %.50s",
+                         item['message_id'], len(media_files), title)
+            for i, media in enumerate(media_files, 1):
+                logger.debug("   %d. %s: %.20s...", i, media['media_type'], media['media_file_id'])
+        
+        # Ошибки пересылки запоминаются в конце: неоднозначную ошибку (chat not found)
+        # можно отнести к каналу, только если получателю что-то удалось отправить
+        forward_errors = []
+        destination_ok = False
+        try:
+            # Пересылка или копия оригинала; способы, которые уже не сработали
+            # для этого канала или поста, стратегия пропускает
+            for method in self.forwarding.methods(channel_id, item['message_id']):
+                if method == MEDIA:
+                    break
                 try:
-                    await self.application.bot.send_message(
-                        chat_id=query.from_user.id,
-                        text=f"📝 <b>{item.get('title', 'Без заголовка')}</b>\n\n{item.get('text', 'Нет текста')}",
+                    # Альбом пересылается всеми частями, иначе дошла бы только первая
+                    message_ids = self._source_message_ids(item)
+                    sent = await self._forward_source(chat_id, channel_id, message_ids, method)
+                    if not sent:
+                        raise BadRequest("Message not found")
+                    destination_ok = True
+                    self.forwarding.record_success(channel_id, item['message_id'], method)
+                    logger.debug("✅ Пост %s из канала %s доставлен (%s)", item['message_id'], channel_id, method)
+                    return
+                except RetryAfter:
+                    raise
+                except Exception as forward_error:
+                    logger.warning(f"⚠️ Не удалось доставить пост {item['message_id']} ({method}): {forward_error}")
+                    forward_errors.append((method, forward_error))
+                    # Пробуем следующий способ, последний — отправка через file_id
+            
+            # Отправляем контент с медиафайлами
+            if media_files:
+                # Файлы с недавней ошибкой отправки пропускаем без запроса к API
+                validity = await self.db.get_media_validity([self._media_key(m) for m in media_files])
+                usable = [m for m in media_files if not self._media_known_bad(validity.get(self._media_key(m)))]
+                if not usable:
+                    logger.info(f"⏭️ Медиа поста {item['message_id']} недавно было недоступно, отправляю текст")
+                    await self._send(
+                        self.application.bot.send_message, chat_id,
+                        text=f"{caption}\n\n⚠️ Медиа недоступно",
                         parse_mode='HTML'
                     )
-                except Exception as simple_error:
-                    logger.error(f"Не удалось отправить упрощенную версию поста: {simple_error}")
-        
-        # Показываем кнопку "Назад" после отправки всех постов
-        await query.edit_message_text(
-            f"✅ Отправлено {len(content)} постов из категории '{category_name}'\n\n🔙 Используйте кнопку ниже для возврата в главное меню",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("🔙 Назад", callback_data="back_to_main")
-            ]])
-        )
+                # Если есть несколько медиафайлов, отправляем их группой
+                elif len(usable) > 1:
+                    await self._send_media_group(chat_id, usable, caption, validity)
+                else:
+                    # Один медиафайл
+                    await self._send_single_media(chat_id, usable[0], caption, validity)
+            else:
+                # Только текст
+                await self._send(
+                    self.application.bot.send_message, chat_id,
+                    text=caption,
+                    parse_mode='HTML'
+                )
+            destination_ok = True
+        except RetryAfter:
+            # Планировщик уже исчерпал повторы запроса
+            raise
+        except Exception as e:
+            logger.error(f"❌ Ошибка при отправке поста {item.get('message_id', 'unknown')}: {e}")
+            # Отправляем хотя бы текст
+            await self._send(
+                self.application.bot.send_message, chat_id,
+                text=f"{caption}\n\n⚠️ Ошибка при отправке медиа",
+                parse_mode='HTML'
+            )
+            destination_ok = True
+        finally:
+            for method, error in forward_errors:
+                self.forwarding.record_failure(channel_id, item['message_id'], method, error, destination_ok)
+    
+    @staticmethod
+    def _media_key(media: dict) -> str:
+        """Ключ файла в media_validity: file_unique_id, если известен, иначе file_id"""
+        return media.get('media_file_unique_id') or media['media_file_id']
+    
+    @staticmethod
+    def _media_known_bad(validity: Optional[dict]) -> bool:
+        """Последняя отправка файла не удалась, и с тех пор прошло меньше MEDIA_FAILURE_TTL"""
+        if not validity or not validity.get('last_failure_at'):
+            return False
+        if (validity.get('last_verified_at') or 0) > validity['last_failure_at']:
+            return False
+        return time.time() - validity['last_failure_at'] < MEDIA_FAILURE_TTL
     
-    async def _send_single_media(self, chat_id: int, media: dict, caption: str):
-        """Отправка одного медиафайла"""
+    async def _record_media_sent(self, media_files: list, validity: dict):
+        """Запись успешной отправки для файлов без свежей отметки о проверке"""
+        now = time.time()
+        keys = []
+        for media in media_files:
+            key = self._media_key(media)
+            known = validity.get(key)
+            if (known is None or known.get('failure_count')
+                    or now - (known.get('last_verified_at') or 0) >= MEDIA_VERIFY_INTERVAL):
+                keys.append(key)
+        if keys:
+            await self.db.record_media_results(keys, True)
+    
+    async def _record_media_failed(self, media_files: list, error: Exception):
+        """Запись ошибки отправки: файл не будет использоваться MEDIA_FAILURE_TTL секунд"""
+        await self.db.record_media_results([self._media_key(m) for m in media_files], False, str(error))
+    
+    async def _send_single_media(self, chat_id: int, media: dict, caption: str, validity: dict = None):
+        """
+        Отправка одного медиафайла сразу, без предварительного get_file.
+        BadRequest (файл удалён, неверный file_id) записывается в media_validity,
+        и пост уходит текстом.
+        """
         media_type = media['media_type']
         media_file_id = media['media_file_id']
         
         try:
-            # Проверяем доступность медиа
-            file_info = await self.application.bot.get_file(media_file_id)
-            if not file_info or not file_info.file_id:
-                raise Exception("Медиа недоступно")
-            
             if media_type == 'video':
-                await self.application.bot.send_video(
-                    chat_id=chat_id,
+                await self._send(
+                    self.application.bot.send_video, chat_id,
                     video=media_file_id,
                     caption=caption,
                     parse_mode='HTML'
                 )
             elif media_type == 'photo':
-                await self.application.bot.send_photo(
-                    chat_id=chat_id,
+                await self._send(
+                    self.application.bot.send_photo, chat_id,
                     photo=media_file_id,
                     caption=caption,
                     parse_mode='HTML'
                 )
             elif media_type == 'animation':
-                await self.application.bot.send_animation(
-                    chat_id=chat_id,
+                await self._send(
+                    self.application.bot.send_animation, chat_id,
                     animation=media_file_id,
                     caption=caption,
                     parse_mode='HTML'
                 )
             elif media_type == 'audio':
-                await self.application.bot.send_audio(
-                    chat_id=chat_id,
+                await self._send(
+                    self.application.bot.send_audio, chat_id,
                     audio=media_file_id,
                     caption=caption,
                     parse_mode='HTML'
                 )
             elif media_type == 'document':
-                await self.application.bot.send_document(
-                    chat_id=chat_id,
+                await self._send(
+                    self.application.bot.send_document, chat_id,
                     document=media_file_id,
                     caption=caption,
                     parse_mode='HTML'
                 )
             elif media_type == 'voice':
-                await self.application.bot.send_voice(
-                    chat_id=chat_id,
+                await self._send(
+                    self.application.bot.send_voice, chat_id,
                     voice=media_file_id,
                     caption=caption,
                     parse_mode='HTML'
                 )
             elif media_type == 'video_note':
-                await self.application.bot.send_video_note(
-                    chat_id=chat_id,
+                await self._send(
+                    self.application.bot.send_video_note, chat_id,
                     video_note=media_file_id
                 )
                 # Отправляем текст отдельно для video_note
-                await self.application.bot.send_message(
-                    chat_id=chat_id,
+                await self._send(
+                    self.application.bot.send_message, chat_id,
                     text=caption,
                     parse_mode='HTML'
                 )
             elif media_type == 'sticker':
-                await self.application.bot.send_sticker(
-                    chat_id=chat_id,
+                await self._send(
+                    self.application.bot.send_sticker, chat_id,
                     sticker=media_file_id
                 )
                 # Отправляем текст отдельно для стикеров
-                await self.application.bot.send_message(
-                    chat_id=chat_id,
+                await self._send(
+                    self.application.bot.send_message, chat_id,
                     text=caption,
                     parse_mode='HTML'
                 )
             else:
                 # Для других типов медиа отправляем только текст
-                await self.application.bot.send_message(
-                    chat_id=chat_id,
+                await self._send(
+                    self.application.bot.send_message, chat_id,
                     text=caption,
                     parse_mode='HTML'
                 )
+                return
+            
+            await self._record_media_sent([media], validity or {})
                 
+        except RetryAfter:
+            raise
         except Exception as e:
             logger.error(f"❌ Ошибка при отправке медиа {media_type}: {e}")
+            if is_media_error(e):
+                await self._record_media_failed([media], e)
+            if not caption:
+                return
             # Отправляем только текст
             try:
-                await self.application.bot.send_message(
-                    chat_id=chat_id,
+                await self._send(
+                    self.application.bot.send_message, chat_id,
                     text=f"{caption}\n\n⚠️ Медиа недоступно",
                     parse_mode='HTML'
                 )
-            except:
-                pass
+            except Exception as text_error:
+                logger.error(f"❌ Не удалось отправить текст вместо медиа {media_type}: {text_error}")
     
-    async def _send_media_group(self, chat_id: int, media_files: list, caption: str):
-        """Отправка группы медиафайлов"""
+    async def _send_media_group(self, chat_id: int, media_files: list, caption: str, validity: dict = None):
+        """
+        Отправка группы медиафайлов одним запросом.
+        По ошибке альбома нельзя понять, какой файл недоступен, поэтому при
+        ошибке файла (is_media_error) файлы отправляются по одному и результат
+        записывается для каждого; прочие ошибки не влияют на учёт файлов.
+        """
+        validity = validity or {}
+        sent_media = []
         try:
             from telegram import InputMediaPhoto, InputMediaVideo, InputMediaAnimation, InputMediaAudio, InputMediaDocument
             
@@ -501,14 +660,9 @@ class ContentBot:
             for media in media_files:
                 media_type = media['media_type']
                 media_file_id = media['media_file_id']
-                
-                # Проверяем доступность медиа
-                try:
-                    file_info = await self.application.bot.get_file(media_file_id)
-                    if not file_info or not file_info.file_id:
-                        continue
-                except:
+                if media_type not in ('photo', 'video', 'animation', 'audio', 'document'):
                     continue
+                sent_media.append(media)
                 
                 # Добавляем caption только к первому медиа
                 current_caption = caption if not caption_added else ""
@@ -546,23 +700,31 @@ class ContentBot:
                     ))
             
             if media_group:
-                await self.application.bot.send_media_group(
-                    chat_id=chat_id,
+                await self._send(
+                    self.application.bot.send_media_group, chat_id, cost=len(media_group),
                     media=media_group
                 )
+                await self._record_media_sent(sent_media, validity)
             else:
                 # Если ни одно медиа не доступно, отправляем только текст
-                await self.application.bot.send_message(
-                    chat_id=chat_id,
+                await self._send(
+                    self.application.bot.send_message, chat_id,
                     text=caption,
                     parse_mode='HTML'
                 )
                 
+        except RetryAfter:
+            raise
         except Exception as e:
+            if is_media_error(e):
+                logger.warning(f"⚠️ Медиа-группа не отправлена ({e}), отправляю файлы по одному")
+                for i, media in enumerate(sent_media):
+                    await self._send_single_media(chat_id, media, caption if i == 0 else "", validity)
+                return
             logger.error(f"❌ Ошибка при отправке медиа-группы: {e}")
             # Отправляем только текст
-            await self.application.bot.send_message(
-                chat_id=chat_id,
+            await self._send(
+                self.application.bot.send_message, chat_id,
                 text=caption,
                 parse_mode='HTML'
             )
@@ -583,6 +745,25 @@ class ContentBot:
         
         return InlineKeyboardMarkup(keyboard)
     
+    def create_page_keyboard(self, category: str, content: list, has_newer: bool, has_older: bool) -> InlineKeyboardMarkup:
+        """
+        Кнопки навигации по страницам категории.
+        В callback_data передаётся курсор: page:{категория}:{направление}:{id поста-якоря}
+        """
+        navigation = []
+        if has_newer:
+            navigation.append(InlineKeyboardButton(
+                "⬅️ Новее", callback_data=f"page:{category}:newer:{content[0]['id']}"
+            ))
+        if has_older:
+            navigation.append(InlineKeyboardButton(
+                "Старше ➡️", callback_data=f"page:{category}:older:{content[-1]['id']}"
+            ))
+        
+        keyboard = [navigation] if navigation else []
+        keyboard.append([InlineKeyboardButton("🔙 Назад", callback_data="back_to_main")])
+        return InlineKeyboardMarkup(keyboard)
+    
     def create_main_keyboard(self) -> ReplyKeyboardMarkup:
         """Создание основной клавиатуры с черным текстом для мобильных устройств"""
         keyboard = [
@@ -630,9 +811,9 @@ class ContentBot:
             await self.show_category_content_text(update, "other")
         elif text == "📊 СТАТИСТИКА":
             # Показываем актуальную статистику
-            self.db.update_all_stats()  # Обновляем статистику
-            stats = self.db.get_real_stats()  # Получаем актуальные данные
-            total_posts = self.db.get_total_posts_count()
+            # Счётчики категорий поддерживаются базой, пересчёт не нужен
+            stats = await self.db.get_real_stats()
+            total_posts = sum(stats.values())
             
             if not stats:
                 await update.message.reply_text("📊 Статистика пока недоступна.")
@@ -649,401 +830,166 @@ class ContentBot:
         else:
             await update.message.reply_text("❓ Используйте кнопки меню для навигации.")
     
-    async def get_posts_by_hashtag(self, hashtag: str, limit: int = 10) -> list:
-        """Получение постов с конкретным хештегом из канала"""
-        try:
-            logger.info(f"🔍 Ищу посты с хештегом {hashtag} в канале...")
-            
-            # Добавляем задержку перед запросом
-            await asyncio.sleep(1)
-            
-            posts_with_hashtag = []
-            
-            # Получаем через get_updates
-            try:
-                updates = await self.application.bot.get_updates(limit=100, timeout=5)
-                logger.info(f"📥 Получено {len(updates)} обновлений из Telegram")
-                
-                for update_item in updates:
-                    if update_item.channel_post and update_item.channel_post.chat.username == CHANNEL_USERNAME.replace('@', ''):
-                        message = update_item.channel_post
-                        
-                        # Извлекаем текст сообщения
-                        title, text = self.analyzer.extract_text_content(message)
-                        full_text = f"{title} {text}".lower()
-                        
-                        # Проверяем наличие хештега (различные варианты)
-                        hashtag_variants = [
-                            hashtag.lower(),
-                            hashtag.lower().replace('#', ''),
-                            hashtag.lower().replace('#', ' '),
-                            hashtag.lower().replace('#', '')
-                        ]
-                        
-                        found = False
-                        for variant in hashtag_variants:
-                            if variant in full_text:
-                                found = True
-                                break
-                        
-                        if found:
-                            posts_with_hashtag.append(message)
-                            logger.info(f"✅ Найден пост {message.message_id} с хештегом {hashtag}")
-                            if len(posts_with_hashtag) >= limit:
-                                break
-            except Exception as e:
-                logger.warning(f"❌ get_updates не работает: {e}")
-            
-            logger.info(f"📊 Найдено {len(posts_with_hashtag)} постов с хештегом {hashtag}")
-            return posts_with_hashtag
-        except Exception as e:
-            logger.error(f"❌ Ошибка при получении постов с хештегом {hashtag}: {e}")
-            return []
-    
     async def show_category_content_text(self, update: Update, category: str):
-        """Показать контент категории через сообщения от бота (с медиа, если есть)"""
-        # Сначала загружаем новые посты
-        await self.auto_load_new_posts()
-        
-        # Сначала пробуем получить контент с медиафайлами из таблицы post_media
-        content = self.db.get_content_with_media_files(category, limit=50)
-        
-        # Если не получилось, используем старый метод для получения постов
-        if not content:
-            logger.info(f"📁 Не удалось получить контент через get_content_with_media_files, используем старый метод")
-            content = self.db.get_content_by_category(category, limit=50)
-            
-            # Преобразуем старые посты в новый формат
-            for item in content:
-                media_type = item.get('media_type')
-                media_file_id = item.get('media_file_id')
-                
-                if media_type and media_file_id:
-                    # Создаем медиафайл в новом формате
-                    item['media_files'] = [{
-                        'media_type': media_type,
-                        'media_file_id': media_file_id,
-                        'media_order': 0
-                    }]
-                else:
-                    item['media_files'] = []
+        """Показать первую страницу категории через сообщения от бота (с медиа, если есть)"""
+        content, has_newer, has_older = await self.db.get_category_page(category, CATEGORY_PAGE_SIZE)
         
         category_name = self.analyzer.get_category_name(category)
         
         if not content:
-            # Если постов нет в базе, попробуем загрузить их из канала
+            # Категория отдаётся только из локальной базы: новые посты
+            # попадают туда через фоновую загрузку из канала
             await update.message.reply_text(
-                f"📁 Категория '{category_name}' пуста. Загружаю посты из канала..."
+                f"📁 Категория '{category_name}' пока пуста.\n\n💡 Пересылайте сообщения из каналов @nikitaFlooDed или Флудские ТРЕНИ для добавления контента."
             )
-            
-            # Определяем хештег для категории
-            hashtag_map = {
-                'challenges': '#челлендж',
-                'memes': '#мемы',
-                'power_results': '#результаты',
-                'sport_tips': '#советы',
-                'exercises': '#упражнения',
-                'flood': '#флуд',
-                'other': '#другое'
-            }
-            
-            hashtag = hashtag_map.get(category, f'#{category}')
-            
-            # Получаем посты с хештегом из канала
-            posts = await self.get_posts_by_hashtag(hashtag, limit=10)
-            
-            if posts:
-                await update.message.reply_text(
-                    f"✅ Найдено {len(posts)} постов с хештегом {hashtag} в канале"
-                )
-                
-                # Обрабатываем найденные посты
-                processed_count = 0
-                for message in posts:
-                    try:
-                        # Проверяем, не добавлен ли уже этот пост
-                        existing_post = self.db.get_content_by_message_id(message.message_id)
-                        if existing_post:
-                            continue
-                        
-                        # Извлекаем информацию о контенте
-                        title, text = self.analyzer.extract_text_content(message)
-                        media_type, media_file_id = self.analyzer.extract_media_info(message)
-                        media_group_id = getattr(message, 'media_group_id', None)
-                        
-                        # Получаем username канала
-                        channel_username = message.chat.username or CHANNEL_USERNAME.replace('@', '')
-                        
-                        # Сохраняем в базу данных
-                        success = self.db.add_content(
-                            message_id=message.message_id,
-                            channel_id=message.chat.id,
-                            channel_username=channel_username,
-                            category=category,
-                            title=title,
-                            text=text,
-                            media_type=media_type,
-                            media_file_id=media_file_id,
-                            media_group_id=media_group_id
-                        )
-                        
-                        if success:
-                            processed_count += 1
-                            
-                    except Exception as e:
-                        logger.error(f"❌ Ошибка при обработке поста {message.message_id}: {e}")
-                
-                if processed_count > 0:
-                    await update.message.reply_text(
-                        f"✅ Добавлено {processed_count} новых постов в категорию '{category_name}'"
-                    )
-                    # Повторно получаем контент после загрузки
-                    content = self.db.get_content_by_category(category, limit=50)
-                    
-                    # Преобразуем новые посты в новый формат
-                    for item in content:
-                        media_type = item.get('media_type')
-                        media_file_id = item.get('media_file_id')
-                        
-                        if media_type and media_file_id:
-                            # Создаем медиафайл в новом формате
-                            item['media_files'] = [{
-                                'media_type': media_type,
-                                'media_file_id': media_file_id,
-                                'media_order': 0
-                            }]
-                        else:
-                            item['media_files'] = []
-                else:
-                    await update.message.reply_text(
-                        f"❌ Не удалось добавить новые посты в категорию '{category_name}'"
-                    )
-                    return
+            return
+        
+        chat_id = update.message.chat.id
+        if not self.is_private_chat(chat_id):
+            logger.error(f"❌ Попытка отправить сообщение в канал/группу запрещена! chat_id={chat_id}")
+            await update.message.reply_text(
+                "❌ Ошибка: Бот не может отправлять сообщения в канал или группу.",
+                parse_mode='HTML'
+            )
+            return
         
         await update.message.reply_text(
-            f"📁 Категория: {category_name}\nНайдено постов: {len(content)}\n\nПоказываю посты..."
+            f"📁 Категория: {category_name}\nПостов на странице: {len(content)}\n\nПоказываю посты..."
         )
         
-        for item in content:
-            title = item['title'] or "Без заголовка"
-            text = item['text'] or "Нет текста"
-            channel_id = item.get('channel_id')
-            media_files = item.get('media_files', [])
-            caption = f"📝 <b>{title}</b>\n\n{text}"
-            
-            # Логируем информацию о посте для отладки
-            logger.info(f"📤 Отправляю пост {item['message_id']}:")
-            logger.info(f"   Медиафайлов: {len(media_files)}")
-            for i, media in enumerate(media_files, 1):
-                logger.info(f"   {i}. {media['media_type']}: {media['media_file_id'][:20]}...")
-            logger.info(f"   Заголовок: {title[:50]}...")
-            
-            chat_id = update.message.chat.id
-            if not self.is_private_chat(chat_id):
-                logger.error(f"❌ Попытка отправить сообщение в канал/группу запрещена! chat_id={chat_id}")
-                await update.message.reply_text(
-                    "❌ Ошибка: Бот не может отправлять сообщения в канал или группу.",
-                    parse_mode='HTML'
-                )
-                continue
-                
-            try:
-                # Пытаемся переслать оригинальное сообщение только если есть channel_id
-                if channel_id:
-                    try:
-                        await self.application.bot.forward_message(
-                            chat_id=chat_id,
-                            from_chat_id=channel_id,
-                            message_id=item['message_id']
-                        )
-                        logger.info(f"✅ Переслан оригинальный пост {item['message_id']} из канала {channel_id}")
-                        continue
-                    except Exception as forward_error:
-                        logger.warning(f"⚠️ Не удалось переслать пост {item['message_id']}: {forward_error}")
-                        # Продолжаем с отправкой через file_id
-                
-                # Отправляем контент с медиафайлами
-                if media_files:
-                    # Если есть несколько медиафайлов, отправляем их группой
-                    if len(media_files) > 1:
-                        await self._send_media_group(chat_id, media_files, caption)
-                    else:
-                        # Один медиафайл
-                        media = media_files[0]
-                        await self._send_single_media(chat_id, media, caption)
-                else:
-                    # Только текст
-                    await self.application.bot.send_message(
-                        chat_id=chat_id,
-                        text=caption,
-                        parse_mode='HTML'
-                    )
-                    
-            except Exception as e:
-                logger.error(f"❌ Ошибка при отправке поста {item.get('message_id', 'unknown')}: {e}")
-                # Отправляем хотя бы текст
-                try:
-                    await self.application.bot.send_message(
-                        chat_id=chat_id,
-                        text=f"{caption}\n\n⚠️ Ошибка при отправке медиа",
-                        parse_mode='HTML'
-                    )
-                except:
-                    pass
+        # Как и в show_category_content: от старых к новым
+        delivered = await self._deliver_posts(chat_id, content[::-1])
         
-        # Показываем клавиатуру снова после отправки всех постов
-        keyboard = self.create_main_keyboard()
+        # Навигация по страницам под отправленными постами
         await update.message.reply_text(
-            f"✅ Отправлено {len(content)} постов из категории '{category_name}'\n\n"
-            f"💡 Используйте кнопки меню для просмотра других категорий!",
-            reply_markup=keyboard
+            f"✅ Отправлено {delivered} постов из категории '{category_name}'\n\n"
+            f"💡 Листайте страницы кнопками ниже или выберите другую категорию в меню!",
+            reply_markup=self.create_page_keyboard(category, content, has_newer, has_older)
         )
     
     async def channel_message_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Обработчик сообщений из канала"""
+        """Обработчик сообщений из канала: пост передаётся фоновой загрузке"""
+        message = update.channel_post or update.message
+        
+        if not message:
+            logger.warning("❌ Сообщение из канала не найдено")
+            return
+        
+        logger.debug("📢 Получено сообщение из канала: %s (%s, @%s)",
+                     message.message_id, message.chat.title, message.chat.username)
+        
+        # Проверяем, что это сообщение из нужного канала
+        if message.chat.username != CHANNEL_USERNAME.replace('@', ''):
+            logger.info("⚠️ Сообщение не из целевого канала: %s != %s",
+                        message.chat.username, CHANNEL_USERNAME.replace('@', ''))
+            return
+
+        media_group_id = getattr(message, 'media_group_id', None)
+        if media_group_id:
+            # Части альбома сохраняются вместе, когда придут все
+            self.channel_groups.add(media_group_id, message)
+        else:
+            self.ingest_queue.put_nowait([message])
+    
+    async def _queue_channel_group(self, media_group_id: str, parts: list):
+        """Собранная медиа-группа из канала передаётся фоновой загрузке"""
+        logger.info(f"📱 Медиа-группа {media_group_id} собрана: {len(parts)} частей")
+        self.ingest_queue.put_nowait(parts)
+    
+    async def ingestion_worker(self):
+        """Фоновая задача: сохранение постов из канала в базу по очереди"""
+        while True:
+            parts = await self.ingest_queue.get()
+            try:
+                await self.ingest_channel_post(parts)
+            finally:
+                self.ingest_queue.task_done()
+    
+    def _build_post(self, parts: list, message_ids: list) -> dict:
+        """
+        Сборка поста из одного сообщения или всех частей медиа-группы.
+        Текст берётся из первой части с подписью, медиафайлы — из каждой части.
+        """
+        first = parts[0]
+        text_part = next((part for part in parts if part.text or part.caption), first)
+        title, text = self.analyzer.extract_text_content(text_part)
+        media_type, media_file_id = self.analyzer.extract_media_info(first)
+        media_group_id = getattr(first, 'media_group_id', None)
+        
+        media = []
+        if media_group_id:
+            for part, part_message_id in zip(parts, message_ids):
+                part_media = self.analyzer.extract_all_media_info(part)
+                if part_media:
+                    m_type, m_id = part_media[0]
+                    media.append((part_message_id, m_type, m_id))
+        
+        return {
+            'message_id': message_ids[0],
+            'title': title,
+            'text': text,
+            'media_type': media_type,
+            'media_file_id': media_file_id,
+            'media_group_id': media_group_id,
+            'media': media,
+            # Категоризация выполняется один раз на весь пост
+            'category': self.analyzer.categorize_content(text, title),
+            'hashtags': self.analyzer.extract_hashtags(f"{title} {text}"),
+        }
+    
+    async def _store_post(self, post: dict, channel_id: int, channel_username: str) -> Optional[dict]:
+        """Сохранение поста и его медиафайлов одной транзакцией"""
+        return await self.db.save_post_with_media(
+            message_id=post['message_id'],
+            channel_id=channel_id,
+            channel_username=channel_username,
+            category=post['category'],
+            title=post['title'],
+            text=post['text'],
+            media_type=post['media_type'],
+            media_file_id=post['media_file_id'],
+            media_group_id=post['media_group_id'],
+            media=post['media']
+        )
+    
+    async def ingest_channel_post(self, parts: list):
+        """Сохранение поста из канала (одного сообщения или медиа-группы) в базу данных"""
+        message = parts[0]
         try:
-            message = update.channel_post or update.message
-            
-            if not message:
-                logger.warning("❌ Сообщение из канала не найдено")
-                return
+            post = self._build_post(parts, [part.message_id for part in parts])
+            channel_username = message.chat.username or "unknown_channel"
             
-            logger.info(f"📢 Получено сообщение из канала: {message.message_id}")
-            logger.info(f"   Канал: {message.chat.title} (@{message.chat.username})")
-            logger.info(f"   Тип сообщения: {type(message).__name__}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("   📝 Заголовок: %.50s...", post['title'])
+                logger.debug("   📄 Текст: %.100s...", post['text'])
+                logger.debug("   🏷️ Хештеги: %s, категория: %s", post['hashtags'], post['category'])
+                logger.debug("   🎬 Медиа: %s, медиа-группа ID: %s", post['media_type'], post['media_group_id'])
             
-            # Проверяем, что это сообщение из нужного канала
-            if message.chat.username != CHANNEL_USERNAME.replace('@', ''):
-                logger.info(f"   ⚠️ Сообщение не из целевого канала: {message.chat.username} != {CHANNEL_USERNAME.replace('@', '')}")
+            saved = await self._store_post(post, message.chat.id, channel_username)
+            if not saved:
+                logger.error(f"❌ Ошибка при сохранении сообщения {message.message_id}")
                 return
             
-            logger.info(f"   ✅ Сообщение из целевого канала")
-            
-            # Проверяем медиа-группу
-            media_group_id = getattr(message, 'media_group_id', None)
-            
-            # Проверяем, не добавлен ли уже этот пост
-            existing_post = None
-            if media_group_id:
-                # Для медиа-группы проверяем по media_group_id
-                existing_post = self.db.get_content_by_media_group_id(media_group_id)
-                if existing_post:
-                    logger.info(f"📱 Медиа-группа {media_group_id} уже существует в базе данных")
-                    # НЕ возвращаемся - добавляем медиафайлы к существующему посту
-                    logger.info(f"   📱 Добавляю медиафайлы к существующему посту {existing_post['id']}")
-                else:
-                    logger.info(f"📱 Новая медиа-группа {media_group_id}")
-            else:
-                # Для обычного сообщения проверяем по message_id
-                existing_post = self.db.get_content_by_message_id(message.message_id)
-                if existing_post:
-                    logger.info(f"📱 Пост {message.message_id} уже существует в базе данных")
-                    return
-            
-            # Извлекаем информацию о контенте
-            title, text = self.analyzer.extract_text_content(message)
-            media_type, media_file_id = self.analyzer.extract_media_info(message)
-            
-            # Извлекаем хештеги для логирования
-            hashtags = self.analyzer.extract_hashtags(f"{title} {text}")
-            
-            # Категоризируем контент
-            category = self.analyzer.categorize_content(text, title)
-            
-            # ВАЖНО: Если это медиа-группа и у нас есть существующий пост,
-            # используем категорию существующего поста для сохранения целостности
-            if media_group_id and existing_post:
-                category = existing_post['category']
-                logger.info(f"📱 Использую категорию существующего поста: {category}")
-            
-            # Получаем username канала
-            channel_username = message.chat.username or "unknown_channel"
-            
-            logger.info(f"   📝 Заголовок: {title[:50]}...")
-            logger.info(f"   📄 Текст: {text[:100]}...")
-            logger.info(f"   🏷️ Хештеги: {hashtags}")
-            logger.info(f"   📁 Категория: {category}")
-            logger.info(f"   🎬 Медиа: {media_type}")
-            logger.info(f"   📱 Медиа-группа ID: {media_group_id}")
-            
-            # Сохраняем в базу данных
-            success = True
-            content_id = None
+            if not saved['created'] and not saved['media_added']:
+                logger.info(f"📱 Пост {message.message_id} уже существует в базе данных")
+                return
             
-            if existing_post and media_group_id:
-                # Пост уже существует для медиа-группы, используем его ID
-                content_id = existing_post['id']
-                logger.info(f"📱 Использую существующий пост {content_id} для медиа-группы")
+            if not saved['created']:
+                action_text = f"добавлены медиафайлы ({saved['media_added']}) к посту"
+            elif post['media_group_id']:
+                action_text = f"создан новый пост с медиа-группой ({saved['media_added']} медиафайлов)"
             else:
-                # Создаем новый пост
-                success = self.db.add_content(
-                    message_id=message.message_id,
-                    channel_id=message.chat.id,
-                    channel_username=channel_username,
-                    category=category,
-                    title=title,
-                    text=text,
-                    media_type=media_type,
-                    media_file_id=media_file_id,
-                    media_group_id=media_group_id
-                )
-                
-                if success:
-                    # Получаем ID созданного поста
-                    if media_group_id:
-                        content = self.db.get_content_by_media_group_id(media_group_id)
-                    else:
-                        content = self.db.get_content_by_message_id(message.message_id)
-                    
-                    if content:
-                        content_id = content['id']
-                        logger.info(f"📱 Создан новый пост {content_id}")
-                    else:
-                        logger.error(f"❌ Не удалось получить ID созданного поста")
-                        success = False
-                else:
-                    logger.error(f"❌ Не удалось создать новый пост")
+                action_text = "добавлен пост"
             
-            # Если это медиа-группа, добавляем все медиафайлы
-            if media_group_id and success and content_id:
-                # Извлекаем все медиа из группы
-                all_media = self.analyzer.extract_all_media_info(message)
-                logger.info(f"   📊 Добавляю {len(all_media)} медиафайлов в группу")
-                
-                for i, (m_type, m_id) in enumerate(all_media, 1):
-                    try:
-                        # Проверяем доступность каждого медиафайла
-                        file_info = await self.application.bot.get_file(m_id)
-                        if file_info and file_info.file_id:
-                            # Добавляем медиафайл в базу данных
-                            self.db.add_media_to_post(content_id, message.message_id, m_type, m_id, i)
-                            logger.info(f"   ✅ Добавлен медиафайл {i}: {m_type} - {m_id[:20]}...")
-                        else:
-                            logger.warning(f"   ⚠️ Медиафайл {i} недоступен: {m_type}")
-                    except Exception as e:
-                        logger.warning(f"   ⚠️ Ошибка при добавлении медиафайла {i}: {e}")
-            
-            if success:
-                category_name = self.analyzer.get_category_name(category)
-                hashtags_str = " ".join(hashtags) if hashtags else "без хештегов"
-                
-                if media_group_id and existing_post:
-                    action_text = "добавлены медиафайлы к посту"
-                elif media_group_id:
-                    action_text = "создан новый пост с медиа-группой"
-                else:
-                    action_text = "добавлен пост"
-                
-                logger.info(f"✅ {action_text} {message.message_id} из канала {channel_username} в категорию '{category_name}' (хештеги: {hashtags_str})")
-            else:
-                logger.error(f"❌ Ошибка при сохранении сообщения {message.message_id}")
+            category_name = self.analyzer.get_category_name(saved['category'])
+            hashtags_str = " ".join(post['hashtags']) if post['hashtags'] else "без хештегов"
+            logger.info(f"✅ {action_text} {message.message_id} из канала {channel_username} в категорию '{category_name}' (хештеги: {hashtags_str})")
                 
         except Exception as e:
             logger.error(f"❌ Ошибка при обработке сообщения из канала: {e}")
-            if message:
-                logger.error(f"   ID сообщения: {message.message_id}")
-                logger.error(f"   Текст: {getattr(message, 'text', 'Нет текста')}")
-                logger.error(f"   Канал: {getattr(message.chat, 'username', 'Нет username')}")
+            logger.error(f"   ID сообщения: {message.message_id}")
+            logger.error(f"   Текст: {getattr(message, 'text', 'Нет текста')}")
+            logger.error(f"   Канал: {getattr(message.chat, 'username', 'Нет username')}")
     
     async def forwarded_message_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик пересланных сообщений из канала с улучшенной обработкой медиа"""
@@ -1063,7 +1009,6 @@ class ContentBot:
             channel = message.forward_origin.chat
             channel_username = getattr(channel, 'username', None)
             channel_title = getattr(channel, 'title', None)
-            orig_message_id = message.forward_origin.message_id
 
             # Проверяем, что сообщение из разрешенных каналов
             allowed_channels = ['nikitaFlooDed', 'Флудские ТРЕНИ']
@@ -1087,182 +1032,79 @@ class ContentBot:
                 )
                 return
 
-            # Проверяем медиа-группу
             media_group_id = getattr(message, 'media_group_id', None)
-
-            # Проверяем, не добавлен ли уже этот пост
-            existing_post = None
-            if media_group_id:
-                # Для медиа-группы проверяем по media_group_id
-                existing_post = self.db.get_content_by_media_group_id(media_group_id)
-                if existing_post:
-                    logger.info(f"📱 Медиа-группа {media_group_id} уже существует в базе данных")
-                    # НЕ возвращаемся - добавляем медиафайлы к существующему посту
-                    logger.info(f"   📱 Добавляю медиафайлы к существующему посту {existing_post['id']}")
-                else:
-                    logger.info(f"📱 Новая медиа-группа {media_group_id}")
-            else:
-                # Для обычного сообщения проверяем по message_id
-                existing_post = self.db.get_content_by_message_id(orig_message_id)
-                if existing_post:
-                    logger.info(f"📱 Пост {orig_message_id} уже существует в базе данных")
-                    await message.reply_text("✅ Этот пост уже добавлен в базу данных.")
-                    return
-
-            # Извлекаем данные
-            title, text = self.analyzer.extract_text_content(message)
-            media_type, media_file_id = self.analyzer.extract_media_info(message)
-            
-            # Подробное логирование для отладки
-            logger.info(f"📱 Пересланное сообщение {orig_message_id} из канала {channel_username or channel_title}:")
-            logger.info(f"   Медиа тип: {media_type}")
-            logger.info(f"   Медиа file_id: {media_file_id}")
-            logger.info(f"   Медиа-группа ID: {media_group_id}")
-            logger.info(f"   Заголовок: {title[:50]}...")
-            logger.info(f"   Текст: {text[:100]}...")
-            
-            # Дополнительная информация о медиа-группе
             if media_group_id:
-                logger.info(f"   📱 Медиа-группа ID: {media_group_id}")
-                # Извлекаем все медиа из группы для анализа
-                all_media = self.analyzer.extract_all_media_info(message)
-                logger.info(f"   📊 Всего медиа в группе: {len(all_media)}")
-                for i, (m_type, m_id) in enumerate(all_media, 1):
-                    logger.info(f"   {i}. {m_type}: {m_id[:20]}...")
-
-            # Проверяем доступность медиа с улучшенной обработкой
-            media_available = False
-            if media_type and media_file_id:
-                try:
-                    # Пробуем получить информацию о файле для проверки доступности
-                    if media_type in ['video', 'photo', 'animation', 'audio', 'document', 'voice', 'video_note', 'sticker']:
-                        file_info = await self.application.bot.get_file(media_file_id)
-                        if file_info and file_info.file_id:
-                            media_available = True
-                            logger.info(f"   ✅ Медиа доступно: {file_info.file_id}")
-                        else:
-                            logger.warning(f"   ⚠️ Медиа недоступно: file_info пустой")
-                            media_file_id = None
-                    else:
-                        logger.info(f"   ⚠️ Неизвестный тип медиа: {media_type}")
-                        media_file_id = None
-                except Exception as e:
-                    logger.warning(f"   ⚠️ Медиа недоступно: {e}")
-                    media_file_id = None  # Сбрасываем file_id если он недоступен
-            elif media_type and not media_file_id:
-                logger.info(f"   ⚠️ Медиа {media_type} есть, но file_id отсутствует")
-            else:
-                logger.info(f"   ℹ️ Медиа нет")
-                            
-            # Категоризируем контент
-            category = self.analyzer.categorize_content(text, title)
-            
-            # ВАЖНО: Если это медиа-группа и у нас есть существующий пост,
-            # используем категорию существующего поста для сохранения целостности
-            if media_group_id and existing_post:
-                category = existing_post['category']
-                logger.info(f"📱 Использую категорию существующего поста: {category}")
-                            
-            # Получаем username канала
-            channel_username = channel_username or channel_title or "unknown_channel"
-                                
-            # Сохраняем в базу данных только если это новый пост
-            success = True
-            content_id = None
-            
-            if existing_post and media_group_id:
-                # Пост уже существует для медиа-группы, используем его ID
-                content_id = existing_post['id']
-                logger.info(f"📱 Использую существующий пост {content_id} для медиа-группы")
+                # Части пересланного альбома сохраняются вместе, когда придут все
+                self.forwarded_groups.add((message.chat.id, media_group_id), message)
             else:
-                # Создаем новый пост
-                success = self.db.add_content(
-                    message_id=orig_message_id,
-                    channel_id=channel.id,
-                    channel_username=channel_username,
-                    category=category,
-                    title=title,
-                    text=text,
-                    media_type=media_type,
-                    media_file_id=media_file_id,
-                    media_group_id=media_group_id
-                )
-                
-                if success:
-                    # Получаем ID созданного поста
-                    if media_group_id:
-                        content = self.db.get_content_by_media_group_id(media_group_id)
-                    else:
-                        content = self.db.get_content_by_message_id(orig_message_id)
-                    
-                    if content:
-                        content_id = content['id']
-                        logger.info(f"📱 Создан новый пост {content_id}")
-                    else:
-                        logger.error(f"❌ Не удалось получить ID созданного поста")
-                        success = False
-                else:
-                    logger.error(f"❌ Не удалось создать новый пост")
-            
-            # Если это медиа-группа, добавляем все медиафайлы
-            if media_group_id and success and content_id:
-                # Извлекаем все медиа из группы
-                all_media = self.analyzer.extract_all_media_info(message)
-                logger.info(f"   📊 Добавляю {len(all_media)} медиафайлов в группу")
-                
-                for i, (m_type, m_id) in enumerate(all_media, 1):
-                    try:
-                        # Проверяем доступность каждого медиафайла
-                        file_info = await self.application.bot.get_file(m_id)
-                        if file_info and file_info.file_id:
-                            # Добавляем медиафайл в базу данных
-                            self.db.add_media_to_post(content_id, orig_message_id, m_type, m_id, i)
-                            logger.info(f"   ✅ Добавлен медиафайл {i}: {m_type} - {m_id[:20]}...")
-                        else:
-                            logger.warning(f"   ⚠️ Медиафайл {i} недоступен: {m_type}")
-                    except Exception as e:
-                        logger.warning(f"   ⚠️ Ошибка при добавлении медиафайла {i}: {e}")
-                                
-            if success:
-                category_name = self.analyzer.get_category_name(category)
-                if media_type and media_file_id and media_available:
-                    media_status = f"{media_type} (доступно)"
-                elif media_type and media_file_id:
-                    media_status = f"{media_type} (проверка не удалась)"
-                elif media_type:
-                    media_status = f"{media_type} (file_id отсутствует)"
-                else:
-                    media_status = "нет"
-                    
-                if media_group_id and existing_post:
-                    # Медиафайлы добавлены к существующему посту
-                    group_info = f"\n📱 Медиафайлы добавлены к существующему посту с медиа-группой: {media_group_id}"
-                    action_text = "добавлены медиафайлы к посту"
-                elif media_group_id:
-                    # Создан новый пост с медиа-группой
-                    group_info = f"\n📱 Создан новый пост с медиа-группой: {media_group_id}"
-                    action_text = "создан новый пост"
-                else:
-                    # Обычный пост
-                    group_info = ""
-                    action_text = "добавлен пост"
-                    
-                await message.reply_text(
-                    f"✅ {action_text} в категорию '{category_name}'{group_info}\n\n"
-                    f"📝 Заголовок: {title[:100]}...\n"
-                    f"📊 Категория: {category_name}\n"
-                    f"🎬 Медиа: {media_status}\n"
-                    f"⏰ Время: {datetime.now().strftime('%H:%M')}"
-                )
-                logger.info(f"✅ {action_text} {orig_message_id} в категорию '{category_name}'")
-            else:
-                await message.reply_text("❌ Ошибка при добавлении сообщения в базу данных.")
-                logger.error(f"❌ Ошибка при добавлении поста {orig_message_id}")
+                await self._save_forwarded_post([message])
                 
         except Exception as e:
             logger.error(f"❌ Ошибка в обработчике пересланных сообщений: {e}")
             await message.reply_text("❌ Произошла ошибка при обработке сообщения.")
     
+    async def _save_forwarded_group(self, group_key: tuple, parts: list):
+        """Сохранение собранной пересланной медиа-группы"""
+        logger.info(f"📱 Пересланная медиа-группа {group_key[1]} собрана: {len(parts)} частей")
+        try:
+            await self._save_forwarded_post(parts)
+        except Exception as e:
+            logger.error(f"❌ Ошибка в обработчике пересланных сообщений: {e}")
+            await parts[0].reply_text("❌ Произошла ошибка при обработке сообщения.")
+    
+    async def _save_forwarded_post(self, parts: list):
+        """Сохранение пересланного поста (одного сообщения или медиа-группы) с ответом пользователю"""
+        message = parts[0]
+        channel = message.forward_origin.chat
+        channel_username = getattr(channel, 'username', None) or getattr(channel, 'title', None) or "unknown_channel"
+        post = self._build_post(parts, [part.forward_origin.message_id for part in parts])
+        orig_message_id = post['message_id']
+        
+        # Подробное логирование для отладки
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("📱 Пересланное сообщение %s из канала %s:", orig_message_id, channel_username)
+            logger.debug("   Медиа тип: %s, медиа-группа ID: %s (частей: %d)",
+                         post['media_type'], post['media_group_id'], len(parts))
+            logger.debug("   Заголовок: %.50s...", post['title'])
+            logger.debug("   Текст: %.100s...", post['text'])
+        
+        saved = await self._store_post(post, channel.id, channel_username)
+        if not saved:
+            await message.reply_text("❌ Ошибка при добавлении сообщения в базу данных.")
+            logger.error(f"❌ Ошибка при добавлении поста {orig_message_id}")
+            return
+        
+        if not saved['created'] and not saved['media_added']:
+            logger.info(f"📱 Пост {orig_message_id} уже существует в базе данных")
+            await message.reply_text("✅ Этот пост уже добавлен в базу данных.")
+            return
+        
+        if not saved['created']:
+            # Медиафайлы добавлены к существующему посту
+            group_info = f"\n📱 Медиафайлы добавлены к существующему посту с медиа-группой: {post['media_group_id']}"
+            action_text = "добавлены медиафайлы к посту"
+        elif post['media_group_id']:
+            group_info = f"\n📱 Создан новый пост с медиа-группой: {post['media_group_id']}"
+            action_text = "создан новый пост"
+        else:
+            group_info = ""
+            action_text = "добавлен пост"
+        
+        if post['media']:
+            media_status = f"{len(post['media'])} медиафайлов"
+        else:
+            media_status = post['media_type'] or "нет"
+        
+        category_name = self.analyzer.get_category_name(saved['category'])
+        await message.reply_text(
+            f"✅ {action_text} в категорию '{category_name}'{group_info}\n\n"
+            f"📝 Заголовок: {post['title'][:100]}...\n"
+            f"📊 Категория: {category_name}\n"
+            f"🎬 Медиа: {media_status}\n"
+            f"⏰ Время: {datetime.now().strftime('%H:%M')}"
+        )
+        logger.info(f"✅ {action_text} {orig_message_id} в категорию '{category_name}'")
+    
     async def error_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработчик ошибок"""
         logger.error(f"❌ Ошибка при обработке обновления: {context.error}")
@@ -1272,104 +1114,81 @@ class ContentBot:
                 "❌ Произошла ошибка при обработке запроса. Попробуйте позже."
             )
     
-    async def load_all_posts_on_startup(self):
-        """Загрузка всех постов из канала при запуске бота"""
-        try:
-            logger.info("🚀 Запуск загрузки постов из канала при старте бота...")
-            
-            # Ждем немного, чтобы бот полностью запустился
-            await asyncio.sleep(5)
-            
-            # Проверяем доступ к каналу
-            try:
-                chat = await self.application.bot.get_chat(CHANNEL_USERNAME)
-                logger.info(f"✅ Канал найден: {chat.title}, ID: {chat.id}")
-                
-                # Проверяем права бота
-                try:
-                    member = await self.application.bot.get_chat_member(CHANNEL_USERNAME, self.application.bot.id)
-                    logger.info(f"👤 Права бота: {member.status}")
-                    
-                    if member.status not in ['administrator', 'member']:
-                        logger.warning(f"❌ Бот не имеет прав в канале: {member.status}")
-                        return
-                        
-                except Exception as e:
-                    logger.warning(f"❌ Не удалось проверить права бота: {e}")
-                    return
-                
-                # Пытаемся получить сообщения из канала через get_updates
-                messages = []
-                try:
-                    logger.info("📥 Получаю сообщения из канала...")
-                    updates = await self.application.bot.get_updates(limit=100, timeout=1)
-                    for update_item in updates:
-                        if update_item.channel_post and update_item.channel_post.chat.username == CHANNEL_USERNAME.replace('@', ''):
-                            messages.append(update_item.channel_post)
-                    logger.info(f"✅ Получено {len(messages)} сообщений из канала")
-                except Exception as e:
-                    logger.warning(f"❌ Не удалось получить сообщения: {e}")
-                    return
-                
-                if messages:
-                    processed_count = 0
-                    for message in messages:
-                        try:
-                            # Проверяем, не добавлен ли уже этот пост
-                            existing_post = self.db.get_content_by_message_id(message.message_id)
-                            if existing_post:
-                                logger.info(f"Пост {message.message_id} уже существует в базе")
-                                continue
-                            
-                            # Извлекаем информацию о контенте
-                            title, text = self.analyzer.extract_text_content(message)
-                            media_type, media_file_id = self.analyzer.extract_media_info(message)
-                            
-                            # Категоризируем контент
-                            category = self.analyzer.categorize_content(text, title)
-                            
-                            # Получаем username канала
-                            channel_username = message.chat.username or CHANNEL_USERNAME.replace('@', '')
-                            
-                            # Сохраняем в базу данных
-                            success = self.db.add_content(
-                                message_id=message.message_id,
-                                channel_id=message.chat.id,
-                                channel_username=channel_username,
-                                category=category,
-                                title=title,
-                                text=text,
-                                media_type=media_type,
-                                media_file_id=media_file_id
-                            )
-                            
-                            if success:
-                                category_name = self.analyzer.get_category_name(category)
-                                logger.info(f"✅ Сообщение {message.message_id} добавлено в категорию '{category_name}'")
-                                processed_count += 1
-                                
-                        except Exception as e:
-                            logger.error(f"❌ Ошибка при обработке сообщения {message.message_id}: {e}")
-                    
-                    logger.info(f"✅ При запуске обработано {processed_count} постов из канала")
-                else:
-                    logger.warning("❌ Не удалось получить сообщения из канала при запуске")
-                    
-            except Exception as e:
-                logger.error(f"❌ Ошибка при доступе к каналу при запуске: {e}")
-                
-        except Exception as e:
-            logger.error(f"❌ Общая ошибка при загрузке постов при запуске: {e}")
-    
     def run(self):
-        """Запуск бота с простой структурой"""
+        """Запуск бота: webhook, если задан WEBHOOK_URL, иначе long polling"""
+        setup_logging(LOG_LEVEL, LOG_JSON, parse_levels(LOG_LEVELS))
         logger.info("🚀 Запуск Fitness Content Sorter Bot...")
-        
-        # Запускаем бота напрямую через run_polling
-        self.application.run_polling(
-            allowed_updates=Update.ALL_TYPES,
-            drop_pending_updates=True
-        )
+        try:
+            asyncio.run(self.serve())
+        finally:
+            stop_logging()
+
+    async def serve(self):
+        """
+        Работа бота и HTTP-сервера в одном цикле событий до SIGINT/SIGTERM.
+        Порядок запуска и остановки повторяет Application.run_polling.
+        Webhook регистрируется последним, когда приложение обрабатывает
+        обновления и сервер уже слушает порт: иначе первые обновления
+        Telegram получил бы отказ в соединении.
+        """
+        app = self.application
+        webhook_mode = bool(WEBHOOK_URL)
+        if webhook_mode:
+            check_webhook_secret(WEBHOOK_SECRET, WEBHOOK_ALLOW_NO_SECRET)
+        server = None
+        if webhook_mode or WEB_PORT:
+            server = WebhookServer(
+                app,
+                webhook_path=WEBHOOK_PATH if webhook_mode else None,
+                secret_token=WEBHOOK_SECRET,
+                status_provider=self.get_status
+            )
+
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop_event.set)
+            except NotImplementedError:
+                # Windows: остановка по Ctrl+C через KeyboardInterrupt
+                pass
+
+        await app.initialize()
+        try:
+            if app.post_init:
+                await app.post_init(app)
+            if not webhook_mode:
+                await app.updater.start_polling(
+                    allowed_updates=Update.ALL_TYPES,
+                    drop_pending_updates=True
+                )
+                logger.info("🔄 Получение обновлений через long polling")
+            await app.start()
+            if server:
+                await server.start(port=WEB_PORT or 8080)
+            if webhook_mode:
+                webhook_url = WEBHOOK_URL.rstrip('/') + WEBHOOK_PATH
+                await app.bot.set_webhook(
+                    url=webhook_url,
+                    secret_token=WEBHOOK_SECRET,
+                    allowed_updates=Update.ALL_TYPES,
+                    drop_pending_updates=True
+                )
+                logger.info(f"🔗 Webhook установлен: {webhook_url}")
+            await stop_event.wait()
+        finally:
+            logger.info("🛑 Остановка бота...")
+            if server:
+                await server.stop()
+            if app.updater.running:
+                await app.updater.stop()
+            if app.running:
+                await app.stop()
+            if app.post_stop:
+                await app.post_stop(app)
+            await app.shutdown()
+            if app.post_shutdown:
+                await app.post_shutdown(app)
 
 if __name__ == "__main__":
     bot = ContentBot()
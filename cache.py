@@ -0,0 +1,111 @@
+import threading
+import time
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import Any, Dict, Hashable, Iterable, Optional, Set
+
+# Метка записей, зависящих от всех категорий сразу (выборки без фильтра по категории)
+ALL_CATEGORIES = '*'
+
+
+def freeze(value: Any) -> Any:
+    """Неизменяемый снимок: списки и кортежи — кортежи, словари — MappingProxyType"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+class QueryCache:
+    """
+    LRU-кэш результатов запросов с ограничением времени жизни.
+    Каждая запись помечается категориями, от которых зависит; запись
+    в категорию сбрасывает только её записи (и записи с меткой ALL_CATEGORIES).
+    Значения хранятся неизменяемыми снимками (см. freeze) и выдаются без
+    копирования: попадание в кэш не зависит от размера страницы.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # Номер поколения растёт при каждом сбросе: результат, прочитанный
+        # до сброса, не попадёт в кэш после него
+        self.generation = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._tags: Dict[str, Set[Hashable]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Неизменяемый снимок из кэша или None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, tags: Iterable[str], generation: int = None) -> Any:
+        """
+        Сохранение неизменяемого снимка значения с метками категорий; снимок возвращается.
+        generation — значение self.generation до чтения из базы; если с тех пор
+        был сброс, значение могло устареть и не сохраняется.
+        """
+        value = freeze(value)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return value
+            if key in self._entries:
+                self._remove(key)
+            tags = tuple(tags)
+            self._entries[key] = (time.monotonic() + self.ttl, value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+        return value
+
+    def _remove(self, key: Hashable):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def invalidate(self, *categories: Optional[str]):
+        """Сброс записей указанных категорий и записей, зависящих от всех категорий"""
+        with self._lock:
+            self.generation += 1
+            self.invalidations += 1
+            for tag in set(categories) | {ALL_CATEGORIES}:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+
+    def clear(self):
+        """Полный сброс кэша"""
+        with self._lock:
+            self.generation += 1
+            self.invalidations += 1
+            self._entries.clear()
+            self._tags.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """Счётчики попаданий и промахов"""
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / requests if requests else 0.0,
+                'invalidations': self.invalidations,
+                'entries': len(self._entries),
+            }
@@ -38,4 +38,51 @@ CATEGORY_HASHTAGS = {
     'exercises': ['#упражнение', '#упражнения', '#тренировка', '#подход', '#повтор'],
     'flood': ['#флудщина', '#флуд', '#спам', '#много'],
     'other': []
-} 
\ No newline at end of file
+} 
+
+# Вес хештега при категоризации (по умолчанию DEFAULT_HASHTAG_WEIGHT)
+DEFAULT_HASHTAG_WEIGHT = 2
+HASHTAG_WEIGHTS = {
+    # '#результаты': 3,
+}
+
+# Количество постов на одной странице категории
+CATEGORY_PAGE_SIZE = 5
+
+# HTTP-сервер и режим webhook.
+# Если задан WEBHOOK_URL (на Render подставляется RENDER_EXTERNAL_URL), обновления
+# приходят на WEBHOOK_URL + WEBHOOK_PATH, иначе бот использует long polling.
+WEBHOOK_URL = os.getenv('WEBHOOK_URL') or os.getenv('RENDER_EXTERNAL_URL')
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/webhook')
+# Секрет, который Telegram передаёт в заголовке X-Telegram-Bot-Api-Secret-Token
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')
+# Без WEBHOOK_SECRET бот в режиме webhook не запускается: адрес webhook публичный,
+# и обновления мог бы прислать кто угодно. WEBHOOK_ALLOW_NO_SECRET=1 разрешает запуск без проверки.
+WEBHOOK_ALLOW_NO_SECRET = os.getenv('WEBHOOK_ALLOW_NO_SECRET', '').lower() in ('1', 'true', 'yes', 'on')
+# Порт HTTP-сервера (/, /health, /status, webhook); без PORT в режиме polling сервер не запускается
+WEB_PORT = int(os.getenv('PORT', '0')) or None
+# Сколько обновлений обрабатывается одновременно (сообщения одного чата — всегда по очереди)
+UPDATE_CONCURRENCY = int(os.getenv('UPDATE_CONCURRENCY', '8'))
+
+# Доступность медиафайлов: после ошибки отправки файл не используется
+# MEDIA_FAILURE_TTL секунд (пост уходит текстом), затем пробуем снова.
+# Успешная отправка записывается не чаще раза в MEDIA_VERIFY_INTERVAL секунд.
+MEDIA_FAILURE_TTL = 6 * 60 * 60
+MEDIA_VERIFY_INTERVAL = 24 * 60 * 60
+
+# Логирование: уровень, формат (text или json) и уровни отдельных модулей,
+# например LOG_LEVELS="database=WARNING,content_analyzer=DEBUG,httpx=WARNING"
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_JSON = os.getenv('LOG_FORMAT', 'text').lower() == 'json'
+LOG_LEVELS = os.getenv('LOG_LEVELS', 'httpx=WARNING')
+
+# Администраторы бота (через запятую): им доступна команда /profile
+ADMIN_IDS = {int(user_id) for user_id in os.getenv('ADMIN_IDS', '').split(',') if user_id.strip()}
+
+# Профилирование запросов (см. profiling): PROFILE=1 включает его при запуске,
+# на ходу — командой /profile on|off. Хранятся PROFILE_KEEP самых медленных профилей;
+# PROFILE_SAMPLE — доля профилируемых запросов (cProfile заметно замедляет бота).
+PROFILE_ENABLED = os.getenv('PROFILE', '').lower() in ('1', 'true', 'yes', 'on')
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', '20'))
+PROFILE_SAMPLE = float(os.getenv('PROFILE_SAMPLE', '1.0'))
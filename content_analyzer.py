@@ -1,81 +1,214 @@
 import re
 import logging
-from typing import Dict, List, Tuple
-from config import CATEGORY_KEYWORDS, CATEGORIES, CATEGORY_HASHTAGS
+import importlib
+from multiprocessing import Pool
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+import config
+from config import CATEGORY_KEYWORDS, CATEGORIES, CATEGORY_HASHTAGS, HASHTAG_WEIGHTS, DEFAULT_HASHTAG_WEIGHT
 
 logger = logging.getLogger(__name__)
 
+HASHTAG_PATTERN = re.compile(r'#\w+')
+
+
+class CategorizationResult(NamedTuple):
+    """
+    Результат категоризации: выбранная категория и баллы всех категорий
+    на этапе, который определил выбор (хештеги или ключевые слова)
+    """
+    category: str
+    scores: Dict[str, int]
+
+
+# Анализатор процесса-исполнителя для categorize_many(processes=...)
+_worker_analyzer = None
+
+
+def _init_worker(categories, category_keywords, category_hashtags, hashtag_weights, default_hashtag_weight):
+    """Создание анализатора в процессе-исполнителе с настройками родителя"""
+    global _worker_analyzer
+    _worker_analyzer = ContentAnalyzer()
+    _worker_analyzer.categories = categories
+    _worker_analyzer.category_keywords = category_keywords
+    _worker_analyzer.category_hashtags = category_hashtags
+    _worker_analyzer.hashtag_weights = hashtag_weights
+    _worker_analyzer.default_hashtag_weight = default_hashtag_weight
+    _worker_analyzer._build_keyword_matcher()
+    _worker_analyzer._build_hashtag_index()
+
+
+def _categorize_in_worker(item) -> CategorizationResult:
+    return _worker_analyzer._categorize_item(item)
+
+
 class ContentAnalyzer:
     def __init__(self):
         self.category_keywords = CATEGORY_KEYWORDS
         self.categories = CATEGORIES
         self.category_hashtags = CATEGORY_HASHTAGS
+        self.hashtag_weights = HASHTAG_WEIGHTS
+        self.default_hashtag_weight = DEFAULT_HASHTAG_WEIGHT
+        self._build_keyword_matcher()
+        self._build_hashtag_index()
+    
+    def reload_config(self):
+        """
+        Перечитывание категорий, ключевых слов и хештегов из config.py
+        с пересборкой индексов
+        """
+        importlib.reload(config)
+        self.category_keywords = config.CATEGORY_KEYWORDS
+        self.categories = config.CATEGORIES
+        self.category_hashtags = config.CATEGORY_HASHTAGS
+        self.hashtag_weights = config.HASHTAG_WEIGHTS
+        self.default_hashtag_weight = config.DEFAULT_HASHTAG_WEIGHT
+        self._build_keyword_matcher()
+        self._build_hashtag_index()
+        logger.info("🔄 Конфигурация категорий перезагружена")
+    
+    def _build_hashtag_index(self):
+        """
+        Сборка обратного индекса: хештег -> {категория: вес}.
+        Категоризация по хештегам занимает время, пропорциональное числу хештегов в тексте.
+        """
+        self._hashtag_index = {}
+        for category, hashtags in self.category_hashtags.items():
+            for hashtag in hashtags:
+                weight = self.hashtag_weights.get(hashtag, self.default_hashtag_weight)
+                category_weights = self._hashtag_index.setdefault(hashtag, {})
+                category_weights[category] = category_weights.get(category, 0) + weight
+        # Порядок категорий для разрешения равенства баллов
+        self._hashtag_category_order = {category: i for i, category in enumerate(self.category_hashtags)}
+    
+    def _build_keyword_matcher(self):
+        """
+        Сборка единого регулярного выражения по всем ключевым словам.
+        Один проход по тексту находит совпадения сразу для всех категорий.
+        """
+        # Ключевое слово может относиться к нескольким категориям
+        self._keyword_categories = {}
+        for category, keywords in self.category_keywords.items():
+            for keyword in keywords:
+                self._keyword_categories.setdefault(keyword, []).append(category)
+        
+        if self._keyword_categories:
+            # Длинные слова раньше коротких, чтобы «советы» не терялись за «совет»
+            alternatives = sorted(self._keyword_categories, key=len, reverse=True)
+            self._keyword_pattern = re.compile(
+                r'\b(?:' + '|'.join(re.escape(keyword) for keyword in alternatives) + r')\b'
+            )
+        else:
+            self._keyword_pattern = None
     
     def categorize_content(self, text: str, title: str = "") -> str:
         """
         Автоматическая категоризация контента на основе хештегов и ключевых слов
         """
+        return self.score_content(text, title).category
+    
+    def score_content(self, text: str, title: str = "") -> CategorizationResult:
+        """
+        Категоризация с баллами по всем категориям.
+        Хештеги имеют приоритет: если они дали категорию, возвращаются их баллы,
+        иначе — баллы по ключевым словам.
+        """
+        empty_scores = dict.fromkeys(self.categories, 0)
         if not text and not title:
-            return 'other'
+            return CategorizationResult('other', empty_scores)
         
         # Объединяем текст и заголовок для анализа
         full_text = f"{title} {text}".lower()
         
         # Сначала проверяем хештеги (приоритет выше)
-        hashtag_category = self._categorize_by_hashtags(full_text)
-        if hashtag_category:
-            return hashtag_category
+        hashtag_scores = self._hashtag_scores(full_text)
+        if hashtag_scores:
+            category = self._best_hashtag_category(hashtag_scores)
+            return CategorizationResult(category, {**empty_scores, **hashtag_scores})
         
         # Затем проверяем ключевые слова
-        keyword_category = self._categorize_by_keywords(full_text)
-        if keyword_category:
-            return keyword_category
+        keyword_scores = self._keyword_scores(full_text)
+        if keyword_scores:
+            category = max(keyword_scores, key=keyword_scores.get)
+            return CategorizationResult(category, {**empty_scores, **keyword_scores})
         
-        return 'other'
+        return CategorizationResult('other', empty_scores)
     
-    def _categorize_by_hashtags(self, text: str) -> str:
+    def categorize_many(self, items: Iterable[Union[str, Tuple[str, str]]],
+                        processes: Optional[int] = None,
+                        chunksize: int = 256) -> Iterator[CategorizationResult]:
         """
-        Категоризация по хештегам (высший приоритет)
+        Пакетная категоризация.
+        items — тексты или пары (text, title). Результаты отдаются по мере
+        готовности в порядке входных данных. При processes > 1 работа
+        распределяется по пулу процессов (для больших загрузок истории).
         """
-        # Ищем все хештеги в тексте
-        hashtags = re.findall(r'#\w+', text)
+        if not processes or processes <= 1:
+            for item in items:
+                yield self._categorize_item(item)
+            return
         
-        if not hashtags:
-            return None
+        initargs = (self.categories, self.category_keywords, self.category_hashtags,
+                    self.hashtag_weights, self.default_hashtag_weight)
+        with Pool(processes, initializer=_init_worker, initargs=initargs) as pool:
+            yield from pool.imap(_categorize_in_worker, items, chunksize)
+    
+    def _categorize_item(self, item: Union[str, Tuple[str, str]]) -> CategorizationResult:
+        """Категоризация одного элемента categorize_many"""
+        if isinstance(item, str):
+            return self.score_content(item)
+        text, title = item
+        return self.score_content(text, title)
+    
+    def _hashtag_scores(self, text: str) -> Dict[str, int]:
+        """Баллы категорий по хештегам (только ненулевые)"""
+        # Ищем все хештеги в тексте
+        hashtags = HASHTAG_PATTERN.findall(text)
         
-        # Подсчитываем совпадения хештегов для каждой категории
+        # Подсчитываем вес хештегов для каждой категории по обратному индексу
         category_scores = {}
         
-        for category, category_hashtags in self.category_hashtags.items():
-            score = 0
-            for hashtag in hashtags:
-                if hashtag in category_hashtags:
-                    score += 2  # Хештеги имеют больший вес
-            if score > 0:
-                category_scores[category] = score
+        for hashtag in hashtags:
+            for category, weight in self._hashtag_index.get(hashtag, {}).items():
+                category_scores[category] = category_scores.get(category, 0) + weight
+        
+        return {category: score for category, score in category_scores.items() if score > 0}
+    
+    def _keyword_scores(self, text: str) -> Dict[str, int]:
+        """Баллы категорий по ключевым словам (только ненулевые, в порядке конфига)"""
+        if self._keyword_pattern is None:
+            return {}
+        
+        category_scores = dict.fromkeys(self.category_keywords, 0)
+        
+        # Ищем точные совпадения слов за один проход по тексту
+        for match in self._keyword_pattern.finditer(text):
+            for category in self._keyword_categories[match.group()]:
+                category_scores[category] += 1
+        
+        return {category: score for category, score in category_scores.items() if score > 0}
+    
+    def _categorize_by_hashtags(self, text: str) -> str:
+        """
+        Категоризация по хештегам (высший приоритет)
+        """
+        category_scores = self._hashtag_scores(text)
         
         # Возвращаем категорию с наивысшим баллом
         if category_scores:
-            return max(category_scores, key=category_scores.get)
+            return self._best_hashtag_category(category_scores)
         
         return None
     
+    def _best_hashtag_category(self, category_scores: Dict[str, int]) -> str:
+        """Категория с наивысшим баллом (при равенстве — идущая раньше в конфиге)"""
+        order = self._hashtag_category_order
+        return max(category_scores, key=lambda category: (category_scores[category], -order[category]))
+    
     def _categorize_by_keywords(self, text: str) -> str:
         """
         Категоризация по ключевым словам
         """
-        category_scores = {}
-        
-        for category, keywords in self.category_keywords.items():
-            score = 0
-            for keyword in keywords:
-                # Ищем точные совпадения слов
-                pattern = r'\b' + re.escape(keyword) + r'\b'
-                matches = re.findall(pattern, text)
-                score += len(matches)
-            
-            if score > 0:
-                category_scores[category] = score
+        category_scores = self._keyword_scores(text)
         
         # Возвращаем категорию с наивысшим баллом
         if category_scores:
@@ -87,7 +220,7 @@ class ContentAnalyzer:
         """
         Извлечение всех хештегов из текста
         """
-        return re.findall(r'#\w+', text.lower())
+        return HASHTAG_PATTERN.findall(text.lower())
     
     def extract_media_info(self, message) -> Tuple[str, str]:
         """
@@ -101,7 +234,7 @@ class ContentAnalyzer:
             # Проверяем различные типы медиа в порядке приоритета
             if hasattr(message, 'media_group_id') and message.media_group_id:
                 # Это часть медиа-группы - обрабатываем как единое целое
-                logger.info(f"📱 Найдена медиа-группа: {message.media_group_id}")
+                logger.debug("📱 Найдена медиа-группа: %s", message.media_group_id)
                 # Возвращаем тип основного медиа из группы
                 if hasattr(message, 'photo') and message.photo:
                     media_type = 'photo'
@@ -112,42 +245,42 @@ class ContentAnalyzer:
                 elif hasattr(message, 'animation') and message.animation:
                     media_type = 'animation'
                     media_file_id = message.animation.file_id
-                logger.info(f"📸 Медиа из группы: {media_type} - {media_file_id}")
+                logger.debug("📸 Медиа из группы: %s - %s", media_type, media_file_id)
             elif hasattr(message, 'photo') and message.photo:
                 # Обычное фото (может быть несколько в одном сообщении)
                 media_type = 'photo'
                 media_file_id = message.photo[-1].file_id  # Берем самое качественное фото
-                logger.info(f"📸 Найдено фото: {media_file_id}")
+                logger.debug("📸 Найдено фото: %s", media_file_id)
             elif hasattr(message, 'video') and message.video:
                 media_type = 'video'
                 media_file_id = message.video.file_id
-                logger.info(f"🎥 Найдено видео: {media_file_id}")
+                logger.debug("🎥 Найдено видео: %s", media_file_id)
             elif hasattr(message, 'animation') and message.animation:
                 media_type = 'animation'
                 media_file_id = message.animation.file_id
-                logger.info(f"🎬 Найдена анимация: {media_file_id}")
+                logger.debug("🎬 Найдена анимация: %s", media_file_id)
             elif hasattr(message, 'audio') and message.audio:
                 media_type = 'audio'
                 media_file_id = message.audio.file_id
-                logger.info(f"🎵 Найдено аудио: {media_file_id}")
+                logger.debug("🎵 Найдено аудио: %s", media_file_id)
             elif hasattr(message, 'document') and message.document:
                 media_type = 'document'
                 media_file_id = message.document.file_id
-                logger.info(f"📄 Найден документ: {media_file_id}")
+                logger.debug("📄 Найден документ: %s", media_file_id)
             elif hasattr(message, 'voice') and message.voice:
                 media_type = 'voice'
                 media_file_id = message.voice.file_id
-                logger.info(f"🎤 Найдено голосовое: {media_file_id}")
+                logger.debug("🎤 Найдено голосовое: %s", media_file_id)
             elif hasattr(message, 'video_note') and message.video_note:
                 media_type = 'video_note'
                 media_file_id = message.video_note.file_id
-                logger.info(f"📹 Найдено видео-сообщение: {media_file_id}")
+                logger.debug("📹 Найдено видео-сообщение: %s", media_file_id)
             elif hasattr(message, 'sticker') and message.sticker:
                 media_type = 'sticker'
                 media_file_id = message.sticker.file_id
-                logger.info(f"😀 Найден стикер: {media_file_id}")
+                logger.debug("😀 Найден стикер: %s", media_file_id)
             else:
-                logger.info("📝 Медиа не найдено")
+                logger.debug("📝 Медиа не найдено")
                 
         except Exception as e:
             logger.error(f"❌ Ошибка при извлечении медиа: {e}")
@@ -168,45 +301,45 @@ class ContentAnalyzer:
             if hasattr(message, 'photo') and message.photo:
                 # Берем только самое качественное фото
                 media_list.append(('photo', message.photo[-1].file_id))
-                logger.info(f"📸 Добавлено фото: {message.photo[-1].file_id}")
+                logger.debug("📸 Добавлено фото: %s", message.photo[-1].file_id)
             
             # Проверяем видео
             if hasattr(message, 'video') and message.video:
                 media_list.append(('video', message.video.file_id))
-                logger.info(f"🎥 Добавлено видео: {message.video.file_id}")
+                logger.debug("🎥 Добавлено видео: %s", message.video.file_id)
             
             # Проверяем анимацию
             if hasattr(message, 'animation') and message.animation:
                 media_list.append(('animation', message.animation.file_id))
-                logger.info(f"🎬 Добавлена анимация: {message.animation.file_id}")
+                logger.debug("🎬 Добавлена анимация: %s", message.animation.file_id)
             
             # Проверяем аудио
             if hasattr(message, 'audio') and message.audio:
                 media_list.append(('audio', message.audio.file_id))
-                logger.info(f"🎵 Добавлено аудио: {message.audio.file_id}")
+                logger.debug("🎵 Добавлено аудио: %s", message.audio.file_id)
             
             # Проверяем документ
             if hasattr(message, 'document') and message.document:
                 media_list.append(('document', message.document.file_id))
-                logger.info(f"📄 Добавлен документ: {message.document.file_id}")
+                logger.debug("📄 Добавлен документ: %s", message.document.file_id)
             
             # Проверяем голосовое
             if hasattr(message, 'voice') and message.voice:
                 media_list.append(('voice', message.voice.file_id))
-                logger.info(f"🎤 Добавлено голосовое: {message.voice.file_id}")
+                logger.debug("🎤 Добавлено голосовое: %s", message.voice.file_id)
             
             # Проверяем видео-сообщение
             if hasattr(message, 'video_note') and message.video_note:
                 media_list.append(('video_note', message.video_note.file_id))
-                logger.info(f"📹 Добавлено видео-сообщение: {message.video_note.file_id}")
+                logger.debug("📹 Добавлено видео-сообщение: %s", message.video_note.file_id)
             
             # Проверяем стикер
             if hasattr(message, 'sticker') and message.sticker:
                 media_list.append(('sticker', message.sticker.file_id))
-                logger.info(f"😀 Добавлен стикер: {message.sticker.file_id}")
+                logger.debug("😀 Добавлен стикер: %s", message.sticker.file_id)
             
             if not media_list:
-                logger.info("📝 Медиа не найдено")
+                logger.debug("📝 Медиа не найдено")
                 
         except Exception as e:
             logger.error(f"❌ Ошибка при извлечении всех медиа: {e}")
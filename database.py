@@ -1,167 +1,263 @@
 import sqlite3
 import json
+import logging
 import time
+import threading
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import Any, Callable, List, Dict, Mapping, Optional, Sequence, Tuple
+
+from cache import ALL_CATEGORIES, QueryCache
+from migrations import run_migrations
+from text_search import build_match_query
+
+logger = logging.getLogger(__name__)
+
+# Настройки соединения с SQLite
+CONNECTION_TIMEOUT = 60.0
+CACHED_STATEMENTS = 256  # размер кэша подготовленных выражений на соединение
+CACHE_SIZE_KIB = 16384  # размер страничного кэша (PRAGMA cache_size, в КиБ)
+MMAP_SIZE = 64 * 1024 * 1024
+SEARCH_CANDIDATES = 2000  # сколько самых новых совпадений ранжируется при поиске
+MAX_QUERY_PARAMS = 900  # параметров в одном IN (...), с запасом до лимита SQLite
+READ_CACHE_SIZE = 512  # страниц категорий в кэше чтения
+READ_CACHE_TTL = 300.0  # секунды; ограничивает устаревание при записи в базу извне
 
 class Database:
     def __init__(self, db_path: str = "content_bot.db"):
         self.db_path = db_path
+        # Долгоживущие соединения: по одному на поток
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        # Снимок счётчиков категорий: ((соединение, data_version, total_changes), статистика)
+        self._stats_cache = None
+        # Кэш страниц категорий; записи сбрасываются при изменении своей категории
+        self.cache = QueryCache(READ_CACHE_SIZE, READ_CACHE_TTL)
         self.init_database()
-        # Дополнительно инициализируем таблицу для медиафайлов
-        self.init_media_table()
-    
+
+    def _open_connection(self) -> sqlite3.Connection:
+        """Открытие и настройка нового соединения с базой данных"""
+        conn = sqlite3.connect(
+            self.db_path,
+            cached_statements=CACHED_STATEMENTS,
+            check_same_thread=False
+        )
+        # Занятая другим соединением база ожидается до CONNECTION_TIMEOUT, без ошибки "database is locked"
+        conn.execute(f'PRAGMA busy_timeout={int(CONNECTION_TIMEOUT * 1000)}')
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA cache_size=-{CACHE_SIZE_KIB}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        conn.execute(f'PRAGMA mmap_size={MMAP_SIZE}')
+        return conn
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """
+        Получение соединения текущего потока.
+        Соединение создаётся один раз и переиспользуется, вместе с ним
+        переиспользуются и подготовленные выражения. Используется как
+        контекстный менеджер: `with` фиксирует или откатывает транзакцию,
+        но не закрывает соединение.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._open_connection()
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self):
+        """Закрытие всех открытых соединений"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except Exception as e:
+                logger.error(f"Ошибка при закрытии соединения: {e}")
+        self._local = threading.local()
+
     def init_database(self):
-        """Инициализация базы данных"""
+        """Инициализация базы данных: применение миграций схемы"""
         try:
-            with sqlite3.connect(self.db_path, timeout=30.0) as conn:
+            with self._get_connection() as conn:
+                applied = run_migrations(conn)
+                if applied:
+                    logger.info(f"✅ Схема базы данных обновлена до версии {applied[-1]}")
+        except Exception as e:
+            logger.error(f"Ошибка при инициализации базы данных: {e}")
+    
+    def add_content(self, message_id: int, channel_id: int, category: str, 
+                   title: str = "", text: str = "", media_type: str = None, 
+                   media_file_id: str = None, media_file_unique_id: str = None, 
+                   channel_username: str = None, media_group_id: str = None) -> bool:
+        """
+        Добавление нового контента в базу данных.
+        Если базу держит другое соединение, запрос ждёт снятия блокировки
+        (PRAGMA busy_timeout в _open_connection), а не повторяется в цикле.
+        """
+        try:
+            with self._get_connection() as conn:
                 cursor = conn.cursor()
                 
-                # Проверяем, существует ли таблица content
-                cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='content'")
-                table_exists = cursor.fetchone() is not None
-                
-                if table_exists:
-                    # Проверяем, есть ли колонка media_file_unique_id
-                    cursor.execute("PRAGMA table_info(content)")
-                    columns = [column[1] for column in cursor.fetchall()]
-                    
-                    if 'media_file_unique_id' not in columns:
-                        # Добавляем новую колонку
-                        cursor.execute('ALTER TABLE content ADD COLUMN media_file_unique_id TEXT')
-                        print("✅ Добавлена колонка media_file_unique_id в таблицу content")
-                    
-                    if 'media_group_id' not in columns:
-                        # Добавляем новую колонку
-                        cursor.execute('ALTER TABLE content ADD COLUMN media_group_id TEXT')
-                        print("✅ Добавлена колонка media_group_id в таблицу content")
+                # Проверяем, существует ли уже пост с таким message_id или media_group_id
+                existing_content = None
+                if media_group_id:
+                    cursor.execute('''
+                        SELECT id, message_id, category FROM content 
+                        WHERE media_group_id = ? OR message_id = ?
+                    ''', (media_group_id, message_id))
+                    existing_content = cursor.fetchone()
                 else:
-                    # Создаем новую таблицу с поддержкой media_file_unique_id
                     cursor.execute('''
-                        CREATE TABLE IF NOT EXISTS content (
-                            id INTEGER PRIMARY KEY AUTOINCREMENT,
-                            message_id INTEGER UNIQUE,
-                            channel_id INTEGER,
-                            channel_username TEXT,
-                            category TEXT,
-                            title TEXT,
-                            text TEXT,
-                            media_type TEXT,
-                            media_file_id TEXT,
-                            media_file_unique_id TEXT,
-                            media_group_id TEXT,
-                            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                        )
-                    ''')
-                    print("✅ Создана таблица content с поддержкой media_file_unique_id")
+                        SELECT id, message_id, category FROM content 
+                        WHERE message_id = ?
+                    ''', (message_id,))
+                    existing_content = cursor.fetchone()
                 
-                # Таблица для хранения статистики
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS stats (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        category TEXT,
-                        count INTEGER DEFAULT 0,
-                        last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
+                if existing_content:
+                    # Обновляем существующий пост
+                    content_id = existing_content[0]
+                    cursor.execute('''
+                        UPDATE content 
+                        SET channel_id = ?, channel_username = ?, category = ?, 
+                            title = ?, text = ?, media_type = ?, media_file_id = ?, 
+                            media_file_unique_id = ?, media_group_id = ?
+                        WHERE id = ?
+                    ''', (channel_id, channel_username, category, title, text, 
+                          media_type, media_file_id, media_file_unique_id, media_group_id, content_id))
+                else:
+                    # Создаем новый пост
+                    cursor.execute('''
+                        INSERT INTO content 
+                        (message_id, channel_id, channel_username, category, title, text, 
+                         media_type, media_file_id, media_file_unique_id, media_group_id)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ''', (message_id, channel_id, channel_username, category, title, text, 
+                          media_type, media_file_id, media_file_unique_id, media_group_id))
                 
+                # Счётчики категорий обновляются триггерами в той же транзакции
                 conn.commit()
-                
+                old_category = existing_content[2] if existing_content else None
+                self.cache.invalidate(category, old_category)
+                return True
         except Exception as e:
-            print(f"Ошибка при инициализации базы данных: {e}")
-    
-    def add_content(self, message_id: int, channel_id: int, category: str, 
-                   title: str = "", text: str = "", media_type: str = None, 
-                   media_file_id: str = None, media_file_unique_id: str = None, 
-                   channel_username: str = None, media_group_id: str = None) -> bool:
-        """Добавление нового контента в базу данных"""
-        max_retries = 10
-        for attempt in range(max_retries):
-            try:
-                with sqlite3.connect(self.db_path, timeout=60.0) as conn:
-                    cursor = conn.cursor()
-                    
-                    # Проверяем, существует ли уже пост с таким message_id или media_group_id
-                    existing_content = None
-                    if media_group_id:
-                        cursor.execute('''
-                            SELECT id, message_id FROM content 
-                            WHERE media_group_id = ? OR message_id = ?
-                        ''', (media_group_id, message_id))
-                        existing_content = cursor.fetchone()
-                    else:
-                        cursor.execute('''
-                            SELECT id, message_id FROM content 
-                            WHERE message_id = ?
-                        ''', (message_id,))
-                        existing_content = cursor.fetchone()
-                    
-                    if existing_content:
-                        # Обновляем существующий пост
-                        content_id = existing_content[0]
-                        cursor.execute('''
-                            UPDATE content 
-                            SET channel_id = ?, channel_username = ?, category = ?, 
-                                title = ?, text = ?, media_type = ?, media_file_id = ?, 
-                                media_file_unique_id = ?, media_group_id = ?
-                            WHERE id = ?
-                        ''', (channel_id, channel_username, category, title, text, 
-                              media_type, media_file_id, media_file_unique_id, media_group_id, content_id))
-                    else:
-                        # Создаем новый пост
-                        cursor.execute('''
-                            INSERT INTO content 
-                            (message_id, channel_id, channel_username, category, title, text, 
-                             media_type, media_file_id, media_file_unique_id, media_group_id)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        ''', (message_id, channel_id, channel_username, category, title, text, 
-                              media_type, media_file_id, media_file_unique_id, media_group_id))
-                    
-                    conn.commit()
-                    
-                    # Обновляем статистику в отдельном соединении
-                    try:
-                        self.update_stats(category)
-                    except Exception as e:
-                        print(f"Предупреждение: не удалось обновить статистику: {e}")
-                    
-                    return True
-            except sqlite3.OperationalError as e:
-                if "database is locked" in str(e) and attempt < max_retries - 1:
-                    print(f"База данных заблокирована, попытка {attempt + 1}/{max_retries}")
-                    import time
-                    time.sleep(2)  # Увеличиваем время ожидания
-                    continue
-                else:
-                    print(f"Ошибка при добавлении контента: {e}")
-                    return False
-            except Exception as e:
-                print(f"Ошибка при добавлении контента: {e}")
-                return False
-        return False
+            logger.error(f"Ошибка при добавлении контента: {e}")
+            return False
     
-    def get_content_by_category(self, category: str, limit: int = 10) -> List[Dict]:
-        """Получение контента по категории"""
+    def upsert_posts(self, batch: List[Dict]) -> int:
+        """
+        Пакетное добавление или обновление постов вместе с медиафайлами в одной транзакции.
+        Элемент batch — словарь с полями add_content (message_id, channel_id, category, title, ...)
+        и необязательным 'media': [(message_id, media_type, media_file_id), ...] по порядку.
+        Посты сопоставляются по message_id; уже сохранённые части медиа не дублируются.
+        Возвращает количество записанных постов.
+        """
+        if not batch:
+            return 0
+        
+        posts = [(
+            post['message_id'], post.get('channel_id'), post.get('channel_username'), post['category'],
+            post.get('title', ""), post.get('text', ""), post.get('media_type'), post.get('media_file_id'),
+            post.get('media_file_unique_id'), post.get('media_group_id')
+        ) for post in batch]
+        
         try:
-            with sqlite3.connect(self.db_path, timeout=30.0) as conn:
+            with self._get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT * FROM content 
-                    WHERE category = ? 
-                    ORDER BY created_at ASC 
-                    LIMIT ?
-                ''', (category, limit))
+                cursor.execute('BEGIN IMMEDIATE')
+                cursor.executemany('''
+                    INSERT INTO content
+                    (message_id, channel_id, channel_username, category, title, text,
+                     media_type, media_file_id, media_file_unique_id, media_group_id)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(message_id) DO UPDATE SET
+                        channel_id = excluded.channel_id,
+                        channel_username = excluded.channel_username,
+                        category = excluded.category,
+                        title = excluded.title,
+                        text = excluded.text,
+                        media_type = excluded.media_type,
+                        media_file_id = excluded.media_file_id,
+                        media_file_unique_id = excluded.media_file_unique_id,
+                        media_group_id = excluded.media_group_id
+                ''', posts)
                 
-                columns = [description[0] for description in cursor.description]
-                return [dict(zip(columns, row)) for row in cursor.fetchall()]
+                with_media = [post for post in batch if post.get('media')]
+                if with_media:
+                    # id постов для привязки медиафайлов
+                    content_ids = {}
+                    message_ids = [post['message_id'] for post in with_media]
+                    for start in range(0, len(message_ids), MAX_QUERY_PARAMS):
+                        chunk = message_ids[start:start + MAX_QUERY_PARAMS]
+                        placeholders = ','.join('?' * len(chunk))
+                        cursor.execute(
+                            f'SELECT message_id, id FROM content WHERE message_id IN ({placeholders})', chunk
+                        )
+                        content_ids.update(cursor.fetchall())
+                    
+                    media_rows = [
+                        (content_ids[post['message_id']], part_message_id, media_type, media_file_id, order,
+                         content_ids[post['message_id']], part_message_id)
+                        for post in with_media
+                        for order, (part_message_id, media_type, media_file_id) in enumerate(post['media'])
+                    ]
+                    cursor.executemany('''
+                        INSERT INTO post_media (content_id, message_id, media_type, media_file_id, media_order)
+                        SELECT ?, ?, ?, ?, ?
+                        WHERE NOT EXISTS (
+                            SELECT 1 FROM post_media WHERE content_id = ? AND message_id = ?
+                        )
+                    ''', media_rows)
         except Exception as e:
-            print(f"Ошибка при получении контента по категории: {e}")
-            return []
+            logger.error(f"Ошибка при пакетном сохранении постов: {e}")
+            return 0
+        # Пакет может менять категории многих постов — кэш сбрасывается целиком
+        self.cache.clear()
+        return len(batch)
+    
+    def _cached_read(self, key: tuple, tags: tuple, fetch: Callable[[], Any], error_message: str, default: Any):
+        """
+        Чтение через кэш: при промахе результат fetch() сохраняется с метками категорий.
+        Результат всегда неизменяемый снимок (кортежи и MappingProxyType), общий для всех вызовов.
+        """
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        generation = self.cache.generation
+        try:
+            result = fetch()
+        except Exception as e:
+            logger.error(f"{error_message}: {e}")
+            return default
+        return self.cache.set(key, result, tags, generation)
+    
+    def get_content_by_category(self, category: str, limit: int = 10) -> Sequence[Mapping]:
+        """Получение контента по категории"""
+        return self._cached_read(
+            ('content_by_category', category, limit), (category,),
+            lambda: self._fetch_content_by_category(category, limit),
+            "Ошибка при получении контента по категории", ()
+        )
+    
+    def _fetch_content_by_category(self, category: str, limit: int) -> List[Dict]:
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT * FROM content 
+                WHERE category = ? 
+                ORDER BY created_at ASC 
+                LIMIT ?
+            ''', (category, limit))
+            
+            columns = [description[0] for description in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
     
     def get_content_by_message_id(self, message_id: int) -> Optional[Dict]:
         """Получение контента по message_id"""
         try:
-            with sqlite3.connect(self.db_path, timeout=30.0) as conn:
+            with self._get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT * FROM content 
@@ -174,13 +270,13 @@ class Database:
                     return dict(zip(columns, row))
                 return None
         except Exception as e:
-            print(f"Ошибка при получении контента по message_id: {e}")
+            logger.error(f"Ошибка при получении контента по message_id: {e}")
             return None
     
     def get_all_categories(self) -> List[str]:
         """Получение всех категорий с количеством контента"""
         try:
-            with sqlite3.connect(self.db_path, timeout=30.0) as conn:
+            with self._get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT category, COUNT(*) as count 
@@ -190,13 +286,66 @@ class Database:
                 ''')
                 return cursor.fetchall()
         except Exception as e:
-            print(f"Ошибка при получении категорий: {e}")
+            logger.error(f"Ошибка при получении категорий: {e}")
             return []
     
-    def search_content(self, query: str, limit: int = 10) -> List[Dict]:
-        """Поиск контента по тексту"""
+    def has_full_text_search(self) -> bool:
+        """Проверка наличия полнотекстового индекса content_fts"""
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='content_fts'")
+                return cursor.fetchone() is not None
+        except Exception as e:
+            logger.error(f"Ошибка при проверке полнотекстового индекса: {e}")
+            return False
+    
+    def search_content(self, query: str, limit: int = 10, stemming: bool = True) -> List[Dict]:
+        """
+        Полнотекстовый поиск контента.
+        Результаты упорядочены по релевантности (bm25, заголовок весомее текста),
+        последнее слово ищется по префиксу, при stemming=True русские слова
+        ищутся по основе с учётом словоформ. В поле snippet — фрагмент текста
+        с выделенными <b>совпадениями</b>. Ранжируются только SEARCH_CANDIDATES
+        самых новых совпадений, чтобы частые слова не замедляли поиск.
+        Без FTS5 используется поиск через LIKE.
+        """
+        match_query = build_match_query(query, stemming=stemming)
+        if not match_query or not self.has_full_text_search():
+            return self._search_content_like(query, limit)
+        
         try:
-            with sqlite3.connect(self.db_path, timeout=30.0) as conn:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT c.*,
+                           bm25(content_fts, 2.0, 1.0) AS rank,
+                           snippet(content_fts, -1, '<b>', '</b>', '…', 16) AS snippet
+                    FROM content_fts
+                    JOIN content c ON c.id = content_fts.rowid
+                    WHERE content_fts MATCH ?
+                      AND content_fts.rowid >= (
+                          SELECT MIN(rowid) FROM (
+                              SELECT rowid FROM content_fts
+                              WHERE content_fts MATCH ?
+                              ORDER BY rowid DESC
+                              LIMIT ?
+                          )
+                      )
+                    ORDER BY rank
+                    LIMIT ?
+                ''', (match_query, match_query, SEARCH_CANDIDATES, limit))
+                
+                columns = [description[0] for description in cursor.description]
+                return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Ошибка при поиске контента: {e}")
+            return []
+    
+    def _search_content_like(self, query: str, limit: int = 10) -> List[Dict]:
+        """Поиск контента по подстроке (без полнотекстового индекса)"""
+        try:
+            with self._get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT * FROM content 
@@ -208,128 +357,126 @@ class Database:
                 columns = [description[0] for description in cursor.description]
                 return [dict(zip(columns, row)) for row in cursor.fetchall()]
         except Exception as e:
-            print(f"Ошибка при поиске контента: {e}")
+            logger.error(f"Ошибка при поиске контента: {e}")
             return []
     
     def update_stats(self, category: str):
-        """Обновление статистики по категории"""
-        max_retries = 5
-        for attempt in range(max_retries):
-            try:
-                with sqlite3.connect(self.db_path, timeout=30.0) as conn:
-                    cursor = conn.cursor()
-                    cursor.execute('''
-                        INSERT OR REPLACE INTO stats (category, count, last_updated)
-                        SELECT ?, COUNT(*), CURRENT_TIMESTAMP
-                        FROM content WHERE category = ?
-                    ''', (category, category))
-                    conn.commit()
-                    return
-            except sqlite3.OperationalError as e:
-                if "database is locked" in str(e) and attempt < max_retries - 1:
-                    print(f"База данных заблокирована при обновлении статистики, попытка {attempt + 1}/{max_retries}")
-                    import time
-                    time.sleep(1)
-                    continue
-                else:
-                    print(f"Ошибка при обновлении статистики: {e}")
-                    break
+        """
+        Пересчёт счётчика одной категории по таблице content.
+        В обычной работе не нужен: счётчики поддерживаются триггерами.
+        """
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    INSERT OR REPLACE INTO category_counters (category, count)
+                    SELECT ?, COUNT(*) FROM content WHERE category = ?
+                ''', (category, category))
+        except Exception as e:
+            logger.error(f"Ошибка при обновлении статистики: {e}")
+    
+    def _stats_snapshot(self) -> Dict[str, int]:
+        """
+        Счётчики категорий из category_counters с кэшированием в памяти.
+        Снимок сбрасывается при любой записи: своей (total_changes соединения)
+        или другого соединения (PRAGMA data_version).
+        """
+        conn = self._get_connection()
+        data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+        key = (id(conn), data_version, conn.total_changes)
+        cached = self._stats_cache
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        
+        cursor = conn.execute('''
+            SELECT category, count FROM category_counters
+            WHERE count > 0
+            ORDER BY count DESC
+        ''')
+        stats = dict(cursor.fetchall())
+        self._stats_cache = (key, stats)
+        return stats
     
     def get_stats(self) -> Dict[str, int]:
         """Получение статистики по всем категориям"""
         try:
-            with sqlite3.connect(self.db_path, timeout=30.0) as conn:
-                cursor = conn.cursor()
-                cursor.execute('SELECT category, count FROM stats ORDER BY count DESC')
-                return dict(cursor.fetchall())
+            return dict(self._stats_snapshot())
         except Exception as e:
-            print(f"Ошибка при получении статистики: {e}")
-            return {} 
+            logger.error(f"Ошибка при получении статистики: {e}")
+            return {}
     
     def get_real_stats(self) -> Dict[str, int]:
-        """Получение актуальной статистики напрямую из таблицы content"""
+        """Получение актуальной статистики (счётчики обновляются триггерами при каждой записи)"""
         try:
-            with sqlite3.connect(self.db_path, timeout=30.0) as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT category, COUNT(*) as count 
-                    FROM content 
-                    GROUP BY category 
-                    ORDER BY count DESC
-                ''')
-                return dict(cursor.fetchall())
+            return dict(self._stats_snapshot())
         except Exception as e:
-            print(f"Ошибка при получении актуальной статистики: {e}")
+            logger.error(f"Ошибка при получении актуальной статистики: {e}")
             return {}
     
     def get_total_posts_count(self) -> int:
         """Получение общего количества постов"""
         try:
-            with sqlite3.connect(self.db_path, timeout=30.0) as conn:
-                cursor = conn.cursor()
-                cursor.execute('SELECT COUNT(*) FROM content')
-                return cursor.fetchone()[0]
+            return sum(self._stats_snapshot().values())
         except Exception as e:
-            print(f"Ошибка при получении количества постов: {e}")
+            logger.error(f"Ошибка при получении количества постов: {e}")
             return 0
     
     def update_all_stats(self):
-        """Обновление статистики для всех категорий"""
+        """
+        Полный пересчёт счётчиков всех категорий по таблице content.
+        Нужен только для восстановления после ручного изменения базы.
+        """
         try:
-            with sqlite3.connect(self.db_path, timeout=30.0) as conn:
+            with self._get_connection() as conn:
                 cursor = conn.cursor()
-                
-                # Получаем актуальную статистику
+                cursor.execute('DELETE FROM category_counters')
                 cursor.execute('''
-                    SELECT category, COUNT(*) as count 
-                    FROM content 
+                    INSERT INTO category_counters (category, count)
+                    SELECT category, COUNT(*) FROM content
+                    WHERE category IS NOT NULL
                     GROUP BY category
                 ''')
-                categories = cursor.fetchall()
-                
-                # Обновляем таблицу stats
-                for category, count in categories:
-                    cursor.execute('''
-                        INSERT OR REPLACE INTO stats (category, count, last_updated)
-                        VALUES (?, ?, CURRENT_TIMESTAMP)
-                    ''', (category, count))
-                
-                conn.commit()
-                print(f"✅ Статистика обновлена для {len(categories)} категорий")
+                logger.info(f"✅ Статистика обновлена для {cursor.rowcount} категорий")
                 
         except Exception as e:
-            print(f"Ошибка при обновлении статистики: {e}")
+            logger.error(f"Ошибка при обновлении статистики: {e}")
 
     def delete_content_by_title(self, title: str) -> int:
         """Удаляет посты по заголовку (title). Возвращает количество удалённых записей."""
         try:
-            with sqlite3.connect(self.db_path, timeout=30.0) as conn:
+            with self._get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('DELETE FROM content WHERE LOWER(title) LIKE ?', (f'%{title.lower()}%',))
                 deleted = cursor.rowcount
                 conn.commit()
+                if deleted:
+                    self.cache.clear()
                 return deleted
         except Exception as e:
-            print(f"Ошибка при удалении поста: {e}")
+            logger.error(f"Ошибка при удалении поста: {e}")
             return 0 
 
     def delete_content_by_id(self, content_id: int) -> bool:
         """Удаляет пост по ID. Возвращает True если удалён."""
         try:
-            with sqlite3.connect(self.db_path, timeout=30.0) as conn:
+            with self._get_connection() as conn:
                 cursor = conn.cursor()
+                cursor.execute('SELECT category FROM content WHERE id = ?', (content_id,))
+                row = cursor.fetchone()
                 cursor.execute('DELETE FROM content WHERE id = ?', (content_id,))
                 deleted = cursor.rowcount
                 conn.commit()
+                if deleted:
+                    self.cache.invalidate(row[0])
                 return deleted > 0
         except Exception as e:
-            print(f"Ошибка при удалении поста: {e}")
+            logger.error(f"Ошибка при удалении поста: {e}")
             return False 
     
     def get_content_with_media(self, limit: int = 100) -> List[Dict]:
         """Получение контента с медиа файлами"""
         try:
-            with sqlite3.connect(self.db_path, timeout=30.0) as conn:
+            with self._get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT * FROM content 
@@ -341,13 +488,13 @@ class Database:
                 columns = [description[0] for description in cursor.description]
                 return [dict(zip(columns, row)) for row in cursor.fetchall()]
         except Exception as e:
-            print(f"Ошибка при получении контента с медиа: {e}")
+            logger.error(f"Ошибка при получении контента с медиа: {e}")
             return []
     
     def get_content_by_media_type(self, media_type: str, limit: int = 10) -> List[Dict]:
         """Получение контента по типу медиа"""
         try:
-            with sqlite3.connect(self.db_path, timeout=30.0) as conn:
+            with self._get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT * FROM content 
@@ -359,13 +506,13 @@ class Database:
                 columns = [description[0] for description in cursor.description]
                 return [dict(zip(columns, row)) for row in cursor.fetchall()]
         except Exception as e:
-            print(f"Ошибка при получении контента по типу медиа: {e}")
+            logger.error(f"Ошибка при получении контента по типу медиа: {e}")
             return []
     
     def get_content_by_media_group_id(self, media_group_id: str) -> Optional[Dict]:
         """Получение контента по media_group_id"""
         try:
-            with sqlite3.connect(self.db_path, timeout=30.0) as conn:
+            with self._get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT * FROM content 
@@ -378,41 +525,19 @@ class Database:
                     return dict(zip(columns, row))
                 return None
         except Exception as e:
-            print(f"Ошибка при получении контента по media_group_id: {e}")
+            logger.error(f"Ошибка при получении контента по media_group_id: {e}")
             return None 
     
     def init_media_table(self):
-        """Инициализация таблицы для медиафайлов"""
-        try:
-            with sqlite3.connect(self.db_path, timeout=30.0) as conn:
-                cursor = conn.cursor()
-                
-                # Создаем таблицу post_media если её нет
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS post_media (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        content_id INTEGER,
-                        message_id INTEGER,
-                        media_type TEXT,
-                        media_file_id TEXT,
-                        media_file_unique_id TEXT,
-                        media_order INTEGER DEFAULT 0,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (content_id) REFERENCES content (id) ON DELETE CASCADE
-                    )
-                ''')
-                
-                conn.commit()
-                print("✅ Таблица post_media готова к работе")
-        except Exception as e:
-            print(f"Ошибка при инициализации таблицы post_media: {e}")
+        """Инициализация таблицы для медиафайлов (создаётся миграциями)"""
+        self.init_database()
     
     def add_media_to_post(self, content_id: int, message_id: int, media_type: str, 
                           media_file_id: str, media_file_unique_id: str = None, 
                           media_order: int = 0) -> bool:
         """Добавление медиафайла к посту"""
         try:
-            with sqlite3.connect(self.db_path, timeout=30.0) as conn:
+            with self._get_connection() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('''
@@ -420,17 +545,95 @@ class Database:
                     (content_id, message_id, media_type, media_file_id, media_file_unique_id, media_order)
                     VALUES (?, ?, ?, ?, ?, ?)
                 ''', (content_id, message_id, media_type, media_file_id, media_file_unique_id, media_order))
+                cursor.execute('SELECT category FROM content WHERE id = ?', (content_id,))
+                row = cursor.fetchone()
                 
                 conn.commit()
+                self.cache.invalidate(row[0] if row else None)
                 return True
         except Exception as e:
-            print(f"Ошибка при добавлении медиафайла: {e}")
+            logger.error(f"Ошибка при добавлении медиафайла: {e}")
             return False
     
+    def save_post_with_media(self, message_id: int, channel_id: int, category: str,
+                             title: str = "", text: str = "", media_type: str = None,
+                             media_file_id: str = None, channel_username: str = None,
+                             media_group_id: str = None,
+                             media: List[Tuple[int, str, str]] = None) -> Optional[Dict]:
+        """
+        Сохранение поста вместе со всеми медиафайлами в одной транзакции.
+        media — части поста [(message_id, media_type, media_file_id), ...] по порядку.
+        Если пост (или его медиа-группа) уже есть, сохраняются только новые части,
+        категория существующего поста не меняется.
+        Возвращает {'id', 'category', 'created', 'media_added'} или None при ошибке.
+        """
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('BEGIN IMMEDIATE')
+                
+                if media_group_id:
+                    cursor.execute('''
+                        SELECT id, category FROM content
+                        WHERE media_group_id = ? OR message_id = ?
+                    ''', (media_group_id, message_id))
+                else:
+                    cursor.execute('SELECT id, category FROM content WHERE message_id = ?', (message_id,))
+                existing = cursor.fetchone()
+                
+                if existing:
+                    content_id, category = existing
+                else:
+                    cursor.execute('''
+                        INSERT INTO content
+                        (message_id, channel_id, channel_username, category, title, text,
+                         media_type, media_file_id, media_group_id)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ''', (message_id, channel_id, channel_username, category, title, text,
+                          media_type, media_file_id, media_group_id))
+                    content_id = cursor.lastrowid
+                
+                media_added = 0
+                if media:
+                    cursor.execute(
+                        'SELECT COALESCE(MAX(media_order) + 1, 0) FROM post_media WHERE content_id = ?',
+                        (content_id,)
+                    )
+                    next_order = cursor.fetchone()[0]
+                    cursor.execute('SELECT message_id FROM post_media WHERE content_id = ?', (content_id,))
+                    stored_parts = {row[0] for row in cursor.fetchall()}
+                    
+                    rows = []
+                    for part_message_id, part_media_type, part_file_id in media:
+                        if part_message_id in stored_parts:
+                            continue
+                        rows.append((content_id, part_message_id, part_media_type, part_file_id, next_order))
+                        stored_parts.add(part_message_id)
+                        next_order += 1
+                    cursor.executemany('''
+                        INSERT INTO post_media (content_id, message_id, media_type, media_file_id, media_order)
+                        VALUES (?, ?, ?, ?, ?)
+                    ''', rows)
+                    media_added = len(rows)
+                
+                result = {
+                    'id': content_id,
+                    'category': category,
+                    'created': existing is None,
+                    'media_added': media_added
+                }
+        except Exception as e:
+            logger.error(f"Ошибка при сохранении поста с медиафайлами: {e}")
+            return None
+        
+        if result['created'] or result['media_added']:
+            self.cache.invalidate(result['category'])
+        return result
+    
     def get_post_media(self, content_id: int) -> List[Dict]:
         """Получение всех медиафайлов для поста"""
         try:
-            with sqlite3.connect(self.db_path, timeout=30.0) as conn:
+            with self._get_connection() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute('''
@@ -442,98 +645,194 @@ class Database:
                 columns = [description[0] for description in cursor.description]
                 return [dict(zip(columns, row)) for row in cursor.fetchall()]
         except Exception as e:
-            print(f"Ошибка при получении медиафайлов поста: {e}")
+            logger.error(f"Ошибка при получении медиафайлов поста: {e}")
             return []
     
-    def get_content_with_media_files(self, category: str = None, limit: int = 10) -> List[Dict]:
-        """Получение контента с медиафайлами"""
+    def get_content_with_media_files(self, category: str = None, limit: int = 10) -> Sequence[Mapping]:
+        """
+        Получение ровно limit постов (по времени создания) со всеми медиафайлами.
+        Сначала выбирается страница постов, затем их медиафайлы одним запросом.
+        """
+        return self._cached_read(
+            ('content_with_media_files', category, limit), (category or ALL_CATEGORIES,),
+            lambda: self._fetch_content_with_media_files(category, limit),
+            "Ошибка при получении контента с медиафайлами", ()
+        )
+    
+    def _fetch_content_with_media_files(self, category: Optional[str], limit: int) -> List[Dict]:
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            
+            if category:
+                cursor.execute('''
+                    SELECT * FROM content
+                    WHERE category = ?
+                    ORDER BY created_at ASC, id ASC
+                    LIMIT ?
+                ''', (category, limit))
+            else:
+                cursor.execute('''
+                    SELECT * FROM content
+                    ORDER BY created_at ASC, id ASC
+                    LIMIT ?
+                ''', (limit,))
+            
+            columns = [description[0] for description in cursor.description]
+            posts = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            self._attach_media_files(cursor, posts)
+            return posts
+    
+    def get_category_page(self, category: str, page_size: int = 5, anchor_id: int = None,
+                          direction: str = 'older') -> Tuple[Sequence[Mapping], bool, bool]:
+        """
+        Страница постов категории, от новых к старым (keyset-пагинация по (created_at, id)).
+        anchor_id — id последнего (direction='older') или первого (direction='newer')
+        поста текущей страницы; без него возвращается первая страница.
+        Возвращает (посты с медиафайлами, есть ли более новые, есть ли более старые).
+        Страницы одинаковы для всех пользователей и отдаются из кэша до изменения категории.
+        """
+        return self._cached_read(
+            ('category_page', category, anchor_id, direction, page_size), (category,),
+            lambda: self._fetch_category_page(category, page_size, anchor_id, direction),
+            "Ошибка при получении страницы категории", ((), False, False)
+        )
+    
+    def _fetch_category_page(self, category: str, page_size: int, anchor_id: Optional[int],
+                             direction: str) -> Tuple[List[Dict], bool, bool]:
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            
+            # Курсор задаётся id поста, (created_at, id) берутся подзапросом
+            if anchor_id is not None and direction == 'newer':
+                cursor.execute('''
+                    SELECT * FROM content
+                    WHERE category = ?
+                      AND (created_at, id) > (SELECT created_at, id FROM content WHERE id = ?)
+                    ORDER BY created_at ASC, id ASC
+                    LIMIT ?
+                ''', (category, anchor_id, page_size + 1))
+            elif anchor_id is not None:
+                cursor.execute('''
+                    SELECT * FROM content
+                    WHERE category = ?
+                      AND (created_at, id) < (SELECT created_at, id FROM content WHERE id = ?)
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT ?
+                ''', (category, anchor_id, page_size + 1))
+            else:
+                cursor.execute('''
+                    SELECT * FROM content
+                    WHERE category = ?
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT ?
+                ''', (category, page_size + 1))
+            
+            columns = [description[0] for description in cursor.description]
+            posts = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            has_more = len(posts) > page_size
+            posts = posts[:page_size]
+            
+            if anchor_id is None:
+                has_newer, has_older = False, has_more
+            elif direction == 'newer':
+                posts.reverse()
+                has_newer, has_older = has_more, True
+            else:
+                has_newer, has_older = True, has_more
+            
+            if anchor_id is not None and not posts:
+                # Якорный пост удалён или страница опустела — начинаем сначала
+                cursor.execute('SELECT 1 FROM content WHERE id = ?', (anchor_id,))
+                if cursor.fetchone() is None:
+                    return self._fetch_category_page(category, page_size, None, 'older')
+            
+            self._attach_media_files(cursor, posts)
+            return posts, has_newer, has_older
+    
+    def _attach_media_files(self, cursor: sqlite3.Cursor, posts: List[Dict]):
+        """Добавление медиафайлов к постам одним запросом (media_files в порядке media_order)"""
+        by_id = {post['id']: post for post in posts}
+        for post in posts:
+            post['media_files'] = []
+        if not by_id:
+            return
+        
+        placeholders = ','.join('?' * len(by_id))
+        cursor.execute(f'''
+            SELECT content_id, message_id, media_type, media_file_id, media_file_unique_id, media_order
+            FROM post_media
+            WHERE content_id IN ({placeholders})
+            ORDER BY content_id, media_order ASC
+        ''', tuple(by_id))
+        for content_id, message_id, media_type, media_file_id, media_file_unique_id, media_order in cursor.fetchall():
+            if media_type and media_file_id:
+                by_id[content_id]['media_files'].append({
+                    'message_id': message_id,
+                    'media_type': media_type,
+                    'media_file_id': media_file_id,
+                    'media_file_unique_id': media_file_unique_id,
+                    'media_order': media_order or 0
+                })
+        
+        # Посты без записей в post_media берут медиа из основной таблицы
+        for post in posts:
+            if not post['media_files'] and post.get('media_type') and post.get('media_file_id'):
+                post['media_files'] = [{
+                    'message_id': post['message_id'],
+                    'media_type': post['media_type'],
+                    'media_file_id': post['media_file_id'],
+                    'media_file_unique_id': post.get('media_file_unique_id'),
+                    'media_order': 0
+                }]
+    
+    def get_media_validity(self, file_keys: List[str]) -> Dict[str, Dict]:
+        """Известные результаты отправки медиафайлов: {file_key: {last_verified_at, last_failure_at, ...}}"""
+        file_keys = list(dict.fromkeys(file_keys))
+        if not file_keys:
+            return {}
         try:
-            with sqlite3.connect(self.db_path, timeout=30.0) as conn:
+            with self._get_connection() as conn:
                 cursor = conn.cursor()
-                
-                if category:
-                    cursor.execute('''
-                        SELECT c.*, pm.media_type, pm.media_file_id, pm.media_order
-                        FROM content c
-                        LEFT JOIN post_media pm ON c.id = pm.content_id
-                        WHERE c.category = ?
-                        ORDER BY c.created_at ASC, pm.media_order ASC
-                        LIMIT ?
-                    ''', (category, limit * 10))  # Увеличиваем лимит, так как JOIN может дать больше строк
+                validity = {}
+                for start in range(0, len(file_keys), MAX_QUERY_PARAMS):
+                    chunk = file_keys[start:start + MAX_QUERY_PARAMS]
+                    placeholders = ','.join('?' * len(chunk))
+                    cursor.execute(f'''
+                        SELECT * FROM media_validity WHERE file_key IN ({placeholders})
+                    ''', chunk)
+                    columns = [description[0] for description in cursor.description]
+                    for row in cursor.fetchall():
+                        row = dict(zip(columns, row))
+                        validity[row['file_key']] = row
+                return validity
+        except Exception as e:
+            logger.error(f"Ошибка при получении доступности медиафайлов: {e}")
+            return {}
+    
+    def record_media_results(self, file_keys: List[str], ok: bool, error: str = None):
+        """Запись результата отправки медиафайлов: успех сбрасывает счётчик ошибок"""
+        if not file_keys:
+            return
+        now = time.time()
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                if ok:
+                    cursor.executemany('''
+                        INSERT INTO media_validity (file_key, last_verified_at, failure_count)
+                        VALUES (?, ?, 0)
+                        ON CONFLICT(file_key) DO UPDATE SET
+                            last_verified_at = excluded.last_verified_at,
+                            failure_count = 0
+                    ''', [(file_key, now) for file_key in file_keys])
                 else:
-                    cursor.execute('''
-                        SELECT c.*, pm.media_type, pm.media_file_id, pm.media_order
-                        FROM content c
-                        LEFT JOIN post_media pm ON c.id = pm.content_id
-                        ORDER BY c.created_at ASC, pm.media_order ASC
-                        LIMIT ?
-                    ''', (limit * 10,))  # Увеличиваем лимит, так как JOIN может дать больше строк
-                
-                columns = [description[0] for description in cursor.description]
-                raw_results = cursor.fetchall()
-                
-                # Группируем результаты по content_id
-                content_dict = {}
-                
-                for row in raw_results:
-                    row_dict = dict(zip(columns, row))
-                    content_id = row_dict['id']
-                    
-                    if content_id not in content_dict:
-                        # Создаем новый пост
-                        content_dict[content_id] = {
-                            'id': content_id,
-                            'message_id': row_dict['message_id'],
-                            'channel_id': row_dict['channel_id'],
-                            'channel_username': row_dict['channel_username'],
-                            'category': row_dict['category'],
-                            'title': row_dict['title'],
-                            'text': row_dict['text'],
-                            'media_type': row_dict['media_type'],
-                            'media_file_id': row_dict['media_file_id'],
-                            'media_file_unique_id': row_dict['media_file_unique_id'],
-                            'media_group_id': row_dict['media_group_id'],
-                            'created_at': row_dict['created_at'],
-                            'media_files': []
-                        }
-                    
-                    # Добавляем медиафайл, если он есть
-                    if row_dict['media_type'] and row_dict['media_file_id']:
-                        media_file = {
-                            'media_type': row_dict['media_type'],
-                            'media_file_id': row_dict['media_file_id'],
-                            'media_order': row_dict['media_order'] or 0
-                        }
-                        content_dict[content_id]['media_files'].append(media_file)
-                
-                # Если медиафайлов нет в post_media, добавляем из основной таблицы
-                for content_id, post in content_dict.items():
-                    if not post['media_files']:
-                        # Проверяем, есть ли медиа в основной таблице
-                        main_media_type = post.get('media_type')
-                        main_media_file_id = post.get('media_file_id')
-                        
-                        if main_media_type and main_media_file_id:
-                            # Добавляем медиа из основной таблицы
-                            post['media_files'] = [{
-                                'media_type': main_media_type,
-                                'media_file_id': main_media_file_id,
-                                'media_order': 0
-                            }]
-                            print(f"📱 Добавлен медиафайл из основной таблицы для поста {content_id}: {main_media_type}")
-                
-                # Сортируем медиафайлы по порядку и ограничиваем количество постов
-                results = []
-                for content_id, post in content_dict.items():
-                    # Сортируем медиафайлы по порядку
-                    post['media_files'].sort(key=lambda x: x['media_order'])
-                    results.append(post)
-                
-                # Сортируем посты по времени создания и ограничиваем количество
-                results.sort(key=lambda x: x['created_at'], reverse=False)
-                results = results[:limit]
-                
-                return results
+                    cursor.executemany('''
+                        INSERT INTO media_validity (file_key, last_failure_at, failure_count, last_error)
+                        VALUES (?, ?, 1, ?)
+                        ON CONFLICT(file_key) DO UPDATE SET
+                            last_failure_at = excluded.last_failure_at,
+                            failure_count = failure_count + 1,
+                            last_error = excluded.last_error
+                    ''', [(file_key, now, error) for file_key in file_keys])
         except Exception as e:
-            print(f"Ошибка при получении контента с медиафайлами: {e}")
-            return [] 
\ No newline at end of file
+            logger.error(f"Ошибка при записи доступности медиафайлов: {e}")
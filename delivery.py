@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import timedelta
+from typing import Awaitable, Callable, Dict
+
+from telegram.error import RetryAfter
+
+logger = logging.getLogger(__name__)
+
+# Ограничения Telegram Bot API: около 30 сообщений в секунду на бота
+# и около одного сообщения в секунду в один чат (с допустимыми короткими всплесками)
+GLOBAL_RATE = 30.0
+GLOBAL_BURST = 30
+CHAT_RATE = 1.0
+CHAT_BURST = 20
+MAX_RETRIES = 3
+METRICS_WINDOW = 60.0  # окно расчёта скорости доставки, секунды
+
+
+def retry_after_seconds(error: RetryAfter) -> float:
+    """Время ожидания из ошибки RetryAfter в секундах"""
+    retry_after = error.retry_after
+    if isinstance(retry_after, timedelta):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+
+class TokenBucket:
+    """
+    Ведро токенов: rate токенов в секунду, не больше capacity сразу.
+    Ожидающие получают токены строго по очереди.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def is_full(self) -> bool:
+        """Ведро полностью восстановилось (состояние можно забыть)"""
+        now = time.monotonic()
+        self._refill(now)
+        return now >= self.blocked_until and self.tokens >= self.capacity
+
+    async def acquire(self, cost: float = 1):
+        """
+        Ожидание и списание cost токенов.
+        Запрос дороже capacity ждёт полного ведра и уводит его в минус:
+        следующие запросы ждут, пока долг не восстановится со скоростью rate.
+        """
+        needed = min(cost, self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= needed:
+                    self.tokens -= cost
+                    return
+                await asyncio.sleep((needed - self.tokens) / self.rate)
+
+    def block(self, seconds: float):
+        """Приостановка выдачи токенов (например, после RetryAfter)"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+
+class DeliveryScheduler:
+    """
+    Планировщик отправки сообщений с учётом ограничений Telegram.
+    Для каждого чата задания выполняются строго по порядку одним исполнителем,
+    разные чаты обслуживаются параллельно. Одно задание — один запрос к API;
+    его стоимость в токенах равна числу отправляемых сообщений. Скорость
+    ограничивается ведрами токенов (общим и на чат), при RetryAfter отправка
+    приостанавливается и повторяется только этот запрос.
+    """
+
+    def __init__(self, global_rate: float = GLOBAL_RATE, global_burst: float = GLOBAL_BURST,
+                 chat_rate: float = CHAT_RATE, chat_burst: float = CHAT_BURST,
+                 max_retries: int = MAX_RETRIES):
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self._chat_buckets: Dict[int, TokenBucket] = {}
+        self._chat_queues: Dict[int, deque] = {}
+        self._workers: Dict[int, asyncio.Task] = {}
+        self._delivered_times = deque()
+        self.delivered_total = 0
+        self.failed_total = 0
+        self.retry_after_total = 0
+
+    def submit(self, chat_id: int, send: Callable[[], Awaitable], cost: float = 1) -> asyncio.Future:
+        """
+        Постановка отправки в очередь чата.
+        send — функция без аргументов, возвращающая корутину одного запроса к API,
+        cost — число сообщений, которые этот запрос отправляет (альбом — по числу
+        файлов, пакетная пересылка — по числу сообщений). При RetryAfter
+        повторяется только send.
+        Возвращает future с результатом отправки.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._chat_queues.setdefault(chat_id, deque()).append((send, cost, future))
+        if chat_id not in self._workers:
+            self._workers[chat_id] = asyncio.create_task(self._chat_worker(chat_id))
+        return future
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    async def _chat_worker(self, chat_id: int):
+        """Исполнитель очереди одного чата"""
+        queue = self._chat_queues[chat_id]
+        bucket = self._chat_bucket(chat_id)
+        try:
+            while queue:
+                send, cost, future = queue.popleft()
+                if future.cancelled():
+                    continue
+                try:
+                    result = await self._send_with_retries(bucket, send, cost)
+                except asyncio.CancelledError:
+                    future.cancel()
+                    raise
+                except Exception as e:
+                    self.failed_total += 1
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    self._record_delivery()
+                    if not future.done():
+                        future.set_result(result)
+        finally:
+            del self._workers[chat_id]
+            if not queue:
+                del self._chat_queues[chat_id]
+                # Восстановившееся ведро не хранит состояния — его можно забыть
+                if bucket.is_full():
+                    self._chat_buckets.pop(chat_id, None)
+
+    async def _send_with_retries(self, bucket: TokenBucket, send: Callable[[], Awaitable], cost: float):
+        for attempt in range(self.max_retries + 1):
+            await bucket.acquire(cost)
+            await self.global_bucket.acquire(cost)
+            try:
+                return await send()
+            except RetryAfter as e:
+                self.retry_after_total += 1
+                delay = retry_after_seconds(e)
+                # Ограничение флуда действует на весь бот
+                self.global_bucket.block(delay)
+                bucket.block(delay)
+                if attempt == self.max_retries:
+                    raise
+                logger.warning(f"⏳ RetryAfter: пауза {delay:.1f} с, повтор {attempt + 1}/{self.max_retries}")
+
+    def _record_delivery(self):
+        now = time.monotonic()
+        self.delivered_total += 1
+        self._delivered_times.append(now)
+        while self._delivered_times and self._delivered_times[0] < now - METRICS_WINDOW:
+            self._delivered_times.popleft()
+
+    @property
+    def queue_depth(self) -> int:
+        """Количество заданий, ожидающих отправки"""
+        return sum(len(queue) for queue in self._chat_queues.values())
+
+    def get_metrics(self) -> Dict[str, float]:
+        """Метрики доставки"""
+        now = time.monotonic()
+        while self._delivered_times and self._delivered_times[0] < now - METRICS_WINDOW:
+            self._delivered_times.popleft()
+        return {
+            'delivered_total': self.delivered_total,
+            'failed_total': self.failed_total,
+            'retry_after_total': self.retry_after_total,
+            'delivered_per_sec': len(self._delivered_times) / METRICS_WINDOW,
+            'queue_depth': self.queue_depth,
+            'active_chats': len(self._workers),
+        }
+
+    async def close(self):
+        """Остановка всех исполнителей и отмена неотправленных заданий"""
+        workers = list(self._workers.values())
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        for queue in self._chat_queues.values():
+            for _, _, future in queue:
+                future.cancel()
+        self._chat_queues.clear()
@@ -0,0 +1,99 @@
+"""
+Заглушка Telegram Bot API для нагрузочного тестирования бота без сети
+"""
+
+import asyncio
+import json
+import logging
+import random
+from collections import Counter
+from typing import Dict, Optional
+
+from aiohttp import web
+
+from bench_fixtures import FakeResponses
+
+logger = logging.getLogger(__name__)
+
+# Методы, которые не замедляются и не получают 429: без них бот не запустится
+SERVICE_METHODS = {'getMe', 'deleteWebhook', 'setWebhook', 'getUpdates', 'close', 'logOut'}
+
+
+class FakeBotApi:
+    """
+    Локальный HTTP-сервер, отвечающий как Bot API (https://api.telegram.org/bot<token>/<method>).
+    Поддерживает методы, которые использует бот, с правдоподобными ответами
+    (см. bench_fixtures.FakeResponses), задержкой latency ± jitter секунд и
+    ответами 429 Too Many Requests с вероятностью rate_limit_probability.
+    Бот подключается через ContentBot(base_url=api.base_url).
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, rate_limit_probability: float = 0.0,
+                 retry_after: int = 1, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_probability = rate_limit_probability
+        self.retry_after = retry_after
+        self.responses = FakeResponses()
+        self.calls: Counter = Counter()
+        self.rate_limited: Counter = Counter()
+        self._rng = random.Random(seed)
+        self._runner: Optional[web.AppRunner] = None
+        self.url: Optional[str] = None
+
+    @property
+    def base_url(self) -> str:
+        """Адрес для Application.builder().base_url(...)"""
+        return f"{self.url}/bot"
+
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_route('*', '/bot{token}/{method}', self.handle_method)
+        return app
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0):
+        """Запуск сервера; при port=0 порт выбирается свободный"""
+        self._runner = web.AppRunner(self.build_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        host, port = self._runner.addresses[0][:2]
+        self.url = f"http://{host}:{port}"
+        logger.info(f"🧪 Заглушка Bot API запущена: {self.url}")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    @staticmethod
+    async def _read_params(request: web.Request) -> Dict:
+        if request.content_type == 'application/json':
+            return await request.json()
+        if request.method == 'GET':
+            return dict(request.query)
+        return {key: value for key, value in (await request.post()).items() if isinstance(value, str)}
+
+    async def handle_method(self, request: web.Request) -> web.Response:
+        method = request.match_info['method']
+        params = await self._read_params(request)
+        self.calls[method] += 1
+
+        if method not in SERVICE_METHODS:
+            if self.latency or self.jitter:
+                await asyncio.sleep(max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter)))
+            if self._rng.random() < self.rate_limit_probability:
+                self.rate_limited[method] += 1
+                return web.json_response({
+                    'ok': False,
+                    'error_code': 429,
+                    'description': f'Too Many Requests: retry after {self.retry_after}',
+                    'parameters': {'retry_after': self.retry_after},
+                }, status=429)
+
+        try:
+            result = self.responses.result(method, params)
+        except (ValueError, TypeError, json.JSONDecodeError) as e:
+            return web.json_response({'ok': False, 'error_code': 400, 'description': f'Bad Request: {e}'},
+                                     status=400)
+        return web.json_response({'ok': True, 'result': result})
@@ -0,0 +1,191 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from telegram.error import BadRequest, Forbidden
+
+logger = logging.getLogger(__name__)
+
+# Способы доставки поста из канала, в порядке предпочтения
+FORWARD = 'forward'  # forward_message: оригинал с подписью канала
+COPY = 'copy'  # copy_message: копия без ссылки на канал
+MEDIA = 'media'  # отправка по сохранённым file_id или текстом
+
+# Через сколько секунд снова пробовать способ, не сработавший для канала
+# (настройки канала и права бота могут измениться)
+CHANNEL_RETRY_INTERVAL = 60 * 60
+# Сколько постов с удалённым оригиналом помнить и как долго (сутки)
+MAX_MISSING_POSTS = 10000
+MISSING_POST_TTL = 24 * 60 * 60
+# forward_messages/copy_messages принимают не больше 100 сообщений за вызов
+MAX_BATCH_MESSAGES = 100
+# Фрагменты текста ошибок, относящиеся к получателю: пользователь заблокировал
+# бота, бота удалили из группы, в группе нельзя писать. Проверяются первыми
+DESTINATION_ERRORS = (
+    'blocked by the user', 'user is deactivated', "can't initiate conversation",
+    "can't send messages to bots", 'kicked from the group', 'kicked from the supergroup',
+    'member of the group chat', 'member of the supergroup chat', 'rights to send',
+    'chat_write_forbidden', 'group chat was upgraded',
+)
+# Фрагменты текста ошибок, относящиеся ко всему каналу: запрет пересылки
+# (защищённый контент), канал закрыт или недоступен боту
+CHANNEL_ERRORS = (
+    'chat_forwards_restricted', 'protected content', 'channel_private', 'channel chat',
+    'chat_admin_required', 'not enough rights', 'have no rights',
+)
+# Ошибки, по тексту которых не понять, о каком чате речь: о канале или о получателе
+AMBIGUOUS_ERRORS = ('chat not found',)
+
+
+def classify_failure(error: Exception, destination_ok: bool = False) -> Optional[str]:
+    """
+    К чему относится ошибка пересылки или копирования:
+    'destination' — к получателю (DESTINATION_ERRORS): канал тут ни при чём;
+    'channel' — канал запрещает способ или недоступен (CHANNEL_ERRORS);
+    'post' — остальные BadRequest: оригинал удалён, неверный message_id
+    (MESSAGE_ID_INVALID), сообщение нельзя переслать или скопировать;
+    None — временная ошибка (сеть, RetryAfter), её не запоминаем.
+    Неоднозначные ошибки (chat not found, прочие Forbidden) относятся к каналу,
+    только если получатель доступен (destination_ok: ему удалось что-то отправить).
+    Один удалённый пост или заблокировавший бота пользователь не должны
+    отключать способ для всего канала.
+    """
+    if not isinstance(error, (BadRequest, Forbidden)):
+        return None
+    message = error.message.lower()
+    if any(fragment in message for fragment in DESTINATION_ERRORS):
+        return 'destination'
+    if any(fragment in message for fragment in CHANNEL_ERRORS):
+        return 'channel'
+    if isinstance(error, Forbidden) or any(fragment in message for fragment in AMBIGUOUS_ERRORS):
+        return 'channel' if destination_ok else 'destination'
+    return 'post'
+
+
+class ForwardStrategy:
+    """
+    Выбор способа доставки поста с учётом прошлых результатов.
+    Для канала запоминается, какие способы не сработали (защищённый контент,
+    бот удалён из канала), для поста — что оригинал удалён (MISSING_POST_TTL).
+    Ошибки получателя (бот заблокирован) каналу не засчитываются. Повторные просмотры
+    сразу используют рабочий способ, без заведомо неудачного запроса к API.
+    """
+
+    def __init__(self, retry_interval: float = CHANNEL_RETRY_INTERVAL, max_missing_posts: int = MAX_MISSING_POSTS,
+                 missing_post_ttl: float = MISSING_POST_TTL):
+        self.retry_interval = retry_interval
+        self.max_missing_posts = max_missing_posts
+        self.missing_post_ttl = missing_post_ttl
+        # channel_id -> {способ: время последней ошибки}
+        self._channel_failures: Dict[int, Dict[str, float]] = {}
+        self._missing_posts: "OrderedDict[Tuple[int, int], float]" = OrderedDict()
+        # Посты, из-за которых пакетная отправка вернула меньше сообщений:
+        # они отправляются по одному, чтобы узнать точный результат
+        self._unbatchable: "OrderedDict[Tuple[int, int], float]" = OrderedDict()
+        self.successes = {FORWARD: 0, COPY: 0}
+        self.failures = {FORWARD: 0, COPY: 0}
+        self.skipped = 0
+        self.batches = 0
+        self.batch_shortfalls = 0
+
+    def _remembered(self, posts: "OrderedDict[Tuple[int, int], float]", key: Tuple[int, int]) -> bool:
+        """Отметка о посте ещё действует; устаревшая удаляется"""
+        marked_at = posts.get(key)
+        if marked_at is None:
+            return False
+        if time.time() - marked_at >= self.missing_post_ttl:
+            del posts[key]
+            return False
+        return True
+
+    def _available(self, channel_id: Optional[int], message_id: int) -> List[str]:
+        if not channel_id or self._remembered(self._missing_posts, (channel_id, message_id)):
+            return []
+        failures = self._channel_failures.get(channel_id, {})
+        now = time.time()
+        return [method for method in (FORWARD, COPY)
+                if failures.get(method) is None or now - failures[method] >= self.retry_interval]
+
+    def methods(self, channel_id: Optional[int], message_id: int) -> List[str]:
+        """Способы доставки поста по порядку; MEDIA всегда последний"""
+        methods = self._available(channel_id, message_id)
+        if channel_id:
+            self.skipped += 2 - len(methods)
+        return methods + [MEDIA]
+
+    def batch_method(self, channel_id: Optional[int], message_id: int) -> Optional[str]:
+        """Способ для пакетной отправки поста вместе с соседними или None"""
+        if self._remembered(self._unbatchable, (channel_id, message_id)):
+            return None
+        methods = self._available(channel_id, message_id)
+        return methods[0] if methods else None
+
+    def record_success(self, channel_id: int, message_id: int, method: str):
+        """Способ сработал: снимаем отметку об ошибке для канала"""
+        self.successes[method] += 1
+        failures = self._channel_failures.get(channel_id)
+        if failures is not None:
+            failures.pop(method, None)
+            if not failures:
+                del self._channel_failures[channel_id]
+
+    def record_failure(self, channel_id: int, message_id: int, method: str, error: Exception,
+                       destination_ok: bool = False):
+        """
+        Запоминание ошибки для поста или для канала.
+        destination_ok — получателю в том же просмотре удалось что-то отправить.
+        """
+        self.failures[method] += 1
+        scope = classify_failure(error, destination_ok)
+        if scope == 'post':
+            self._missing_posts[(channel_id, message_id)] = time.time()
+            self._missing_posts.move_to_end((channel_id, message_id))
+            while len(self._missing_posts) > self.max_missing_posts:
+                self._missing_posts.popitem(last=False)
+        elif scope == 'channel':
+            if method not in self._channel_failures.get(channel_id, {}):
+                logger.info(f"📌 Канал {channel_id}: способ {method} недоступен ({error}), "
+                            f"следующие {self.retry_interval:.0f} с не используется")
+            self._channel_failures.setdefault(channel_id, {})[method] = time.time()
+
+    def record_batch_failure(self, channel_id: int, message_ids: List[int], method: str, error: Exception):
+        """
+        Ошибка пакетной отправки. Запрет для канала запоминается как обычно;
+        удалённый оригинал нельзя отнести к одному посту, поэтому посты пакета
+        дальше отправляются по одному.
+        """
+        scope = classify_failure(error)
+        if scope == 'channel':
+            self.record_failure(channel_id, message_ids[0], method, error)
+            return
+        self.failures[method] += 1
+        if scope == 'post':
+            self.record_batch_shortfall(channel_id, message_ids)
+
+    def record_batch_shortfall(self, channel_id: int, message_ids: List[int]):
+        """Пакет доставлен не полностью (часть оригиналов удалена): посты пакета — по одному"""
+        self.batch_shortfalls += 1
+        now = time.time()
+        for message_id in message_ids:
+            self._unbatchable[(channel_id, message_id)] = now
+            self._unbatchable.move_to_end((channel_id, message_id))
+        while len(self._unbatchable) > self.max_missing_posts:
+            self._unbatchable.popitem(last=False)
+
+    def record_batch_success(self, channel_id: int, method: str):
+        """Пакет доставлен полностью"""
+        self.batches += 1
+        self.record_success(channel_id, None, method)
+
+    def get_metrics(self) -> Dict[str, object]:
+        """Счётчики способов доставки"""
+        return {
+            'successes': dict(self.successes),
+            'failures': dict(self.failures),
+            'skipped': self.skipped,
+            'batches': self.batches,
+            'batch_shortfalls': self.batch_shortfalls,
+            'channels_restricted': len(self._channel_failures),
+            'missing_posts': len(self._missing_posts),
+        }
@@ -53,42 +53,44 @@ class HistoryProcessor:
             
             logger.info(f"Найдено {len(messages)} сообщений для обработки")
             
-            # Обрабатываем каждое сообщение
-            processed = 0
-            for message in messages:
+            # Извлекаем тексты и категоризируем все сообщения одним пакетом
+            texts = [self.analyzer.extract_text_content(message) for message in messages]
+            results = self.analyzer.categorize_many((text, title) for title, text in texts)
+            
+            # Собираем посты для пакетного сохранения
+            batch = []
+            for message, (title, text), result in zip(messages, texts, results):
                 try:
                     # Извлекаем информацию о контенте
-                    title, text = self.analyzer.extract_text_content(message)
                     media_type, media_file_id = self.analyzer.extract_media_info(message)
                     
                     # Извлекаем хештеги
                     hashtags = self.analyzer.extract_hashtags(f"{title} {text}")
                     
-                    # Категоризируем контент
-                    category = self.analyzer.categorize_content(text, title)
-                    
-                    # Сохраняем в базу данных
-                    success = self.db.add_content(
-                        message_id=message.message_id,
-                        channel_id=message.chat.id,
-                        category=category,
-                        title=title,
-                        text=text,
-                        media_type=media_type,
-                        media_file_id=media_file_id
-                    )
+                    category = result.category
+                    batch.append({
+                        'message_id': message.message_id,
+                        'channel_id': message.chat.id,
+                        'category': category,
+                        'title': title,
+                        'text': text,
+                        'media_type': media_type,
+                        'media_file_id': media_file_id
+                    })
                     
-                    if success:
-                        category_name = self.analyzer.get_category_name(category)
-                        hashtags_str = " ".join(hashtags) if hashtags else "без хештегов"
-                        logger.info(f"[{processed + 1}/{len(messages)}] Добавлен в категорию '{category_name}' (хештеги: {hashtags_str})")
-                        processed += 1
-                    else:
-                        logger.warning(f"Не удалось сохранить сообщение {message.message_id}")
+                    category_name = self.analyzer.get_category_name(category)
+                    hashtags_str = " ".join(hashtags) if hashtags else "без хештегов"
+                    logger.info(f"[{len(batch)}/{len(messages)}] Категория '{category_name}' "
+                                f"(баллы: {result.scores[category]}, хештеги: {hashtags_str})")
                 
                 except Exception as e:
                     logger.error(f"Ошибка при обработке сообщения {message.message_id}: {e}")
             
+            # Сохраняем все посты одной транзакцией
+            processed = self.db.upsert_posts(batch)
+            if batch and not processed:
+                logger.warning(f"Не удалось сохранить {len(batch)} сообщений")
+            
             logger.info(f"Обработка завершена. Успешно обработано: {processed}/{len(messages)}")
             
             # Показываем статистику
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный тест обработчиков бота без настоящего Telegram.
+Бот работает как в продакшене (HTTP-запросы через InstrumentedRequest,
+планировщик доставки, фоновое сохранение), но обращается к локальной
+заглушке Bot API (fake_bot_api.FakeBotApi) с настраиваемой задержкой и 429.
+Пользователи нажимают кнопки категорий и статистики с заданной частотой,
+параллельно в канал приходят новые посты. В конце печатаются p50/p90/p99
+задержки обработки обновлений, запросы к API по методам и ошибки.
+
+Запуск: python load_test.py [--users 2000] [--taps 3] [--rps 200] [--channel-posts 200]
+        [--latency 0.05] [--jitter 0.02] [--rate-limit 0.01] [--unthrottled] [--log-level ERROR]
+        [--output load.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from typing import Dict, List
+
+from async_database import AsyncDatabase
+from bench_fixtures import BENCH_TOKEN, callback_update, channel_post_update, make_posts, make_texts
+from database import Database
+from delivery import DeliveryScheduler
+from fake_bot_api import FakeBotApi
+from logging_setup import setup_logging, stop_logging
+from metrics import HANDLER_ERRORS
+
+CATEGORIES = ['power_results', 'sport_tips', 'challenges', 'memes', 'exercises', 'flood', 'other']
+HANDLERS = ['button_callback', 'channel_message_handler']
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Перцентиль q (0..1) отсортированного списка"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def summarize(latencies: List[float], elapsed: float) -> Dict:
+    latencies = sorted(latencies)
+    return {
+        'count': len(latencies),
+        'per_sec': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 1),
+        'p90_ms': round(percentile(latencies, 0.90) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 1),
+        'max_ms': round((latencies[-1] if latencies else 0.0) * 1000, 1),
+    }
+
+
+async def run_load(users: int, taps: int, rps: float, channel_posts: int, post_rate: float,
+                   latency: float, jitter: float, rate_limit: float, unthrottled: bool,
+                   seed_posts: int = 5000, seed: int = 1) -> Dict:
+    from bot import ContentBot
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'load.db')
+        db = Database(db_path)
+        db.upsert_posts(make_posts(seed_posts))
+        db.close()
+
+        api = FakeBotApi(latency=latency, jitter=jitter, rate_limit_probability=rate_limit, seed=seed)
+        await api.start()
+        bot = ContentBot(token=BENCH_TOKEN, base_url=api.base_url, db=AsyncDatabase(db_path=db_path))
+        if unthrottled:
+            bot.delivery = DeliveryScheduler(global_rate=1e9, global_burst=1e9, chat_rate=1e9, chat_burst=1e9)
+        app = bot.application
+        errors_before = {name: HANDLER_ERRORS.get(name) for name in HANDLERS}
+
+        await app.initialize()
+        await bot.start_background_tasks(app)
+        await app.start()
+        tap_latencies: List[float] = []
+        post_latencies: List[float] = []
+        rng = random.Random(seed)
+
+        async def process(update, latencies: List[float]):
+            start = time.perf_counter()
+            await app.update_processor.process_update(update, app.process_update(update))
+            latencies.append(time.perf_counter() - start)
+
+        async def users_tapping():
+            tasks = []
+            for i in range(users * taps):
+                user_id = 100_000 + i % users
+                data = 'stats' if rng.random() < 0.1 else f'category_{rng.choice(CATEGORIES)}'
+                tasks.append(asyncio.create_task(process(callback_update(i, user_id, data, app.bot), tap_latencies)))
+                await asyncio.sleep(1 / rps)
+            await asyncio.gather(*tasks)
+
+        async def channel_posting():
+            tasks = []
+            for i, (title, text) in enumerate(make_texts(channel_posts, seed=seed)):
+                update = channel_post_update(10_000_000 + i, 50_000_000 + i, f'{title}\n{text}', app.bot)
+                tasks.append(asyncio.create_task(process(update, post_latencies)))
+                await asyncio.sleep(1 / post_rate)
+            await asyncio.gather(*tasks)
+
+        start = time.perf_counter()
+        try:
+            await asyncio.gather(users_tapping(), channel_posting())
+            await bot.ingest_queue.join()
+            elapsed = time.perf_counter() - start
+        finally:
+            await app.stop()
+            await bot.stop_background_tasks(app)
+            await app.shutdown()
+            await bot.db.close()
+            await api.stop()
+
+        return {
+            'params': {'users': users, 'taps': taps, 'rps': rps, 'channel_posts': channel_posts,
+                       'post_rate': post_rate, 'latency': latency, 'jitter': jitter,
+                       'rate_limit': rate_limit, 'unthrottled': unthrottled},
+            'elapsed_sec': round(elapsed, 2),
+            'taps': summarize(tap_latencies, elapsed),
+            'channel_posts': summarize(post_latencies, elapsed),
+            'handler_errors': {name: int(HANDLER_ERRORS.get(name) - errors_before[name]) for name in HANDLERS},
+            'api_calls': dict(api.calls),
+            'api_rate_limited': dict(api.rate_limited),
+            'delivery': bot.delivery.get_metrics(),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Нагрузочный тест бота на заглушке Bot API')
+    parser.add_argument('--users', type=int, default=2000, help='количество пользователей')
+    parser.add_argument('--taps', type=int, default=3, help='нажатий на пользователя')
+    parser.add_argument('--rps', type=float, default=200, help='нажатий в секунду')
+    parser.add_argument('--channel-posts', type=int, default=200, help='постов канала за тест')
+    parser.add_argument('--post-rate', type=float, default=20, help='постов канала в секунду')
+    parser.add_argument('--latency', type=float, default=0.05, help='задержка ответа API, секунды')
+    parser.add_argument('--jitter', type=float, default=0.02, help='разброс задержки, секунды')
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='доля ответов 429')
+    parser.add_argument('--unthrottled', action='store_true', help='без лимитов планировщика доставки')
+    parser.add_argument('--log-level', default='CRITICAL',
+                        help='уровень логов бота (ошибки обработчиков и так считаются в отчёте)')
+    parser.add_argument('--output', help='файл для результатов в JSON')
+    args = parser.parse_args()
+
+    setup_logging(args.log_level)
+    try:
+        report = asyncio.run(run_load(args.users, args.taps, args.rps, args.channel_posts, args.post_rate,
+                                      args.latency, args.jitter, args.rate_limit, args.unthrottled))
+    finally:
+        stop_logging()
+
+    print(f"🔥 Нагрузочный тест: {report['elapsed_sec']} с")
+    for kind in ('taps', 'channel_posts'):
+        stats = report[kind]
+        print(f"   {kind:>13}: {stats['count']:6d} ({stats['per_sec']:7.1f}/с)   p50 {stats['p50_ms']:8.1f} мс   "
+              f"p90 {stats['p90_ms']:8.1f} мс   p99 {stats['p99_ms']:8.1f} мс   max {stats['max_ms']:8.1f} мс")
+    print(f"   Ошибки обработчиков: {report['handler_errors']}")
+    print(f"   Запросы к API: {report['api_calls']}")
+    print(f"   Ответы 429: {report['api_rate_limited']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
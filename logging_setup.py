@@ -0,0 +1,96 @@
+import json
+import logging
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Стандартные поля LogRecord; всё остальное (extra=...) попадает в JSON как есть
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись — одна строка JSON: время, уровень, модуль, сообщение и поля из extra"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _LazyQueueHandler(QueueHandler):
+    """
+    QueueHandler с минимумом работы в вызывающем потоке.
+    Стандартный prepare() полностью форматирует запись (время, формат, traceback)
+    до постановки в очередь; здесь подставляются только аргументы сообщения,
+    остальное форматирование и вывод выполняет поток QueueListener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Аргументы подставляются сразу: объекты могут измениться до форматирования
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
+def parse_levels(spec: str) -> Dict[str, int]:
+    """Уровни модулей из строки вида 'database=WARNING,telegram.ext=INFO'"""
+    levels = {}
+    for item in (spec or '').split(','):
+        if '=' not in item:
+            continue
+        name, level = (part.strip() for part in item.split('=', 1))
+        levels[name] = logging.getLevelName(level.upper())
+    return levels
+
+
+def setup_logging(level: str = 'INFO', json_output: bool = False,
+                  module_levels: Dict[str, int] = None, stream=None) -> QueueListener:
+    """
+    Настройка логирования бота.
+    Обработчики корневого логгера заменяются одной очередью: цикл событий только
+    кладёт запись в очередь, форматирование и запись в поток вывода идут в отдельном
+    потоке. Повторный вызов перенастраивает логирование.
+    """
+    stop_logging()
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if json_output else logging.Formatter(LOG_FORMAT))
+
+    global _listener
+    log_queue = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_LazyQueueHandler(log_queue))
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+
+    for name, module_level in (module_levels or {}).items():
+        logging.getLogger(name).setLevel(module_level)
+    return _listener
+
+
+def stop_logging():
+    """Вывод оставшихся записей и остановка потока логирования"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,77 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Hashable, List, Set
+
+logger = logging.getLogger(__name__)
+
+# Части альбома приходят отдельными обновлениями почти одновременно
+MEDIA_GROUP_DELAY = 1.0  # пауза после последней части, секунды
+MAX_MEDIA_GROUP_SIZE = 10  # в альбоме Telegram не больше 10 медиафайлов
+
+
+class MediaGroupAssembler:
+    """
+    Сборка медиа-группы (альбома) из отдельных сообщений.
+    Части копятся в памяти, пока новые приходят чаще, чем раз в delay секунд;
+    затем on_complete вызывается один раз со всеми частями по порядку message_id.
+    Полный альбом (MAX_MEDIA_GROUP_SIZE частей) отдаётся сразу.
+    """
+
+    def __init__(self, on_complete: Callable[[Hashable, List], Awaitable],
+                 delay: float = MEDIA_GROUP_DELAY, max_parts: int = MAX_MEDIA_GROUP_SIZE):
+        self.on_complete = on_complete
+        self.delay = delay
+        self.max_parts = max_parts
+        self._parts: Dict[Hashable, list] = {}
+        self._timers: Dict[Hashable, asyncio.Task] = {}
+        self._completing: Set[asyncio.Task] = set()
+
+    def add(self, group_key: Hashable, message):
+        """Добавление части медиа-группы; таймер группы запускается заново"""
+        parts = self._parts.setdefault(group_key, [])
+        parts.append(message)
+
+        timer = self._timers.pop(group_key, None)
+        if timer is not None:
+            timer.cancel()
+
+        delay = 0 if len(parts) >= self.max_parts else self.delay
+        self._timers[group_key] = asyncio.create_task(self._flush_later(group_key, delay))
+
+    async def _flush_later(self, group_key: Hashable, delay: float):
+        await asyncio.sleep(delay)
+        # Дальше группа уже не ждёт новых частей, новая часть с тем же ключом
+        # начнёт новую группу, а эта будет обработана до конца
+        task = asyncio.current_task()
+        self._timers.pop(group_key, None)
+        self._completing.add(task)
+        try:
+            await self._complete(group_key)
+        finally:
+            self._completing.discard(task)
+
+    async def _complete(self, group_key: Hashable):
+        parts = self._parts.pop(group_key, None)
+        if not parts:
+            return
+        parts.sort(key=lambda message: message.message_id)
+        try:
+            await self.on_complete(group_key, parts)
+        except Exception as e:
+            logger.error(f"❌ Ошибка при обработке медиа-группы {group_key}: {e}")
+
+    @property
+    def pending(self) -> int:
+        """Количество групп, ожидающих недостающих частей"""
+        return len(self._parts)
+
+    async def flush_all(self):
+        """Немедленная обработка всех собираемых групп (при остановке бота)"""
+        timers = list(self._timers.values())
+        self._timers.clear()
+        for timer in timers:
+            timer.cancel()
+        await asyncio.gather(*timers, return_exceptions=True)
+        for group_key in list(self._parts):
+            await self._complete(group_key)
+        await asyncio.gather(*self._completing, return_exceptions=True)
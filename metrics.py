@@ -0,0 +1,228 @@
+import functools
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple, Union
+
+from telegram.request import HTTPXRequest
+
+# Границы корзин гистограмм, секунды
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Размер пула соединений к Bot API, как у ApplicationBuilder по умолчанию
+CONNECTION_POOL_SIZE = 256
+
+
+def _format_labels(labelnames: Sequence[str], labels: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [
+        '{}="{}"'.format(name, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in zip(labelnames, labels)
+    ]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """Счётчик с метками; значения только растут"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def get(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+                for labels, value in values]
+
+
+class Histogram:
+    """Гистограмма длительностей с метками (корзины накопительные, как в Prometheus)"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # метки -> [счётчики корзин..., сумма, количество]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def time(self, *labels: str) -> "_Timer":
+        """Контекстный менеджер: замер длительности блока"""
+        return _Timer(self, labels)
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return series[-1] if series else 0
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            series_items = sorted((labels, list(series)) for labels, series in self._series.items())
+        lines = []
+        for labels, series in series_items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {series[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {series[-1]}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Tuple[str, ...]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+class _Gauge:
+    """Значение, которое вычисляется в момент выдачи метрик"""
+
+    def __init__(self, name: str, documentation: str, func: Callable, kind: str, labelnames: Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.func = func
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+
+    def collect(self) -> List[str]:
+        value = self.func()
+        if not isinstance(value, dict):
+            return [f"{self.name} {_format_value(value)}"]
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(item)}"
+                for labels, item in sorted(value.items())]
+
+
+class MetricsRegistry:
+    """
+    Набор метрик и их выдача в текстовом формате Prometheus.
+    Выдача только читает значения из памяти, поэтому её можно выполнять
+    прямо в цикле событий.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Union[Counter, Histogram, _Gauge]] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._metrics.setdefault(name, Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name: str, documentation: str, func: Callable, kind: str = 'gauge',
+              labelnames: Sequence[str] = ()):
+        """
+        Метрика, читаемая функцией при выдаче: число или {метки: число}.
+        Повторная регистрация с тем же именем заменяет функцию.
+        """
+        self._metrics[name] = _Gauge(name, documentation, func, kind, labelnames)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            try:
+                samples = metric.collect()
+            except Exception:
+                # Источник значения уже закрыт (например, при остановке бота)
+                continue
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+HANDLER_LATENCY = REGISTRY.histogram(
+    'bot_handler_duration_seconds', 'Длительность обработчиков обновлений', ['handler'])
+HANDLER_ERRORS = REGISTRY.counter(
+    'bot_handler_errors_total', 'Исключения в обработчиках обновлений', ['handler'])
+API_LATENCY = REGISTRY.histogram(
+    'telegram_api_request_duration_seconds', 'Длительность запросов к Bot API', ['method'])
+API_ERRORS = REGISTRY.counter(
+    'telegram_api_errors_total', 'Ошибки запросов к Bot API (HTTP-код или тип исключения)', ['method', 'reason'])
+DB_LATENCY = REGISTRY.histogram(
+    'db_query_duration_seconds', 'Длительность вызовов базы данных с ожиданием потока базы', ['method'])
+
+
+def timed_handler(callback: Callable) -> Callable:
+    """Обёртка обработчика: длительность и исключения по имени обработчика"""
+    name = callback.__name__
+
+    @functools.wraps(callback)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await callback(*args, **kwargs)
+        except Exception:
+            HANDLER_ERRORS.inc(name)
+            raise
+        finally:
+            HANDLER_LATENCY.observe(time.perf_counter() - start, name)
+
+    return wrapper
+
+
+class InstrumentedRequest(HTTPXRequest):
+    """HTTPXRequest с замером длительности и ошибок каждого метода Bot API"""
+
+    def __init__(self, connection_pool_size: int = CONNECTION_POOL_SIZE, **kwargs):
+        super().__init__(connection_pool_size=connection_pool_size, **kwargs)
+
+    async def do_request(self, url: str, method: str, *args, **kwargs) -> Tuple[int, bytes]:
+        api_method = url.rsplit('/', 1)[-1]
+        start = time.perf_counter()
+        try:
+            status, payload = await super().do_request(url, method, *args, **kwargs)
+        except Exception as e:
+            API_ERRORS.inc(api_method, type(e).__name__)
+            raise
+        finally:
+            API_LATENCY.observe(time.perf_counter() - start, api_method)
+        if status >= 400:
+            API_ERRORS.inc(api_method, str(status))
+        return status, payload
@@ -0,0 +1,226 @@
+import sqlite3
+import logging
+from typing import Callable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _column_names(cursor: sqlite3.Cursor, table: str) -> List[str]:
+    """Список колонок таблицы"""
+    cursor.execute(f"PRAGMA table_info({table})")
+    return [column[1] for column in cursor.fetchall()]
+
+
+def _migration_base_schema(cursor: sqlite3.Cursor):
+    """
+    Базовая схема: таблицы content, stats и post_media.
+    Для баз, созданных до появления миграций, добавляет недостающие колонки.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS content (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            message_id INTEGER UNIQUE,
+            channel_id INTEGER,
+            channel_username TEXT,
+            category TEXT,
+            title TEXT,
+            text TEXT,
+            media_type TEXT,
+            media_file_id TEXT,
+            media_file_unique_id TEXT,
+            media_group_id TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    columns = _column_names(cursor, 'content')
+    if 'media_file_unique_id' not in columns:
+        cursor.execute('ALTER TABLE content ADD COLUMN media_file_unique_id TEXT')
+    if 'media_group_id' not in columns:
+        cursor.execute('ALTER TABLE content ADD COLUMN media_group_id TEXT')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS stats (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            category TEXT,
+            count INTEGER DEFAULT 0,
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS post_media (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            content_id INTEGER,
+            message_id INTEGER,
+            media_type TEXT,
+            media_file_id TEXT,
+            media_file_unique_id TEXT,
+            media_order INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (content_id) REFERENCES content (id) ON DELETE CASCADE
+        )
+    ''')
+
+
+def _migration_indexes(cursor: sqlite3.Cursor):
+    """Индексы для выборок по категории, медиа-группе, дате и медиафайлам поста"""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_content_category_created ON content (category, created_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_content_media_group ON content (media_group_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_content_created ON content (created_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_content_media_type_created ON content (media_type, created_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_post_media_content_order ON post_media (content_id, media_order)')
+
+
+def _migration_full_text_search(cursor: sqlite3.Cursor):
+    """
+    Полнотекстовый индекс FTS5 по заголовку и тексту постов.
+    Индекс хранит только токены (external content) и синхронизируется триггерами.
+    Если SQLite собран без FTS5, миграция пропускается и поиск работает через LIKE.
+    """
+    try:
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS content_fts USING fts5(
+                title,
+                text,
+                content='content',
+                content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2',
+                prefix='2 3'
+            )
+        ''')
+    except sqlite3.OperationalError as e:
+        logger.warning(f"⚠️ FTS5 недоступен, полнотекстовый поиск отключён: {e}")
+        return
+
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS content_fts_insert AFTER INSERT ON content BEGIN
+            INSERT INTO content_fts (rowid, title, text) VALUES (new.id, new.title, new.text);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS content_fts_delete AFTER DELETE ON content BEGIN
+            INSERT INTO content_fts (content_fts, rowid, title, text) VALUES ('delete', old.id, old.title, old.text);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS content_fts_update AFTER UPDATE OF title, text ON content BEGIN
+            INSERT INTO content_fts (content_fts, rowid, title, text) VALUES ('delete', old.id, old.title, old.text);
+            INSERT INTO content_fts (rowid, title, text) VALUES (new.id, new.title, new.text);
+        END
+    ''')
+    cursor.execute("INSERT INTO content_fts (content_fts) VALUES ('rebuild')")
+
+
+def _migration_category_counters(cursor: sqlite3.Cursor):
+    """
+    Счётчики постов по категориям, которые триггеры поддерживают при каждой
+    вставке, удалении и смене категории поста. Статистика читается без подсчёта по content.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS category_counters (
+            category TEXT PRIMARY KEY,
+            count INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS category_counters_insert
+        AFTER INSERT ON content WHEN new.category IS NOT NULL BEGIN
+            INSERT INTO category_counters (category, count) VALUES (new.category, 1)
+            ON CONFLICT(category) DO UPDATE SET count = count + 1;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS category_counters_delete
+        AFTER DELETE ON content WHEN old.category IS NOT NULL BEGIN
+            UPDATE category_counters SET count = count - 1 WHERE category = old.category;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS category_counters_update
+        AFTER UPDATE OF category ON content WHEN old.category IS NOT new.category BEGIN
+            UPDATE category_counters SET count = count - 1 WHERE category = old.category;
+            INSERT INTO category_counters (category, count)
+            SELECT new.category, 1 WHERE new.category IS NOT NULL
+            ON CONFLICT(category) DO UPDATE SET count = count + 1;
+        END
+    ''')
+    cursor.execute('DELETE FROM category_counters')
+    cursor.execute('''
+        INSERT INTO category_counters (category, count)
+        SELECT category, COUNT(*) FROM content WHERE category IS NOT NULL GROUP BY category
+    ''')
+
+
+def _migration_media_validity(cursor: sqlite3.Cursor):
+    """
+    Результаты отправки медиафайлов: когда файл последний раз успешно отправлен
+    и когда отправка не удалась. Ключ — file_unique_id, если он известен, иначе file_id.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS media_validity (
+            file_key TEXT PRIMARY KEY,
+            last_verified_at REAL,
+            last_failure_at REAL,
+            failure_count INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT
+        )
+    ''')
+
+
+# Упорядоченный список миграций: (версия, описание, функция)
+# Новые миграции добавляются только в конец, уже применённые не меняются
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Cursor], None]]] = [
+    (1, 'Базовая схема content, stats, post_media', _migration_base_schema),
+    (2, 'Индексы content и post_media', _migration_indexes),
+    (3, 'Полнотекстовый поиск content_fts', _migration_full_text_search),
+    (4, 'Счётчики постов по категориям category_counters', _migration_category_counters),
+    (5, 'Доступность медиафайлов media_validity', _migration_media_validity),
+]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Текущая версия схемы базы данных (0 — миграции не применялись)"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    row = conn.execute('SELECT MAX(version) FROM schema_version').fetchone()
+    return row[0] or 0
+
+
+def run_migrations(conn: sqlite3.Connection) -> List[int]:
+    """
+    Применение всех ещё не применённых миграций по порядку.
+    Каждая миграция выполняется в собственной транзакции вместе с записью
+    в schema_version. Возвращает список применённых версий.
+    """
+    current_version = get_schema_version(conn)
+    conn.commit()
+
+    applied = []
+    for version, description, migrate in MIGRATIONS:
+        if version <= current_version:
+            continue
+
+        cursor = conn.cursor()
+        try:
+            cursor.execute('BEGIN')
+            migrate(cursor)
+            cursor.execute(
+                'INSERT INTO schema_version (version, description) VALUES (?, ?)',
+                (version, description)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            logger.error(f"❌ Ошибка миграции {version}: {description}")
+            raise
+
+        logger.info(f"✅ Применена миграция {version}: {description}")
+        applied.append(version)
+
+    return applied
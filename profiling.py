@@ -0,0 +1,151 @@
+import cProfile
+import functools
+import heapq
+import itertools
+import logging
+import os
+import random
+import re
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import PROFILE_DIR, PROFILE_ENABLED, PROFILE_KEEP, PROFILE_SAMPLE
+
+logger = logging.getLogger(__name__)
+
+_UNSAFE_CHARS = re.compile(r'[^A-Za-z0-9_.-]+')
+
+
+class Profiler:
+    """
+    Профилирование отдельных запросов через cProfile, включаемое на ходу.
+    Пока профилирование выключено, обёртки стоят одну проверку флага.
+    Включённое, оно профилирует по одному вызову на поток за раз
+    (cProfile не вкладывается): обработчики в потоке цикла событий,
+    методы базы в потоке базы данных. В профиль асинхронного обработчика
+    попадают и корутины, выполнявшиеся во время его ожидания.
+    cProfile замедляет поток цикла событий в разы, поэтому под нагрузкой
+    стоит профилировать только долю запросов sample_rate.
+    На диске хранятся профили keep самых медленных запросов (*.prof,
+    смотреть через python -m pstats или snakeviz); более быстрые удаляются.
+    """
+
+    def __init__(self, enabled: bool = False, directory: str = 'profiles', keep: int = 20,
+                 sample_rate: float = 1.0):
+        self.enabled = enabled
+        self.directory = directory
+        self.keep = keep
+        self.sample_rate = sample_rate
+        self.profiled = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # Куча (длительность, номер, имя, путь): сверху самый быстрый из сохранённых
+        self._slowest: List[Tuple[float, int, str, str]] = []
+        self._seq = itertools.count()
+
+    def enable(self):
+        self.enabled = True
+        logger.info(f"🔬 Профилирование включено: {self.keep} самых медленных запросов в {self.directory}")
+
+    def disable(self):
+        self.enabled = False
+        logger.info("🔬 Профилирование выключено")
+
+    def slowest(self) -> List[Tuple[str, float, str]]:
+        """Сохранённые профили (имя, длительность в секундах, путь), от самого медленного"""
+        with self._lock:
+            entries = sorted(self._slowest, reverse=True)
+        return [(name, duration, path) for duration, _, name, path in entries]
+
+    def status(self) -> Dict:
+        return {
+            'enabled': self.enabled,
+            'directory': self.directory,
+            'sample_rate': self.sample_rate,
+            'profiled': self.profiled,
+            'slowest': [{'name': name, 'ms': round(duration * 1000, 1)} for name, duration, _ in self.slowest()],
+        }
+
+    def _start(self) -> Optional[cProfile.Profile]:
+        if getattr(self._local, 'active', False):
+            return None
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Другой профилировщик уже активен (sys.monitoring в Python 3.12+)
+            return None
+        self._local.active = True
+        return profile
+
+    def _finish(self, profile: cProfile.Profile, name: str, duration: float):
+        profile.disable()
+        self._local.active = False
+        with self._lock:
+            self.profiled += 1
+            if len(self._slowest) >= self.keep and (not self._slowest or duration <= self._slowest[0][0]):
+                return
+            path = os.path.join(self.directory, f"{int(duration * 1000):07d}ms_{name}_{int(time.time())}.prof")
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                profile.dump_stats(path)
+            except OSError as e:
+                logger.error(f"❌ Не удалось сохранить профиль {path}: {e}")
+                return
+            heapq.heappush(self._slowest, (duration, next(self._seq), name, path))
+            if len(self._slowest) > self.keep:
+                _, _, _, evicted = heapq.heappop(self._slowest)
+                try:
+                    os.remove(evicted)
+                except OSError:
+                    pass
+        logger.debug("🔬 Профиль %s: %.1f мс", name, duration * 1000)
+
+    def call(self, name: str, func: Callable, *args, **kwargs):
+        """Вызов синхронной функции с профилированием (если включено)"""
+        profile = self._start() if self.enabled else None
+        if profile is None:
+            return func(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self._finish(profile, name, time.perf_counter() - start)
+
+    async def call_async(self, name: str, func: Callable, *args, **kwargs):
+        """Вызов корутины с профилированием (если включено)"""
+        profile = self._start() if self.enabled else None
+        if profile is None:
+            return await func(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            self._finish(profile, name, time.perf_counter() - start)
+
+
+def _request_name(name: str, update) -> str:
+    """Имя профиля: обработчик и, для нажатий кнопок, данные кнопки"""
+    query = getattr(update, 'callback_query', None)
+    if query is not None and query.data:
+        name = f"{name}-{query.data}"
+    return _UNSAFE_CHARS.sub('_', name)[:80]
+
+
+def profiled_handler(callback: Callable) -> Callable:
+    """Обёртка обработчика PTB: профиль запроса при включённом PROFILER"""
+    name = callback.__name__
+
+    @functools.wraps(callback)
+    async def wrapper(update, *args, **kwargs):
+        if not PROFILER.enabled:
+            return await callback(update, *args, **kwargs)
+        return await PROFILER.call_async(_request_name(name, update), callback, update, *args, **kwargs)
+
+    return wrapper
+
+
+PROFILER = Profiler(enabled=PROFILE_ENABLED, directory=PROFILE_DIR, keep=PROFILE_KEEP, sample_rate=PROFILE_SAMPLE)
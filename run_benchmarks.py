@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Набор бенчмарков бота на синтетических данных (bench_fixtures):
+- categorize: категоризация постов ContentAnalyzer
+- ingest: пакетная запись постов в Database (upsert_posts)
+- hydrate_cold / hydrate_warm: страницы категорий запросом к SQLite и из кэша чтения
+- handler_taps: нажатия на категории через Application.process_update с заглушкой Bot API
+- handler_channel_posts: посты канала через обработчик и фоновое сохранение
+
+Результаты выводятся таблицей и сохраняются в JSON (--output); с --compare
+печатается отношение к результатам другого коммита.
+
+Запуск: python run_benchmarks.py [--posts 100000] [--taps 500] [--output bench.json] [--compare old.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict
+
+from async_database import AsyncDatabase
+from bench_fixtures import (
+    BENCH_TOKEN, RecordingRequest, callback_update, channel_post_update, make_posts, make_texts
+)
+from content_analyzer import ContentAnalyzer
+from database import Database
+from delivery import DeliveryScheduler
+
+CATEGORIES = ['power_results', 'sport_tips', 'challenges', 'memes', 'exercises', 'flood', 'other']
+INGEST_BATCH = 500
+
+
+def result(ops: int, elapsed: float, **extra) -> Dict:
+    return {'ops': ops, 'seconds': round(elapsed, 4), 'ops_per_sec': round(ops / elapsed, 1), **extra}
+
+
+def timed(ops: int, func: Callable[[], None], **extra) -> Dict:
+    start = time.perf_counter()
+    func()
+    return result(ops, time.perf_counter() - start, **extra)
+
+
+def bench_categorize(posts: int) -> Dict:
+    analyzer = ContentAnalyzer()
+    texts = make_texts(posts)
+
+    def run():
+        for title, text in texts:
+            analyzer.categorize_content(text, title)
+
+    return timed(posts, run)
+
+
+def bench_ingest(db: Database, posts: list) -> Dict:
+    def run():
+        for start in range(0, len(posts), INGEST_BATCH):
+            db.upsert_posts(posts[start:start + INGEST_BATCH])
+
+    return timed(len(posts), run)
+
+
+def bench_hydrate(db: Database, pages: int, cached: bool) -> Dict:
+    rng = random.Random(7)
+    requests = []
+    for _ in range(pages):
+        category = rng.choice(CATEGORIES)
+        first, _, has_older = db.get_category_page(category)
+        requests.append((category, first[-1]['id'] if first and has_older and rng.random() < 0.5 else None))
+
+    # Без кэша — тот же запрос, что выполняется при промахе
+    fetch = db.get_category_page if cached else (
+        lambda category, anchor_id: db._fetch_category_page(category, 5, anchor_id, 'older'))
+
+    def run():
+        for category, anchor_id in requests:
+            fetch(category, anchor_id=anchor_id)
+
+    return timed(pages, run)
+
+
+async def _run_handlers(db_path: str, taps: int, channel_posts: int) -> Dict:
+    from bot import ContentBot
+
+    request = RecordingRequest()
+    bot = ContentBot(token=BENCH_TOKEN, request=request, db=AsyncDatabase(db_path=db_path))
+    # Без ограничений скорости: замеряется работа бота, а не лимиты Telegram
+    bot.delivery = DeliveryScheduler(global_rate=1e9, global_burst=1e9, chat_rate=1e9, chat_burst=1e9)
+    app = bot.application
+    await app.initialize()
+    # Тот же порядок, что и в ContentBot.serve: post_init, затем start
+    await bot.start_background_tasks(app)
+    await app.start()
+    results = {}
+    try:
+        rng = random.Random(11)
+        updates = [callback_update(i, 10_000 + i % 200, f'category_{rng.choice(CATEGORIES)}', app.bot)
+                   for i in range(taps)]
+        request.calls.clear()
+        latencies = []
+
+        async def process(update):
+            start = time.perf_counter()
+            await app.update_processor.process_update(update, app.process_update(update))
+            latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(process(update) for update in updates))
+        elapsed = time.perf_counter() - start
+        latencies.sort()
+        results['handler_taps'] = result(
+            taps, elapsed,
+            api_calls_per_op=round(len(request.calls) / taps, 2),
+            p50_ms=round(latencies[len(latencies) // 2] * 1000, 2),
+            p99_ms=round(latencies[int(len(latencies) * 0.99)] * 1000, 2),
+        )
+
+        texts = make_texts(channel_posts, seed=3)
+        updates = [channel_post_update(taps + i, 10_000_000 + i, f'{title}\n{text}', app.bot)
+                   for i, (title, text) in enumerate(texts)]
+        start = time.perf_counter()
+        for update in updates:
+            await app.process_update(update)
+        await bot.ingest_queue.join()
+        results['handler_channel_posts'] = result(channel_posts, time.perf_counter() - start)
+    finally:
+        await app.stop()
+        await bot.stop_background_tasks(app)
+        await app.shutdown()
+        await bot.db.close()
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run(posts: int, pages: int, taps: int, channel_posts: int) -> Dict:
+    results = {'categorize': bench_categorize(posts)}
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        db = Database(db_path)
+        results['ingest'] = bench_ingest(db, make_posts(posts))
+        results['hydrate_cold'] = bench_hydrate(db, pages, cached=False)
+        results['hydrate_warm'] = bench_hydrate(db, pages, cached=True)
+        db.close()
+        results.update(asyncio.run(_run_handlers(db_path, taps, channel_posts)))
+    return results
+
+
+def compare(results: Dict, baseline: Dict):
+    print(f"\n📈 Сравнение с {baseline.get('commit', '?')}:")
+    for name, metrics in results.items():
+        old = baseline.get('results', {}).get(name)
+        if old:
+            print(f"   {name:>22}: {metrics['ops_per_sec'] / old['ops_per_sec']:6.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарки бота')
+    parser.add_argument('--posts', type=int, default=100000, help='количество постов для категоризации и записи')
+    parser.add_argument('--pages', type=int, default=2000, help='количество выборок страниц категорий')
+    parser.add_argument('--taps', type=int, default=500, help='количество нажатий на категории')
+    parser.add_argument('--channel-posts', type=int, default=1000, help='количество постов канала через обработчик')
+    parser.add_argument('--output', help='файл для результатов в JSON')
+    parser.add_argument('--compare', help='JSON с результатами другого коммита')
+    args = parser.parse_args()
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'params': {'posts': args.posts, 'pages': args.pages, 'taps': args.taps,
+                   'channel_posts': args.channel_posts},
+        'results': run(args.posts, args.pages, args.taps, args.channel_posts),
+    }
+
+    print(f"📊 Бенчмарки ({report['commit']}):")
+    for name, metrics in report['results'].items():
+        extra = '   '.join(f"{key} {value}" for key, value in metrics.items()
+                           if key not in ('ops', 'seconds', 'ops_per_sec'))
+        print(f"   {name:>22}: {metrics['ops_per_sec']:10.1f} оп/с   {extra}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(report['results'], json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Тест асинхронного фасада базы данных
+"""
+
+import asyncio
+import os
+import sqlite3
+import tempfile
+import threading
+
+from async_database import AsyncDatabase
+from database import CONNECTION_TIMEOUT, Database
+
+
+def test_async_database():
+    """Запросы выполняются в потоке базы данных и возвращают результат"""
+
+    async def scenario(db_path):
+        db = AsyncDatabase(db_path=db_path)
+        try:
+            success = await db.add_content(
+                message_id=501,
+                channel_id=-1001,
+                channel_username="test_channel",
+                category="memes",
+                title="Асинхронный пост",
+                text="Текст"
+            )
+            assert success
+
+            post = await db.get_content_by_message_id(501)
+            assert post['title'] == "Асинхронный пост"
+
+            thread_name = await db.run(lambda: threading.current_thread().name)
+            assert thread_name.startswith("db")
+            assert thread_name != threading.current_thread().name
+
+            # Поток базы данных все запросы выполняет через одно соединение
+            first = await db.run(db.db._get_connection)
+            assert await db.run(db.db._get_connection) is first
+        finally:
+            await db.close()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(scenario(os.path.join(tmp, "test.db")))
+
+
+def test_connections_per_thread():
+    """Соединение создаётся один раз на поток; занятая база ожидается, а не даёт ошибку"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "test.db")
+        db = Database(path)
+        conn = db._get_connection()
+        assert db._get_connection() is conn
+        assert conn.execute('PRAGMA busy_timeout').fetchone()[0] == int(CONNECTION_TIMEOUT * 1000)
+
+        other = []
+        thread = threading.Thread(target=lambda: other.extend([db._get_connection(), db._get_connection()]))
+        thread.start()
+        thread.join()
+        assert other[0] is other[1] and other[0] is not conn
+        assert len(db._connections) == 2
+
+        # Другой процесс держит блокировку записи 0.2 с: add_content дожидается её
+        locker = sqlite3.connect(path, check_same_thread=False)
+        locker.execute('BEGIN IMMEDIATE')
+        release = threading.Timer(0.2, locker.commit)
+        release.start()
+        try:
+            assert db.add_content(1, -1001, 'memes', 'После блокировки')
+        finally:
+            release.join()
+            locker.close()
+        assert db.get_content_by_message_id(1)['title'] == 'После блокировки'
+        db.close()
+    print("✅ Асинхронный фасад базы данных работает")
+
+
+if __name__ == "__main__":
+    test_async_database()
+    test_connections_per_thread()
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Тест набора бенчмарков на маленьких объёмах
+"""
+
+from bench_fixtures import make_posts, make_texts
+from run_benchmarks import run
+
+
+def test_fixtures_are_deterministic():
+    """Синтетические данные одинаковы при одном seed"""
+    assert make_texts(20) == make_texts(20)
+    posts = make_posts(10, album_every=5)
+    assert [len(post.get('media', [])) for post in posts[:2]] == [3, 0]
+    assert posts[1]['message_id'] == posts[0]['message_id'] + 3
+
+
+def test_benchmarks_smoke():
+    """Все бенчмарки выполняются, нажатие на категорию стоит пяти запросов к API"""
+    results = run(posts=200, pages=20, taps=10, channel_posts=10)
+    assert set(results) == {'categorize', 'ingest', 'hydrate_cold', 'hydrate_warm',
+                            'handler_taps', 'handler_channel_posts'}
+    assert all(metrics['ops_per_sec'] > 0 for metrics in results.values())
+    # answerCallbackQuery, editMessageText, forwardMessages, editMessageText, sendMessage
+    assert results['handler_taps']['api_calls_per_op'] == 5
+    # Страница из кэша быстрее запроса к SQLite
+    assert results['hydrate_warm']['ops_per_sec'] > results['hydrate_cold']['ops_per_sec']
+    print("✅ Бенчмарки выполняются")
+
+
+if __name__ == "__main__":
+    test_fixtures_are_deterministic()
+    test_benchmarks_smoke()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Тест кэша чтения страниц категорий
+"""
+
+import os
+import tempfile
+import time
+
+from cache import ALL_CATEGORIES, QueryCache
+from database import Database
+
+
+def test_query_cache():
+    """LRU-вытеснение, время жизни, метки категорий и неизменяемые снимки без копирования"""
+    cache = QueryCache(maxsize=2, ttl=0.05)
+    stored = cache.set('a', [{'id': 1, 'media_files': [{'order': 0}]}], ('memes',))
+    cache.set('b', [2], ('flood',))
+    value = cache.get('a')
+    assert value is stored
+    assert value == ({'id': 1, 'media_files': ({'order': 0},)},)
+    try:
+        value[0]['id'] = 100
+        assert False, "снимок из кэша изменился"
+    except TypeError:
+        pass
+
+    # 'b' использовался давнее всего и вытесняется
+    cache.set('c', [3], (ALL_CATEGORIES,))
+    assert cache.get('b') is None
+
+    cache.invalidate('flood')
+    assert cache.get('a') is stored
+    assert cache.get('c') is None
+
+    generation = cache.generation
+    cache.invalidate('memes')
+    cache.set('late', [4], ('memes',), generation)
+    assert cache.get('late') is None
+
+    cache.set('short', [5], ('memes',))
+    time.sleep(0.06)
+    assert cache.get('short') is None
+    assert cache.stats()['hits'] == 2
+
+
+def test_database_page_cache():
+    """Страницы берутся из кэша и сбрасываются только при записи в свою категорию"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'cache.db'))
+        for message_id in range(1, 4):
+            db.add_content(message_id=message_id, channel_id=-1001, category='memes', title=f'Пост {message_id}')
+        db.add_content(message_id=10, channel_id=-1001, category='flood', title='Флуд')
+
+        first = db.get_category_page('memes', 2)
+        assert db.get_category_page('memes', 2) == first
+        flood = db.get_content_with_media_files('flood')
+        stats = db.cache.stats()
+        assert (stats['hits'], stats['misses']) == (1, 2)
+
+        # Запись в другую категорию не трогает страницу memes
+        db.add_content(message_id=11, channel_id=-1001, category='flood', title='Ещё флуд')
+        assert db.get_category_page('memes', 2) == first
+        assert len(db.get_content_with_media_files('flood')) == 2
+
+        post_id = first[0][0]['id']
+        db.add_media_to_post(post_id, 3, 'photo', 'new_file', media_order=0)
+        assert db.get_category_page('memes', 2)[0][0]['media_files'][0]['media_file_id'] == 'new_file'
+
+        db.delete_content_by_id(post_id)
+        assert [post['message_id'] for post in db.get_category_page('memes', 2)[0]] == [2, 1]
+
+        # Смена категории сбрасывает обе категории
+        db.add_content(message_id=2, channel_id=-1001, category='flood', title='Пост 2')
+        assert [post['message_id'] for post in db.get_category_page('memes', 2)[0]] == [1]
+        assert len(db.get_content_with_media_files('flood')) == 3
+        assert flood != db.get_content_with_media_files('flood')
+        db.close()
+    print("✅ Кэш страниц категорий работает")
+
+
+if __name__ == "__main__":
+    test_query_cache()
+    test_database_page_cache()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Тест счётчиков постов по категориям
+"""
+
+import os
+import sqlite3
+import tempfile
+
+from database import Database
+
+
+def recount(db: Database) -> dict:
+    """Статистика прямым подсчётом по таблице content"""
+    rows = db._get_connection().execute(
+        'SELECT category, COUNT(*) FROM content GROUP BY category'
+    ).fetchall()
+    return dict(rows)
+
+
+def test_counters_follow_writes():
+    """Счётчики совпадают с подсчётом по content после любых изменений"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'counters.db'))
+        for message_id in range(1, 6):
+            db.add_content(message_id=message_id, channel_id=-1001,
+                           category='memes' if message_id % 2 else 'flood', title=f'Пост {message_id}')
+        assert db.get_real_stats() == recount(db) == {'memes': 3, 'flood': 2}
+
+        # Смена категории, удаление и пакетная запись
+        db.add_content(message_id=1, channel_id=-1001, category='flood', title='Пост 1')
+        db.delete_content_by_id(db.get_content_by_message_id(3)['id'])
+        db.upsert_posts([{'message_id': 10, 'channel_id': -1001, 'category': 'other'},
+                         {'message_id': 5, 'channel_id': -1001, 'category': 'other'}])
+        expected = {'flood': 3, 'other': 2}
+        assert db.get_real_stats() == recount(db) == expected
+        assert list(db.get_stats()) == ['flood', 'other']
+        assert db.get_total_posts_count() == 5
+
+        db.update_all_stats()
+        assert db.get_real_stats() == expected
+        db.close()
+
+
+def test_stats_snapshot_invalidation():
+    """Снимок статистики переиспользуется и сбрасывается при записи из другого соединения"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'snapshot.db')
+        db = Database(path)
+        db.add_content(message_id=1, channel_id=-1001, category='memes')
+        assert db.get_real_stats() == {'memes': 1}
+        snapshot = db._stats_cache
+        db.get_total_posts_count()
+        assert db._stats_cache is snapshot
+
+        with sqlite3.connect(path) as other:
+            other.execute("INSERT INTO content (message_id, category) VALUES (2, 'memes')")
+        assert db.get_real_stats() == {'memes': 2}
+        db.close()
+    print("✅ Счётчики категорий работают")
+
+
+if __name__ == "__main__":
+    test_counters_follow_writes()
+    test_stats_snapshot_invalidation()
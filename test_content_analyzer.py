@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Тест категоризации контента
+"""
+
+from bench_analyzer import legacy_categorize_by_keywords, make_corpus
+from content_analyzer import ContentAnalyzer
+
+
+def test_keyword_matcher_matches_legacy():
+    """Единое выражение даёт те же категории, что и поиск по каждому слову"""
+    analyzer = ContentAnalyzer()
+    for text in make_corpus(300, seed=7):
+        text = text.lower()
+        expected = legacy_categorize_by_keywords(analyzer.category_keywords, text)
+        assert analyzer._categorize_by_keywords(text) == expected
+
+
+def test_keyword_whole_words():
+    """Ключевые слова учитываются только целиком"""
+    analyzer = ContentAnalyzer()
+    assert analyzer._categorize_by_keywords("советы по технике") == 'sport_tips'
+    assert analyzer._categorize_by_keywords("мемчики и мемасы") is None
+    # При равных баллах побеждает категория, идущая раньше в CATEGORY_KEYWORDS
+    assert analyzer.categorize_content("Смешной мем про жим", "") == 'power_results'
+    assert analyzer.categorize_content("", "") == 'other'
+    print("✅ Категоризация по ключевым словам работает")
+
+
+def test_hashtag_index():
+    """Хештеги имеют приоритет и учитывают настраиваемые веса"""
+    analyzer = ContentAnalyzer()
+    assert analyzer.categorize_content("жим лёжа #мемы") == 'memes'
+    assert analyzer._categorize_by_hashtags("#мем #сила") == 'power_results'
+    assert analyzer._categorize_by_hashtags("#неизвестный") is None
+
+    analyzer.hashtag_weights = {'#мем': 5}
+    analyzer._build_hashtag_index()
+    assert analyzer._categorize_by_hashtags("#мем #сила") == 'memes'
+
+    analyzer.reload_config()
+    assert analyzer._categorize_by_hashtags("#мем #сила") == 'power_results'
+    print("✅ Категоризация по хештегам работает")
+
+
+def test_categorize_many():
+    """Пакетная категоризация совпадает с поштучной, в том числе в пуле процессов"""
+    analyzer = ContentAnalyzer()
+    items = [(text, "Заголовок") for text in make_corpus(200, seed=11)] + ["#мемы смешно", ""]
+    expected = [analyzer.categorize_content(*item) if isinstance(item, tuple) else analyzer.categorize_content(item)
+                for item in items]
+
+    results = list(analyzer.categorize_many(items))
+    assert [result.category for result in results] == expected
+    for result in results:
+        assert set(result.scores) == set(analyzer.categories)
+        if result.category != 'other':
+            assert result.scores[result.category] == max(result.scores.values())
+
+    pooled = list(analyzer.categorize_many(iter(items), processes=2, chunksize=16))
+    assert pooled == results
+    print("✅ Пакетная категоризация работает")
+
+
+if __name__ == "__main__":
+    test_keyword_matcher_matches_legacy()
+    test_keyword_whole_words()
+    test_hashtag_index()
+    test_categorize_many()
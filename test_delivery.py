@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Тест планировщика доставки постов
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+from telegram.error import RetryAfter
+
+from bot import ContentBot
+from delivery import DeliveryScheduler, TokenBucket
+from forward_strategy import ForwardStrategy
+
+
+def test_token_bucket_rate():
+    """Ведро пропускает всплеск, затем ограничивает скорость"""
+
+    async def scenario():
+        bucket = TokenBucket(rate=50, capacity=5)
+        start = time.monotonic()
+        for _ in range(10):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(scenario())
+    # 5 токенов сразу, ещё 5 со скоростью 50/с — не меньше 0.1 с
+    assert 0.09 <= elapsed < 1.0
+
+
+def test_token_bucket_cost_above_capacity():
+    """Запрос дороже ёмкости ведра не зависает, но следующий ждёт восстановления долга"""
+
+    async def scenario():
+        bucket = TokenBucket(rate=100, capacity=5)
+        start = time.monotonic()
+        await bucket.acquire(10)
+        first = time.monotonic() - start
+        await bucket.acquire(1)
+        return first, time.monotonic() - start
+
+    first, total = asyncio.run(scenario())
+    # После списания 10 из 5 токенов ведро в минусе на 5: ещё 6 токенов — 0.06 с
+    assert first < 0.03
+    assert total >= 0.05
+
+
+def test_delivery_order_and_retry_after():
+    """Порядок постов сохраняется, RetryAfter приводит к повтору"""
+    sent = []
+    failures = {3: 1}
+
+    def make_send(chat_id, n):
+        async def send():
+            if failures.get(n):
+                failures[n] -= 1
+                raise RetryAfter(0)
+            await asyncio.sleep(0.001)
+            sent.append((chat_id, n))
+            return n
+        return send
+
+    async def scenario():
+        scheduler = DeliveryScheduler(global_rate=1000, global_burst=100, chat_rate=1000, chat_burst=100)
+        results = await asyncio.gather(
+            asyncio.gather(*(scheduler.submit(1, make_send(1, n)) for n in range(6))),
+            asyncio.gather(*(scheduler.submit(2, make_send(2, n)) for n in range(6))),
+        )
+        metrics = scheduler.get_metrics()
+        await scheduler.close()
+        return results, metrics
+
+    results, metrics = asyncio.run(scenario())
+    assert results == [list(range(6)), list(range(6))]
+    assert [n for chat_id, n in sent if chat_id == 1] == list(range(6))
+    assert [n for chat_id, n in sent if chat_id == 2] == list(range(6))
+    assert metrics['delivered_total'] == 12
+    assert metrics['retry_after_total'] == 1
+    assert metrics['queue_depth'] == 0
+    assert metrics['delivered_per_sec'] > 0
+
+
+def test_delivery_failure_is_reported():
+    """Ошибка одного поста не останавливает отправку остальных"""
+
+    async def ok():
+        return 'ok'
+
+    async def broken():
+        raise ValueError("сбой")
+
+    async def scenario():
+        scheduler = DeliveryScheduler()
+        futures = [scheduler.submit(1, send) for send in (ok, broken, ok)]
+        results = await asyncio.gather(*futures, return_exceptions=True)
+        await scheduler.close()
+        return results, scheduler.failed_total
+
+    results, failed = asyncio.run(scenario())
+    assert results[0] == 'ok' and results[2] == 'ok'
+    assert isinstance(results[1], ValueError)
+    assert failed == 1
+
+
+class RecordingScheduler(DeliveryScheduler):
+    """Планировщик без ограничений, запоминающий стоимость каждого запроса"""
+
+    def __init__(self):
+        super().__init__(global_rate=1e6, global_burst=1e6, chat_rate=1e6, chat_burst=1e6)
+        self.costs = []
+
+    def submit(self, chat_id, send, cost=1):
+        self.costs.append((send.func.__name__, cost))
+        return super().submit(chat_id, send, cost)
+
+
+class FloodBot:
+    """Бот-заглушка: первый send_message получает RetryAfter"""
+
+    def __init__(self):
+        self.calls = []
+        self.flood = 1
+
+    async def forward_messages(self, chat_id, from_chat_id, message_ids):
+        self.calls.append('forward_messages')
+        return tuple(message_ids)
+
+    async def send_video_note(self, chat_id, video_note):
+        self.calls.append('send_video_note')
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        if self.flood:
+            self.flood -= 1
+            raise RetryAfter(0)
+        self.calls.append('send_message')
+
+
+def test_bot_sends_cost_messages_and_retry_single_call():
+    """Стоимость запроса — число сообщений; после RetryAfter повторяется только упавший запрос"""
+    api = FloodBot()
+    bot = ContentBot.__new__(ContentBot)
+    bot.application = SimpleNamespace(bot=api)
+    bot.forwarding = ForwardStrategy()
+    bot.delivery = RecordingScheduler()
+    album = {'message_id': 10, 'channel_id': -100, 'title': 'Альбом', 'text': '',
+             'media_files': [{'message_id': 10 + part, 'media_type': 'photo', 'media_file_id': f'f{part}'}
+                             for part in range(3)]}
+    note = {'message_id': 20, 'channel_id': None, 'title': 'Кружок', 'text': '',
+            'media_files': [{'media_type': 'video_note', 'media_file_id': 'note'}]}
+
+    async def scenario():
+        bot.db = SimpleNamespace(get_media_validity=_no_validity, record_media_results=_ignore)
+        await bot._send_post(7, album)
+        await bot._send_post(7, note)
+        await bot.delivery.close()
+
+    asyncio.run(scenario())
+    assert bot.delivery.costs == [('forward_messages', 3), ('send_video_note', 1), ('send_message', 1)]
+    assert api.calls == ['forward_messages', 'send_video_note', 'send_message']
+    assert bot.delivery.retry_after_total == 1
+    print("✅ Планировщик доставки работает")
+
+
+async def _no_validity(keys):
+    return {}
+
+
+async def _ignore(*args):
+    pass
+
+
+if __name__ == "__main__":
+    test_token_bucket_rate()
+    test_delivery_order_and_retry_after()
+    test_delivery_failure_is_reported()
+    test_token_bucket_cost_above_capacity()
+    test_bot_sends_cost_messages_and_retry_single_call()
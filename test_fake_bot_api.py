@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Тест заглушки Bot API и нагрузочного теста
+"""
+
+import asyncio
+
+from telegram import Bot
+from telegram.error import RetryAfter
+
+from bench_fixtures import BENCH_TOKEN
+from fake_bot_api import FakeBotApi
+from load_test import run_load
+
+
+def test_fake_api_responses():
+    """Ответы разбираются PTB, message_id растут по чатам, 429 приводит к RetryAfter"""
+
+    async def scenario():
+        api = FakeBotApi()
+        await api.start()
+        try:
+            async with Bot(BENCH_TOKEN, base_url=api.base_url) as bot:
+                first = await bot.send_message(chat_id=7, text='привет')
+                second = await bot.send_message(chat_id=7, text='ещё')
+                other = await bot.send_message(chat_id=8, text='привет')
+                forwarded = await bot.forward_messages(chat_id=7, from_chat_id=-100, message_ids=[3, 4, 5])
+
+                api.rate_limit_probability = 1.0
+                try:
+                    await bot.send_message(chat_id=7, text='много')
+                    rate_limited = None
+                except RetryAfter as e:
+                    rate_limited = e
+            return api, first, second, other, forwarded, rate_limited
+        finally:
+            await api.stop()
+
+    api, first, second, other, forwarded, rate_limited = asyncio.run(scenario())
+    assert (first.chat.id, first.message_id, second.message_id, other.message_id) == (7, 1, 2, 1)
+    assert [message.message_id for message in forwarded] == [3, 4, 5]
+    assert rate_limited is not None
+    assert api.calls['sendMessage'] == 4 and api.rate_limited['sendMessage'] == 1
+
+
+def test_load_smoke():
+    """Нагрузочный тест проходит на малом объёме без ошибок обработчиков"""
+    report = asyncio.run(run_load(users=5, taps=2, rps=500, channel_posts=3, post_rate=500,
+                                  latency=0.0, jitter=0.0, rate_limit=0.0, unthrottled=True,
+                                  seed_posts=100))
+    assert report['taps']['count'] == 10
+    assert report['channel_posts']['count'] == 3
+    assert report['handler_errors'] == {'button_callback': 0, 'channel_message_handler': 0}
+    assert report['api_calls']['answerCallbackQuery'] == 10
+    assert report['taps']['p99_ms'] >= report['taps']['p50_ms']
+    print("✅ Заглушка Bot API и нагрузочный тест работают")
+
+
+if __name__ == "__main__":
+    test_fake_api_responses()
+    test_load_smoke()
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Тест выбора способа доставки постов из канала
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+from telegram import MessageId
+from telegram.error import BadRequest, Forbidden, TimedOut
+
+from bot import ContentBot
+from delivery import DeliveryScheduler
+from forward_strategy import COPY, FORWARD, MEDIA, ForwardStrategy, classify_failure
+
+
+class ChannelBot:
+    """Бот-заглушка: пересылка из канала запрещена, копирование работает"""
+
+    def __init__(self, deleted=()):
+        self.deleted = set(deleted)
+        self.calls = []
+
+    async def forward_message(self, chat_id, from_chat_id, message_id):
+        self.calls.append(('forward_message', message_id))
+        if message_id in self.deleted:
+            raise BadRequest("Message to forward not found")
+        raise BadRequest("Message has protected content and can't be forwarded")
+
+    async def copy_message(self, chat_id, from_chat_id, message_id):
+        self.calls.append(('copy_message', message_id))
+        if message_id in self.deleted:
+            raise BadRequest("Message to copy not found")
+        return message_id
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        self.calls.append(('send_message', None))
+
+
+class BatchBot:
+    """Бот-заглушка для пакетной пересылки: удалённые сообщения пропускаются"""
+
+    def __init__(self, deleted=(), text_fails=False):
+        self.deleted = set(deleted)
+        self.text_fails = text_fails
+        self.calls = []
+
+    async def forward_messages(self, chat_id, from_chat_id, message_ids):
+        assert list(message_ids) == sorted(set(message_ids))
+        self.calls.append(('forward_messages', from_chat_id, tuple(message_ids)))
+        return tuple(MessageId(1000 + message_id) for message_id in message_ids if message_id not in self.deleted)
+
+    async def forward_message(self, chat_id, from_chat_id, message_id):
+        self.calls.append(('forward_message', from_chat_id, message_id))
+        if message_id in self.deleted:
+            raise BadRequest("Message to forward not found")
+        return MessageId(1000 + message_id)
+
+    async def delete_messages(self, chat_id, message_ids):
+        self.calls.append(('delete_messages', None, tuple(message_ids)))
+        return True
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        self.calls.append(('send_message', None, None))
+        if self.text_fails:
+            raise BadRequest("Message is too long")
+
+
+def make_bot(api) -> ContentBot:
+    bot = ContentBot.__new__(ContentBot)
+    bot.application = SimpleNamespace(bot=api)
+    bot.forwarding = ForwardStrategy()
+    bot.delivery = DeliveryScheduler(global_rate=1000, global_burst=100, chat_rate=1000, chat_burst=100)
+    return bot
+
+
+def channel_post(channel_id, message_id, album=()):
+    return {
+        'message_id': message_id, 'channel_id': channel_id, 'title': 'Пост', 'text': '',
+        'media_files': [{'message_id': part, 'media_type': 'photo', 'media_file_id': f'f{part}'}
+                        for part in album],
+    }
+
+
+def test_classify_failure():
+    """Ошибки message_id относятся к посту, запреты и недоступность — к каналу, сеть не запоминается"""
+    for text in ("Message to forward not found", "Message to copy not found", "MESSAGE_ID_INVALID",
+                 "Message can't be forwarded", "Message can't be copied"):
+        assert classify_failure(BadRequest(text)) == 'post', text
+    for text in ("CHAT_FORWARDS_RESTRICTED", "Message has protected content and can't be forwarded",
+                 "CHANNEL_PRIVATE"):
+        assert classify_failure(BadRequest(text)) == 'channel', text
+    assert classify_failure(Forbidden("bot is not a member of the channel chat")) == 'channel'
+    # Ошибки получателя не относятся к каналу
+    for error in (Forbidden("bot was blocked by the user"), Forbidden("user is deactivated"),
+                  Forbidden("bot is not a member of the supergroup chat"),
+                  BadRequest("not enough rights to send text messages to the chat")):
+        assert classify_failure(error, destination_ok=True) == 'destination', error
+    # Неоднозначные — к каналу, только если получатель доступен
+    for error in (BadRequest("Chat not found"), Forbidden("Forbidden")):
+        assert classify_failure(error) == 'destination', error
+        assert classify_failure(error, destination_ok=True) == 'channel', error
+    assert classify_failure(TimedOut()) is None
+
+
+def test_destination_errors_keep_channel_methods():
+    """Заблокировавший бота пользователь и неоднозначная ошибка не отключают способы канала"""
+    strategy = ForwardStrategy(retry_interval=60)
+    strategy.record_failure(-100, 1, FORWARD, Forbidden("bot was blocked by the user"), destination_ok=True)
+    strategy.record_failure(-100, 2, COPY, BadRequest("Chat not found"))
+    assert strategy.methods(-100, 3) == [FORWARD, COPY, MEDIA]
+    strategy.record_failure(-100, 4, FORWARD, BadRequest("Chat not found"), destination_ok=True)
+    assert strategy.methods(-100, 5) == [COPY, MEDIA]
+
+
+def test_missing_posts_expire():
+    """Отметка об удалённом оригинале действует missing_post_ttl секунд"""
+    strategy = ForwardStrategy(retry_interval=60)
+    strategy.record_failure(-100, 1, FORWARD, BadRequest("Message to forward not found"))
+    strategy.record_batch_shortfall(-100, [2])
+    assert strategy.methods(-100, 1) == [MEDIA]
+    assert strategy.batch_method(-100, 2) is None
+    strategy.missing_post_ttl = 0
+    assert strategy.methods(-100, 1) == [FORWARD, COPY, MEDIA]
+    assert strategy.batch_method(-100, 2) == FORWARD
+    assert strategy.get_metrics()['missing_posts'] == 0
+
+
+def test_invalid_post_keeps_channel_methods():
+    """Неверный message_id одного поста не отключает пересылку для всего канала"""
+    strategy = ForwardStrategy(retry_interval=60)
+    strategy.record_failure(-100, 1, FORWARD, BadRequest("MESSAGE_ID_INVALID"))
+    assert strategy.methods(-100, 1) == [MEDIA]
+    assert strategy.methods(-100, 2) == [FORWARD, COPY, MEDIA]
+    assert strategy.get_metrics()['channels_restricted'] == 0
+
+
+def test_strategy_learns_outcomes():
+    """Неудачный способ пропускается до истечения retry_interval"""
+    strategy = ForwardStrategy(retry_interval=60)
+    assert strategy.methods(None, 1) == [MEDIA]
+    assert strategy.methods(-100, 1) == [FORWARD, COPY, MEDIA]
+
+    strategy.record_failure(-100, 1, FORWARD, BadRequest("CHAT_FORWARDS_RESTRICTED"))
+    assert strategy.methods(-100, 2) == [COPY, MEDIA]
+    assert strategy.methods(-200, 2) == [FORWARD, COPY, MEDIA]
+
+    strategy.record_failure(-100, 3, COPY, BadRequest("Message to copy not found"))
+    assert strategy.methods(-100, 3) == [MEDIA]
+    assert strategy.methods(-100, 4) == [COPY, MEDIA]
+
+    strategy.record_failure(-100, 4, COPY, TimedOut())
+    assert strategy.methods(-100, 4) == [COPY, MEDIA]
+
+    strategy.retry_interval = 0
+    assert strategy.methods(-100, 5) == [FORWARD, COPY, MEDIA]
+    strategy.record_success(-100, 5, FORWARD)
+    assert strategy.get_metrics()['channels_restricted'] == 0
+
+
+def test_repeat_views_skip_failing_forward():
+    """Повторный просмотр не повторяет запрещённую пересылку"""
+
+    async def scenario():
+        api = ChannelBot(deleted={3})
+        bot = make_bot(api)
+        posts = [{'message_id': n, 'channel_id': -100, 'title': 'Пост', 'text': '', 'media_files': []}
+                 for n in (1, 2, 3)]
+        for post in posts:
+            await bot._send_post(7, post)
+        first = list(api.calls)
+        api.calls.clear()
+        for post in posts:
+            await bot._send_post(7, post)
+        return first, api.calls
+
+    first, repeat = asyncio.run(scenario())
+    assert first == [('forward_message', 1), ('copy_message', 1),
+                     ('copy_message', 2),
+                     ('copy_message', 3), ('send_message', None)]
+    assert repeat == [('copy_message', 1), ('copy_message', 2), ('send_message', None)]
+
+
+class MissingChatBot(ChannelBot):
+    """Бот-заглушка: канал не найден; получатель доступен, если не blocked"""
+
+    def __init__(self, blocked=False):
+        super().__init__()
+        self.blocked = blocked
+
+    async def forward_message(self, chat_id, from_chat_id, message_id):
+        self.calls.append(('forward_message', message_id))
+        raise BadRequest("Chat not found")
+
+    async def copy_message(self, chat_id, from_chat_id, message_id):
+        self.calls.append(('copy_message', message_id))
+        raise BadRequest("Chat not found")
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        self.calls.append(('send_message', None))
+        if self.blocked:
+            raise Forbidden("bot was blocked by the user")
+
+
+def test_ambiguous_error_resolved_by_destination():
+    """chat not found отключает способы канала, только если получателю удалось отправить текст"""
+
+    async def scenario(blocked):
+        bot = make_bot(MissingChatBot(blocked=blocked))
+        post = {'message_id': 1, 'channel_id': -100, 'title': 'Пост', 'text': '', 'media_files': []}
+        try:
+            await bot._send_post(7, post)
+        except Forbidden:
+            pass
+        await bot.delivery.close()
+        return bot.forwarding.methods(-100, 2)
+
+    assert asyncio.run(scenario(blocked=False)) == [MEDIA]
+    assert asyncio.run(scenario(blocked=True)) == [FORWARD, COPY, MEDIA]
+
+
+
+def test_page_delivered_in_batches():
+    """Подряд идущие посты канала уходят одним запросом, альбом — целиком"""
+    posts = [
+        channel_post(-100, 10),
+        channel_post(-100, 11, album=(11, 12, 13)),
+        channel_post(-100, 20),
+        channel_post(-200, 5),
+        channel_post(-200, 3),
+        channel_post(None, 1),
+    ]
+
+    async def scenario():
+        api = BatchBot()
+        bot = make_bot(api)
+        delivered = await bot._deliver_posts(7, posts)
+        await bot.delivery.close()
+        return delivered, api.calls
+
+    delivered, calls = asyncio.run(scenario())
+    assert delivered == len(posts)
+    assert calls == [
+        ('forward_messages', -100, (10, 11, 12, 13, 20)),
+        ('forward_message', -200, 5),
+        ('forward_message', -200, 3),
+        ('send_message', None, None),
+    ]
+
+
+def test_batch_shortfall_falls_back_per_post():
+    """Неполный пакет удаляется и сразу уходит по одному, удалённый пост — через file_id"""
+    posts = [channel_post(-100, n) for n in (1, 2, 3)]
+
+    async def scenario(text_fails=False):
+        api = BatchBot(deleted={2}, text_fails=text_fails)
+        bot = make_bot(api)
+        first = await bot._deliver_posts(7, posts), list(api.calls)
+        api.calls.clear()
+        second = await bot._deliver_posts(7, posts), list(api.calls)
+        await bot.delivery.close()
+        return first, second, bot.forwarding.get_metrics()
+
+    (delivered, first), (delivered_again, second), metrics = asyncio.run(scenario())
+    assert first == [('forward_messages', -100, (1, 2, 3)), ('delete_messages', None, (1001, 1003)),
+                     ('forward_message', -100, 1),
+                     ('forward_message', -100, 2), ('send_message', None, None),
+                     ('forward_message', -100, 3)]
+    assert second == [('forward_message', -100, 1), ('send_message', None, None),
+                      ('forward_message', -100, 3)]
+    assert delivered == delivered_again == 3
+    assert metrics['batch_shortfalls'] == 1 and metrics['missing_posts'] == 1
+
+    # Пост, который не удалось отправить и по одному, не считается доставленным
+    (delivered, _), _, _ = asyncio.run(scenario(text_fails=True))
+    assert delivered == 2
+    print("✅ Стратегия доставки запоминает результаты")
+
+
+if __name__ == "__main__":
+    test_classify_failure()
+    test_invalid_post_keeps_channel_methods()
+    test_destination_errors_keep_channel_methods()
+    test_missing_posts_expire()
+    test_strategy_learns_outcomes()
+    test_repeat_views_skip_failing_forward()
+    test_ambiguous_error_resolved_by_destination()
+    test_page_delivered_in_batches()
+    test_batch_shortfall_falls_back_per_post()
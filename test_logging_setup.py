@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Тест настройки логирования
+"""
+
+import io
+import json
+import logging
+
+from logging_setup import parse_levels, setup_logging, stop_logging
+
+
+def test_parse_levels():
+    """Уровни модулей разбираются из строки, мусор пропускается"""
+    assert parse_levels('database=warning, telegram.ext=INFO,,bad') == {
+        'database': logging.WARNING,
+        'telegram.ext': logging.INFO,
+    }
+    assert parse_levels('') == {}
+
+
+def test_json_output_through_queue():
+    """Записи проходят через очередь, JSON содержит поля extra; уровни модулей применяются"""
+    stream = io.StringIO()
+    root = logging.getLogger()
+    saved_handlers, saved_level = list(root.handlers), root.level
+    try:
+        setup_logging('INFO', json_output=True, module_levels={'bench.quiet': logging.ERROR}, stream=stream)
+        logging.getLogger('bench.loud').info("пост %s сохранён", 42, extra={'category': 'memes'})
+        logging.getLogger('bench.loud').debug("не выводится")
+        logging.getLogger('bench.quiet').warning("не выводится")
+        stop_logging()
+    finally:
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        for handler in saved_handlers:
+            root.addHandler(handler)
+        root.setLevel(saved_level)
+        logging.getLogger('bench.quiet').setLevel(logging.NOTSET)
+
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == 1
+    entry = json.loads(lines[0])
+    assert entry['message'] == 'пост 42 сохранён'
+    assert entry['level'] == 'INFO' and entry['logger'] == 'bench.loud'
+    assert entry['category'] == 'memes'
+    print("✅ Логирование через очередь работает")
+
+
+if __name__ == "__main__":
+    test_parse_levels()
+    test_json_output_through_queue()
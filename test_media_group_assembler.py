@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Тест сборки медиа-групп и сохранения альбома одной транзакцией
+"""
+
+import asyncio
+import os
+import tempfile
+from types import SimpleNamespace
+
+from telegram import Update
+
+from async_database import AsyncDatabase
+from bot import CHANNEL_USERNAME, ContentBot
+from database import Database
+from media_groups import MediaGroupAssembler
+
+
+def test_assembler_debounce():
+    """Части альбома отдаются одним вызовом, по порядку message_id"""
+    completed = []
+
+    async def on_complete(group_key, parts):
+        completed.append((group_key, [part.message_id for part in parts]))
+
+    async def scenario():
+        assembler = MediaGroupAssembler(on_complete, delay=0.05, max_parts=3)
+        for message_id in (12, 10, 11):
+            assembler.add('album', SimpleNamespace(message_id=message_id))
+        # Полный альбом обрабатывается без ожидания
+        await asyncio.sleep(0.01)
+        assert completed == [('album', [10, 11, 12])]
+
+        assembler.add('small', SimpleNamespace(message_id=1))
+        await asyncio.sleep(0.03)
+        assembler.add('small', SimpleNamespace(message_id=2))
+        await asyncio.sleep(0.03)
+        assert assembler.pending == 1
+        await asyncio.sleep(0.05)
+        assert completed[-1] == ('small', [1, 2])
+
+        assembler.add('late', SimpleNamespace(message_id=5))
+        await assembler.flush_all()
+        assert completed[-1] == ('late', [5])
+        assert assembler.pending == 0
+
+    asyncio.run(scenario())
+
+
+def test_save_post_with_media():
+    """Пост и медиафайлы сохраняются вместе, повторные части не дублируются"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'groups.db'))
+        media = [(10, 'photo', 'p10'), (11, 'video', 'v11')]
+        saved = db.save_post_with_media(message_id=10, channel_id=-1001, category='memes',
+                                        title='Альбом', media_type='photo', media_file_id='p10',
+                                        media_group_id='g1', media=media)
+        assert saved == {'id': saved['id'], 'category': 'memes', 'created': True, 'media_added': 2}
+
+        # Опоздавшая часть и повтор уже сохранённых частей (например, пересылка)
+        again = db.save_post_with_media(message_id=10, channel_id=-1001, category='other',
+                                        media_group_id='g1', media=media + [(12, 'photo', 'p12')])
+        assert again == {'id': saved['id'], 'category': 'memes', 'created': False, 'media_added': 1}
+
+        stored = db.get_post_media(saved['id'])
+        assert [(m['message_id'], m['media_file_id'], m['media_order']) for m in stored] == [
+            (10, 'p10', 0), (11, 'v11', 1), (12, 'p12', 2)
+        ]
+        assert db.get_content_by_media_group_id('g1')['category'] == 'memes'
+        db.close()
+
+
+def channel_update(message_id: int, media_group_id: str = None) -> Update:
+    post = {
+        'message_id': message_id, 'date': 0,
+        'chat': {'id': -1001, 'type': 'channel', 'username': CHANNEL_USERNAME.lstrip('@')},
+    }
+    if media_group_id:
+        post.update(media_group_id=media_group_id, caption=f'Альбом {message_id}', photo=[
+            {'file_id': f'p{message_id}', 'file_unique_id': f'u{message_id}', 'width': 1, 'height': 1},
+        ])
+    else:
+        post['text'] = f'Пост {message_id}'
+    return Update.de_json({'update_id': message_id, 'channel_post': post}, None)
+
+
+def test_stop_saves_queued_posts():
+    """При остановке посты из очереди и недособранные альбомы сохраняются в базу"""
+
+    async def scenario(path):
+        db = AsyncDatabase(db_path=path)
+        bot = ContentBot(token='123:TEST', db=db)
+        await bot.start_background_tasks(bot.application)
+        # Обработчик только ставит посты в очередь: до остановки ничего не сохранено
+        for message_id in range(1, 21):
+            await bot.channel_message_handler(channel_update(message_id), None)
+        for message_id in (30, 31):
+            await bot.channel_message_handler(channel_update(message_id, media_group_id='album'), None)
+        assert bot.ingest_queue.qsize() == 20 and bot.channel_groups.pending == 1
+
+        await bot.stop_background_tasks(bot.application)
+        try:
+            assert bot.ingestion_task is None and bot.ingest_queue.empty()
+            total = await db.get_total_posts_count()
+            album = await db.get_content_by_message_id(30)
+            media = await db.get_post_media(album['id'])
+        finally:
+            await db.close()
+        return total, [m['message_id'] for m in media]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        total, album_parts = asyncio.run(scenario(os.path.join(tmp, 'ingest.db')))
+    assert total == 21
+    assert album_parts == [30, 31]
+    print("✅ Медиа-группы собираются и сохраняются одной транзакцией")
+
+
+if __name__ == "__main__":
+    test_assembler_debounce()
+    test_save_post_with_media()
+    test_stop_saves_queued_posts()
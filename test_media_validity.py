@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Тест учёта доступности медиафайлов
+"""
+
+import asyncio
+import os
+import re
+import tempfile
+from types import SimpleNamespace
+
+from telegram.error import BadRequest
+
+from async_database import AsyncDatabase
+from bot import ContentBot
+from database import Database
+from delivery import DeliveryScheduler
+from forward_strategy import ForwardStrategy
+
+
+class RecordingBot:
+    """
+    Бот-заглушка: записывает вызовы API, для file_id из broken отвечает BadRequest,
+    как Telegram, отклоняет HTML-подписи с неэкранированными < и &
+    """
+
+    def __init__(self, broken=()):
+        self.broken = set(broken)
+        self.calls = []
+        self.texts = []
+
+    def __getattr__(self, method):
+        async def call(**kwargs):
+            self.calls.append(method)
+            text = kwargs.get('caption') or kwargs.get('text') or ''
+            self.texts.append(text)
+            if kwargs.get('parse_mode') == 'HTML':
+                stripped = re.sub(r'</?b>|&(lt|gt|amp|quot|#x27);', '', text)
+                if '<' in stripped or '&' in stripped:
+                    raise BadRequest("Can't parse entities: unsupported start tag")
+            files = [kwargs.get('photo'), kwargs.get('video')]
+            files += [media.media for media in kwargs.get('media', [])]
+            if self.broken.intersection(files):
+                raise BadRequest("Wrong file identifier/http url specified")
+            return True
+        return call
+
+
+def make_bot(db: AsyncDatabase, api: RecordingBot) -> ContentBot:
+    bot = ContentBot.__new__(ContentBot)
+    bot.db = db
+    bot.application = SimpleNamespace(bot=api)
+    bot.forwarding = ForwardStrategy()
+    bot.delivery = DeliveryScheduler(global_rate=1000, global_burst=100, chat_rate=1000, chat_burst=100)
+    return bot
+
+
+def post(*file_ids):
+    return {
+        'message_id': 1, 'title': 'Пост', 'text': 'Текст', 'channel_id': None,
+        'media_files': [{'media_type': 'photo', 'media_file_id': file_id} for file_id in file_ids],
+    }
+
+
+def test_record_media_results():
+    """Ошибки копятся в failure_count, успех сбрасывает счётчик"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'validity.db'))
+        assert db.get_media_validity(['a']) == {}
+
+        db.record_media_results(['a', 'b'], False, 'not found')
+        db.record_media_results(['a'], False, 'not found')
+        validity = db.get_media_validity(['a', 'b', 'c'])
+        assert set(validity) == {'a', 'b'}
+        assert validity['a']['failure_count'] == 2
+        assert validity['a']['last_error'] == 'not found'
+
+        db.record_media_results(['a'], True)
+        validity = db.get_media_validity(['a'])['a']
+        assert validity['failure_count'] == 0
+        assert validity['last_verified_at'] >= validity['last_failure_at']
+        db.close()
+
+
+def test_healthy_media_single_call():
+    """Доступный файл стоит одного запроса, повторная отправка не пишет в базу"""
+
+    async def scenario(path):
+        db = AsyncDatabase(db_path=path)
+        api = RecordingBot()
+        bot = make_bot(db, api)
+        await bot._send_post(100, post('good'))
+        first = await db.get_media_validity(['good'])
+        await bot._send_post(100, post('good'))
+        second = await db.get_media_validity(['good'])
+        await db.close()
+        return api.calls, first, second
+
+    with tempfile.TemporaryDirectory() as tmp:
+        calls, first, second = asyncio.run(scenario(os.path.join(tmp, 'validity.db')))
+    assert calls == ['send_photo', 'send_photo']
+    assert first['good']['last_verified_at']
+    assert second == first
+
+
+def test_broken_media_is_skipped():
+    """После ошибки файл не отправляется, пост уходит текстом"""
+
+    async def scenario(path):
+        db = AsyncDatabase(db_path=path)
+        api = RecordingBot(broken={'bad'})
+        bot = make_bot(db, api)
+        await bot._send_post(100, post('bad'))
+        failed_calls = list(api.calls)
+        api.calls.clear()
+        await bot._send_post(100, post('bad'))
+        skipped_calls = list(api.calls)
+        await db.close()
+        return failed_calls, skipped_calls
+
+    with tempfile.TemporaryDirectory() as tmp:
+        failed_calls, skipped_calls = asyncio.run(scenario(os.path.join(tmp, 'validity.db')))
+    assert failed_calls == ['send_photo', 'send_message']
+    assert skipped_calls == ['send_message']
+
+
+def test_media_group_isolates_broken_file():
+    """Ошибка альбома: файлы проверяются по одному, недоступный исключается из следующих отправок"""
+
+    async def scenario(path):
+        db = AsyncDatabase(db_path=path)
+        api = RecordingBot(broken={'bad'})
+        bot = make_bot(db, api)
+        await bot._send_post(100, post('good', 'bad', 'other'))
+        validity = await db.get_media_validity(['good', 'bad', 'other'])
+        api.calls.clear()
+        await bot._send_post(100, post('good', 'bad', 'other'))
+        calls = list(api.calls)
+        await db.close()
+        return validity, calls
+
+    with tempfile.TemporaryDirectory() as tmp:
+        validity, calls = asyncio.run(scenario(os.path.join(tmp, 'validity.db')))
+    assert validity['bad']['failure_count'] == 1
+    assert validity['good']['last_verified_at'] and validity['other']['last_verified_at']
+    assert calls == ['send_media_group']
+
+
+def test_caption_errors_do_not_mark_media_bad():
+    """Подпись с < и & экранируется; ошибка подписи не отмечает файл недоступным"""
+
+    async def scenario(path):
+        db = AsyncDatabase(db_path=path)
+        api = RecordingBot()
+        bot = make_bot(db, api)
+        item = post('good')
+        item['title'] = 'Жим <100 кг & выше'
+        await bot._send_post(100, item)
+        escaped = list(api.texts)
+
+        # Ошибка, не связанная с файлом, не попадает в media_validity
+        await bot._send_single_media(100, {'media_type': 'photo', 'media_file_id': 'fresh'}, '<i>сломано')
+        validity = await db.get_media_validity(['good', 'fresh'])
+        await db.close()
+        return escaped, validity
+
+    with tempfile.TemporaryDirectory() as tmp:
+        escaped, validity = asyncio.run(scenario(os.path.join(tmp, 'validity.db')))
+    assert escaped == ['📝 <b>Жим &lt;100 кг &amp; выше</b>\n\nТекст']
+    assert validity['good']['last_verified_at'] and not validity['good']['failure_count']
+    assert 'fresh' not in validity
+    print("✅ Учёт доступности медиа работает")
+
+
+if __name__ == "__main__":
+    test_record_media_results()
+    test_healthy_media_single_call()
+    test_broken_media_is_skipped()
+    test_media_group_isolates_broken_file()
+    test_caption_errors_do_not_mark_media_bad()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Тест метрик: гистограммы, счётчики, замер запросов к Bot API и маршрут /metrics
+"""
+
+import asyncio
+
+import httpx
+from aiohttp.test_utils import TestClient, TestServer
+from telegram.error import BadRequest
+from telegram.ext import Application
+
+from metrics import (
+    API_ERRORS, API_LATENCY, HANDLER_ERRORS, HANDLER_LATENCY,
+    InstrumentedRequest, MetricsRegistry, timed_handler
+)
+from webhook_server import WebhookServer
+
+
+def test_registry_render():
+    """Текстовый формат Prometheus: накопительные корзины, sum/count, метки и функции-значения"""
+    registry = MetricsRegistry()
+    latency = registry.histogram('test_duration_seconds', 'Длительность', ['handler'], buckets=(0.1, 1.0))
+    errors = registry.counter('test_errors_total', 'Ошибки', ['handler'])
+    latency.observe(0.05, 'start')
+    latency.observe(0.5, 'start')
+    latency.observe(5.0, 'start')
+    errors.inc('start')
+    errors.inc('start', amount=2)
+    registry.gauge('test_queue_depth', 'Очередь', lambda: 3)
+    registry.gauge('test_cache_total', 'Кэш', lambda: {('hit',): 4, ('miss',): 1},
+                   kind='counter', labelnames=['result'])
+
+    lines = registry.render().splitlines()
+    assert '# TYPE test_duration_seconds histogram' in lines
+    assert 'test_duration_seconds_bucket{handler="start",le="0.1"} 1' in lines
+    assert 'test_duration_seconds_bucket{handler="start",le="1"} 2' in lines
+    assert 'test_duration_seconds_bucket{handler="start",le="+Inf"} 3' in lines
+    assert 'test_duration_seconds_sum{handler="start"} 5.55' in lines
+    assert 'test_duration_seconds_count{handler="start"} 3' in lines
+    assert 'test_errors_total{handler="start"} 3' in lines
+    assert 'test_queue_depth 3' in lines
+    assert 'test_cache_total{result="hit"} 4' in lines
+
+
+def test_timed_handler_counts_errors():
+    """Обёртка обработчика замеряет время и считает исключения по имени"""
+
+    async def flaky_handler(update, context):
+        if update == 'bad':
+            raise ValueError("сбой")
+        return 'ok'
+
+    wrapped = timed_handler(flaky_handler)
+    before = HANDLER_LATENCY.count('flaky_handler')
+    assert asyncio.run(wrapped('good', None)) == 'ok'
+    try:
+        asyncio.run(wrapped('bad', None))
+    except ValueError:
+        pass
+    assert HANDLER_LATENCY.count('flaky_handler') == before + 2
+    assert HANDLER_ERRORS.get('flaky_handler') >= 1
+
+
+def test_instrumented_request():
+    """Запросы к Bot API замеряются по методу, ответы 4xx считаются ошибками"""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith('/sendMessage'):
+            return httpx.Response(400, json={'ok': False, 'error_code': 400, 'description': 'Bad Request: chat not found'})
+        return httpx.Response(200, json={'ok': True, 'result': True})
+
+    async def scenario():
+        request = InstrumentedRequest(httpx_kwargs={'transport': httpx.MockTransport(handler)})
+        await request.initialize()
+        await request.post('https://api.telegram.org/bot123:TEST/deleteWebhook')
+        try:
+            await request.post('https://api.telegram.org/bot123:TEST/sendMessage')
+        except BadRequest:
+            pass
+        await request.shutdown()
+
+    before = API_LATENCY.count('sendMessage'), API_ERRORS.get('sendMessage', '400')
+    asyncio.run(scenario())
+    assert API_LATENCY.count('deleteWebhook') >= 1
+    assert API_LATENCY.count('sendMessage') == before[0] + 1
+    assert API_ERRORS.get('sendMessage', '400') == before[1] + 1
+
+
+def test_metrics_route():
+    """/metrics отдаёт текстовый формат Prometheus"""
+
+    async def scenario():
+        application = Application.builder().token('123:TEST').build()
+        server = WebhookServer(application, metrics_provider=lambda: 'bot_up 1\n')
+        async with TestClient(TestServer(server.build_app())) as client:
+            response = await client.get('/metrics')
+            return response.status, response.headers['Content-Type'], await response.text()
+
+    status, content_type, body = asyncio.run(scenario())
+    assert status == 200
+    assert content_type.startswith('text/plain; version=0.0.4')
+    assert body == 'bot_up 1\n'
+    print("✅ Метрики работают")
+
+
+if __name__ == "__main__":
+    test_registry_render()
+    test_timed_handler_counts_errors()
+    test_instrumented_request()
+    test_metrics_route()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Тест миграций схемы и использования индексов в основных запросах
+"""
+
+import os
+import sqlite3
+import tempfile
+
+from database import Database
+from migrations import MIGRATIONS, get_schema_version, run_migrations
+
+# Основные методы базы; выполняемые ими запросы перехватываются через set_trace_callback
+HOT_METHODS = {
+    'add_content (альбом)': lambda db: db.add_content(3, -100, 'memes', 'Альбом', media_group_id='group'),
+    'add_content': lambda db: db.add_content(4, -100, 'memes', 'Пост'),
+    'upsert_posts': lambda db: db.upsert_posts([
+        {'message_id': 6, 'channel_id': -100, 'category': 'memes', 'title': 'Пакет', 'media': [(6, 'photo', 'f6')]},
+    ]),
+    'get_content_by_category': lambda db: db.get_content_by_category('memes', 10),
+    'get_content_by_message_id': lambda db: db.get_content_by_message_id(1),
+    'get_content_by_media_group_id': lambda db: db.get_content_by_media_group_id('group'),
+    'update_stats': lambda db: db.update_stats('memes'),
+    'get_post_media': lambda db: db.get_post_media(1),
+    'get_content_with_media_files': lambda db: db.get_content_with_media_files('memes', 10),
+    'get_category_page (первая)': lambda db: db.get_category_page('memes', 1),
+    'get_category_page (older)': lambda db: db.get_category_page('memes', 1, anchor_id=2, direction='older'),
+    'get_category_page (newer)': lambda db: db.get_category_page('memes', 1, anchor_id=1, direction='newer'),
+    'get_content_by_media_type': lambda db: db.get_content_by_media_type('photo', 10),
+    'get_media_validity': lambda db: db.get_media_validity(['f1', 'f2']),
+}
+
+
+def trace_queries(db: Database, call) -> list:
+    """Запросы, которые выполняет вызов метода базы (с подставленными параметрами)"""
+    conn = db._get_connection()
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        call(db)
+    finally:
+        conn.set_trace_callback(None)
+    # Служебные команды и внутренние запросы триггеров и FTS (с префиксом '--') не нужны
+    queries = [sql.strip() for sql in statements]
+    queries = [sql for sql in queries if sql.split(None, 1)[0].upper() in ('SELECT', 'INSERT', 'UPDATE', 'DELETE')]
+    return list(dict.fromkeys(queries))
+
+
+def full_scans(conn: sqlite3.Connection, sql: str) -> list:
+    """Шаги плана запроса, которые читают таблицу целиком без индекса"""
+    plan = conn.execute(f'EXPLAIN QUERY PLAN {sql}').fetchall()
+    details = [row[-1] for row in plan]
+    # SCAN CONSTANT ROW — SELECT без таблицы (INSERT ... SELECT ?, ?), не чтение таблицы
+    return [detail for detail in details
+            if detail.startswith('SCAN') and 'INDEX' not in detail and detail != 'SCAN CONSTANT ROW']
+
+
+def test_migrations_apply_once():
+    """Миграции применяются по порядку и только один раз"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'test.db'))
+        conn = db._get_connection()
+        assert get_schema_version(conn) == MIGRATIONS[-1][0]
+        assert run_migrations(conn) == []
+        db.close()
+
+
+def test_migrations_upgrade_legacy_schema():
+    """Старая база без новых колонок обновляется без потери данных"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'legacy.db')
+        with sqlite3.connect(path) as conn:
+            conn.execute('''
+                CREATE TABLE content (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    message_id INTEGER UNIQUE,
+                    channel_id INTEGER,
+                    channel_username TEXT,
+                    category TEXT,
+                    title TEXT,
+                    text TEXT,
+                    media_type TEXT,
+                    media_file_id TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            conn.execute("INSERT INTO content (message_id, category, title) VALUES (1, 'memes', 'Старый пост')")
+            conn.commit()
+
+        db = Database(path)
+        post = db.get_content_by_message_id(1)
+        assert post['title'] == 'Старый пост'
+        assert 'media_group_id' in post
+        assert 'media_file_unique_id' in post
+        assert db.get_real_stats() == {'memes': 1}
+        db.close()
+
+
+def test_hot_queries_use_indexes():
+    """Запросы, которые на самом деле выполняют основные методы, используют индексы"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'test.db'))
+        db.save_post_with_media(1, -100, 'memes', 'Первый', media=[(1, 'photo', 'f1'), (2, 'photo', 'f2')])
+        db.add_content(5, -100, 'memes', 'Второй', media_type='photo', media_file_id='f5')
+        conn = db._get_connection()
+        traced = {}
+        for name, call in HOT_METHODS.items():
+            # Чтения кэшируются: каждый метод должен дойти до базы
+            db.cache.clear()
+            traced[name] = trace_queries(db, call)
+            assert traced[name], f"{name}: ни одного запроса"
+            for sql in traced[name]:
+                scans = full_scans(conn, sql)
+                assert not scans, f"{name}: полное сканирование {scans} в запросе {sql}"
+        db.close()
+
+    # Страницы в обе стороны выполняют свои запросы с курсором
+    assert any('(created_at, id) <' in sql for sql in traced['get_category_page (older)'])
+    assert any('(created_at, id) >' in sql for sql in traced['get_category_page (newer)'])
+    print("✅ Все основные запросы используют индексы")
+
+
+if __name__ == "__main__":
+    test_migrations_apply_once()
+    test_migrations_upgrade_legacy_schema()
+    test_hot_queries_use_indexes()
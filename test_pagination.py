@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Тест постраничного просмотра категорий и выборки постов с медиафайлами
+"""
+
+import os
+import tempfile
+
+from database import Database
+
+
+def create_db(tmp: str, count: int = 12) -> Database:
+    """База с постами одной категории; большинство создано в одну секунду"""
+    db = Database(os.path.join(tmp, 'pages.db'))
+    for message_id in range(1, count + 1):
+        db.add_content(message_id=message_id, channel_id=-1001, category='memes',
+                       title=f'Пост {message_id}', media_type='photo', media_file_id=f'file{message_id}')
+    db.add_content(message_id=100, channel_id=-1001, category='other', title='Чужая категория')
+    return db
+
+
+def test_pages_newest_first():
+    """Страницы идут от новых к старым без пропусков и повторов"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = create_db(tmp)
+
+        posts, has_newer, has_older = db.get_category_page('memes', 5)
+        pages = [[post['message_id'] for post in posts]]
+        assert (has_newer, has_older) == (False, True)
+
+        while has_older:
+            posts, has_newer, has_older = db.get_category_page('memes', 5, anchor_id=posts[-1]['id'])
+            assert has_newer
+            pages.append([post['message_id'] for post in posts])
+
+        assert pages == [[12, 11, 10, 9, 8], [7, 6, 5, 4, 3], [2, 1]]
+
+        # Назад к более новым постам
+        posts, has_newer, has_older = db.get_category_page('memes', 5, anchor_id=posts[0]['id'], direction='newer')
+        assert [post['message_id'] for post in posts] == [7, 6, 5, 4, 3]
+        assert (has_newer, has_older) == (True, True)
+        db.close()
+
+
+def test_page_media_and_stale_anchor():
+    """Медиафайлы подгружаются к постам; удалённый якорь возвращает первую страницу"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = create_db(tmp, count=3)
+        post = db.get_content_by_message_id(3)
+        db.add_media_to_post(post['id'], 3, 'photo', 'album1', 'u1', 1)
+        db.add_media_to_post(post['id'], 3, 'video', 'album0', 'u0', 0)
+
+        posts, _, _ = db.get_category_page('memes', 2)
+        assert [media['media_file_id'] for media in posts[0]['media_files']] == ['album0', 'album1']
+        assert posts[1]['media_files'] == ({'message_id': 2, 'media_type': 'photo', 'media_file_id': 'file2',
+                                         'media_file_unique_id': None, 'media_order': 0},)
+
+        db.delete_content_by_id(posts[1]['id'])
+        posts, has_newer, _ = db.get_category_page('memes', 2, anchor_id=posts[1]['id'])
+        assert [post['message_id'] for post in posts] == [3, 1]
+        assert not has_newer
+        db.close()
+    print("✅ Постраничный просмотр категорий работает")
+
+
+def test_content_with_media_files_limit():
+    """Возвращается ровно limit постов, у альбомов — все медиафайлы"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = create_db(tmp, count=4)
+        db.upsert_posts([{
+            'message_id': 200 + i, 'channel_id': -1001, 'category': 'memes', 'title': f'Альбом {i}',
+            'media': [(1000 * i + part, 'photo', f'a{i}_{part}') for part in range(10)]
+        } for i in range(3)])
+
+        posts = db.get_content_with_media_files('memes', limit=6)
+        assert [post['message_id'] for post in posts] == [1, 2, 3, 4, 200, 201]
+        assert [len(post['media_files']) for post in posts] == [1, 1, 1, 1, 10, 10]
+        assert [media['media_file_id'] for media in posts[4]['media_files']][:2] == ['a0_0', 'a0_1']
+
+        assert len(db.get_content_with_media_files(limit=100)) == 8
+        assert db.get_content_with_media_files('flood') == ()
+        db.close()
+
+
+if __name__ == "__main__":
+    test_pages_newest_first()
+    test_page_media_and_stale_anchor()
+    test_content_with_media_files_limit()
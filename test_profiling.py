@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Тест профилирования запросов: самые медленные профили, обработчики, база и команда /profile
+"""
+
+import asyncio
+import os
+import pstats
+import tempfile
+import time
+from types import SimpleNamespace
+
+import bot as bot_module
+from async_database import AsyncDatabase
+from profiling import PROFILER, Profiler, profiled_handler
+
+
+class _Message:
+    def __init__(self):
+        self.replies = []
+
+    async def reply_text(self, text, **kwargs):
+        self.replies.append(text)
+
+
+def _use_profiler(directory: str, keep: int = 5):
+    saved = PROFILER.enabled, PROFILER.directory, PROFILER.keep, PROFILER._slowest
+    PROFILER.directory, PROFILER.keep, PROFILER._slowest = directory, keep, []
+    return saved
+
+
+def _restore_profiler(saved):
+    PROFILER.enabled, PROFILER.directory, PROFILER.keep, PROFILER._slowest = saved
+
+
+def test_keeps_slowest_profiles():
+    """Выключенный профилировщик ничего не пишет; включённый хранит keep самых медленных"""
+    with tempfile.TemporaryDirectory() as tmp:
+        profiler = Profiler(directory=tmp, keep=2)
+        assert profiler.call('off', sum, [1, 2]) == 3
+        assert os.listdir(tmp) == []
+
+        profiler.enable()
+        for name, delay in [('fast', 0.001), ('slow', 0.03), ('medium', 0.015), ('fastest', 0.0)]:
+            profiler.call(name, time.sleep, delay)
+
+        assert [name for name, _, _ in profiler.slowest()] == ['slow', 'medium']
+
+        profiler.sample_rate = 0.0
+        profiler.call('skipped', time.sleep, 0.05)
+        assert profiler.slowest()[0][0] == 'slow'
+        assert profiler.profiled == 4
+        files = sorted(os.listdir(tmp))
+        assert len(files) == 2 and all(f.endswith('.prof') for f in files)
+        stats = pstats.Stats(profiler.slowest()[0][2])
+        assert any('sleep' in func[2] for func in stats.stats)
+
+
+def test_handlers_and_database_profiled():
+    """Обработчик профилируется с данными кнопки, параллельный — пропускается, методы базы — в своём потоке"""
+
+    async def button_callback(update, context):
+        await asyncio.sleep(0.01)
+        return update.callback_query.data
+
+    async def scenario(db_path):
+        handler = profiled_handler(button_callback)
+        updates = [SimpleNamespace(callback_query=SimpleNamespace(data=f'category_{name}'))
+                   for name in ('memes', 'sport_tips')]
+        results = await asyncio.gather(*(handler(update, None) for update in updates))
+        db = AsyncDatabase(db_path=db_path)
+        try:
+            await db.get_total_posts_count()
+        finally:
+            await db.close()
+        return results
+
+    with tempfile.TemporaryDirectory() as tmp:
+        saved = _use_profiler(os.path.join(tmp, 'profiles'))
+        try:
+            PROFILER.enabled = True
+            results = asyncio.run(scenario(os.path.join(tmp, 'test.db')))
+            names = {name for name, _, _ in PROFILER.slowest()}
+        finally:
+            _restore_profiler(saved)
+
+    assert results == ['category_memes', 'category_sport_tips']
+    assert 'button_callback-category_memes' in names
+    assert 'button_callback-category_sport_tips' not in names
+    assert 'db.get_total_posts_count' in names
+
+
+def test_profile_command():
+    """/profile включает и выключает профилирование только для администраторов"""
+
+    def run(user_id, args):
+        update = SimpleNamespace(effective_user=SimpleNamespace(id=user_id), message=_Message())
+        asyncio.run(bot_module.ContentBot.profile_command(None, update, SimpleNamespace(args=args)))
+        return update.message.replies
+
+    saved_admins = bot_module.ADMIN_IDS
+    with tempfile.TemporaryDirectory() as tmp:
+        saved = _use_profiler(tmp)
+        try:
+            bot_module.ADMIN_IDS = {1}
+            PROFILER.enabled = False
+            assert run(2, ['on']) == []
+            assert not PROFILER.enabled
+
+            replies = run(1, ['on'])
+            assert PROFILER.enabled and replies[0].startswith('🔬 Профилирование включено')
+            replies = run(1, ['off'])
+            assert not PROFILER.enabled and 'выключено' in replies[0]
+        finally:
+            bot_module.ADMIN_IDS = saved_admins
+            _restore_profiler(saved)
+    print("✅ Профилирование работает")
+
+
+if __name__ == "__main__":
+    test_keeps_slowest_profiles()
+    test_handlers_and_database_profiled()
+    test_profile_command()
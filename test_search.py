@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Тест полнотекстового поиска по постам
+"""
+
+import os
+import tempfile
+
+from database import Database
+from text_search import build_match_query, stem_russian
+
+
+def create_db(tmp: str) -> Database:
+    """База с несколькими тестовыми постами"""
+    db = Database(os.path.join(tmp, 'search.db'))
+    posts = [
+        (1, 'Тренировки ног', 'Присед и становая тяга'),
+        (2, 'Новый мем', 'Смешная картинка про тренировку'),
+        (3, 'Челлендж недели', 'Сто отжиманий за день'),
+    ]
+    for message_id, title, text in posts:
+        db.add_content(message_id=message_id, channel_id=-1001, category='other', title=title, text=text)
+    return db
+
+
+def test_stemming():
+    """Разные словоформы сводятся к одной основе"""
+    assert stem_russian('тренировки') == stem_russian('тренировку') == stem_russian('тренировка')
+    assert stem_russian('упражнения') == stem_russian('упражнений')
+    assert build_match_query('') == ''
+
+
+def test_search_ranking_and_snippet():
+    """Поиск учитывает словоформы, ранжирует и подсвечивает совпадения"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = create_db(tmp)
+        assert db.has_full_text_search()
+
+        results = db.search_content('тренировка')
+        assert [post['message_id'] for post in results] == [1, 2]
+        assert '<b>' in results[0]['snippet']
+
+        # Поиск по префиксу
+        assert [post['message_id'] for post in db.search_content('челл')] == [3]
+
+        # Без стемминга ищется точная словоформа
+        assert [post['message_id'] for post in db.search_content('тренировку ', stemming=False)] == [2]
+        db.close()
+
+
+def test_search_index_follows_changes():
+    """Индекс обновляется при изменении и удалении постов"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = create_db(tmp)
+        db.add_content(message_id=3, channel_id=-1001, category='other', title='Вызов недели', text='Планка')
+        assert db.search_content('челлендж') == []
+        assert [post['message_id'] for post in db.search_content('планка')] == [3]
+
+        post = db.get_content_by_message_id(1)
+        db.delete_content_by_id(post['id'])
+        assert [post['message_id'] for post in db.search_content('тренировка')] == [2]
+        db.close()
+    print("✅ Полнотекстовый поиск работает")
+
+
+if __name__ == "__main__":
+    test_stemming()
+    test_search_ranking_and_snippet()
+    test_search_index_follows_changes()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Тест параллельной обработки обновлений с порядком внутри чата
+"""
+
+import asyncio
+
+from telegram import Update
+
+from update_processor import PerChatUpdateProcessor
+
+
+def make_update(update_id: int, chat_id: int) -> Update:
+    return Update.de_json({
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id, 'date': 0, 'text': str(update_id),
+            'chat': {'id': chat_id, 'type': 'private'},
+        },
+    }, None)
+
+
+def test_per_chat_order_and_concurrency():
+    """Чат обрабатывается по порядку, медленный чат не задерживает остальные"""
+    log = []
+    running = 0
+    peak = 0
+
+    async def handle(chat_id: int, n: int, delay: float):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        log.append(('start', chat_id, n))
+        await asyncio.sleep(delay)
+        log.append(('end', chat_id, n))
+        running -= 1
+
+    async def scenario():
+        processor = PerChatUpdateProcessor(max_concurrent_updates=2)
+        async with processor:
+            tasks = []
+            update_id = 0
+            # Чат 1 — долгая выдача постов, затем ещё два нажатия
+            for n, delay in enumerate((0.1, 0.01, 0.01)):
+                update_id += 1
+                tasks.append(asyncio.create_task(
+                    processor.process_update(make_update(update_id, 1), handle(1, n, delay))
+                ))
+            # Чаты 2–4 — быстрые /start
+            for chat_id in (2, 3, 4):
+                update_id += 1
+                tasks.append(asyncio.create_task(
+                    processor.process_update(make_update(update_id, chat_id), handle(chat_id, 0, 0.01))
+                ))
+            await asyncio.gather(*tasks)
+            assert processor.active_chats == 0
+
+    asyncio.run(scenario())
+
+    chat1 = [entry for entry in log if entry[1] == 1]
+    assert chat1 == [('start', 1, 0), ('end', 1, 0), ('start', 1, 1), ('end', 1, 1),
+                     ('start', 1, 2), ('end', 1, 2)]
+    assert peak == 2
+    # Остальные чаты обслужены, пока чат 1 ждал долгую обработку
+    first_chat1_end = log.index(('end', 1, 0))
+    for chat_id in (2, 3, 4):
+        assert log.index(('end', chat_id, 0)) < first_chat1_end
+
+
+def make_channel_post(update_id: int, channel_id: int) -> Update:
+    return Update.de_json({
+        'update_id': update_id,
+        'channel_post': {
+            'message_id': update_id, 'date': 0, 'text': str(update_id),
+            'chat': {'id': channel_id, 'type': 'channel'},
+        },
+    }, None)
+
+
+def test_slow_chats_do_not_delay_channel_posts():
+    """Пост канала не ждёт общего лимита, занятого медленными чатами"""
+    finished = []
+
+    async def handle(name: str, delay: float):
+        await asyncio.sleep(delay)
+        finished.append(name)
+
+    async def scenario():
+        processor = PerChatUpdateProcessor(max_concurrent_updates=2)
+        async with processor:
+            slow = [asyncio.create_task(processor.process_update(
+                make_update(chat_id, chat_id), handle(f'chat{chat_id}', 0.3))) for chat_id in (1, 2, 3)]
+            await asyncio.sleep(0.01)
+            post = asyncio.create_task(processor.process_update(
+                make_channel_post(10, -100), handle('channel', 0)))
+            await asyncio.wait_for(post, timeout=0.1)
+            assert finished == ['channel']
+            await asyncio.gather(*slow)
+
+    asyncio.run(scenario())
+    print("✅ Обновления обрабатываются параллельно с порядком внутри чата")
+
+
+if __name__ == "__main__":
+    test_per_chat_order_and_concurrency()
+    test_slow_chats_do_not_delay_channel_posts()
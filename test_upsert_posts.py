@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Тест пакетного сохранения постов
+"""
+
+import os
+import tempfile
+
+from database import Database
+
+
+def test_upsert_posts():
+    """Новые посты добавляются, существующие обновляются, медиа не дублируются"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'bulk.db'))
+        db.add_content(message_id=1, channel_id=-1001, category='other', title='Старый заголовок')
+
+        batch = [
+            {'message_id': 1, 'channel_id': -1001, 'category': 'memes', 'title': 'Новый заголовок'},
+            {'message_id': 2, 'channel_id': -1001, 'category': 'memes', 'title': 'Альбом',
+             'media_group_id': 'g2', 'media': [(2, 'photo', 'p2'), (3, 'video', 'v3')]},
+        ]
+        assert db.upsert_posts(batch) == 2
+        # Повторная загрузка того же пакета ничего не дублирует
+        assert db.upsert_posts(batch) == 2
+
+        post = db.get_content_by_message_id(1)
+        assert (post['title'], post['category']) == ('Новый заголовок', 'memes')
+        assert db.get_real_stats() == {'memes': 2}
+
+        album = db.get_content_by_message_id(2)
+        media = db.get_post_media(album['id'])
+        assert [(m['message_id'], m['media_file_id'], m['media_order']) for m in media] == [
+            (2, 'p2', 0), (3, 'v3', 1)
+        ]
+        assert [post['message_id'] for post in db.search_content('альбом')] == [2]
+        assert db.upsert_posts([]) == 0
+        db.close()
+    print("✅ Пакетное сохранение постов работает")
+
+
+if __name__ == "__main__":
+    test_upsert_posts()
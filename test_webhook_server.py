@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Тест HTTP-сервера бота: health/status и приём webhook с проверкой секрета
+"""
+
+import asyncio
+import logging
+
+from aiohttp.test_utils import TestClient, TestServer
+from telegram.ext import Application
+
+from bot import check_webhook_secret
+from webhook_server import SECRET_TOKEN_HEADER, WebhookServer
+
+UPDATE = {
+    'update_id': 42,
+    'message': {
+        'message_id': 1, 'date': 0, 'text': '/start',
+        'chat': {'id': 100, 'type': 'private'},
+    },
+}
+
+
+def test_webhook_routes():
+    """Обновление с верным секретом ставится в очередь, с неверным — отклоняется"""
+
+    async def scenario():
+        application = Application.builder().token('123:TEST').build()
+        server = WebhookServer(application, webhook_path='/webhook', secret_token='s3cret',
+                               status_provider=lambda: {'ingest_queue': 0})
+        async with TestClient(TestServer(server.build_app())) as client:
+            response = await client.post('/webhook', json=UPDATE, headers={SECRET_TOKEN_HEADER: 'wrong'})
+            assert response.status == 403
+            response = await client.post('/webhook', json=UPDATE)
+            assert response.status == 403
+            assert application.update_queue.empty()
+
+            headers = {SECRET_TOKEN_HEADER: 's3cret'}
+            response = await client.post('/webhook', data='не json', headers=headers)
+            assert response.status == 400
+            # Корректный JSON, но не объект обновления
+            for body in ([], 1, 'update', None):
+                response = await client.post('/webhook', json=body, headers=headers)
+                assert response.status == 400, body
+            assert application.update_queue.empty()
+
+            response = await client.post('/webhook', json=UPDATE, headers=headers)
+            assert response.status == 200
+            update = application.update_queue.get_nowait()
+            assert update.update_id == 42
+            assert update.message.text == '/start'
+
+            health = await (await client.get('/health')).json()
+            assert health['status'] == 'healthy'
+            status = await (await client.get('/status')).json()
+            assert status['mode'] == 'webhook'
+            assert (status['updates_received'], status['updates_rejected']) == (1, 7)
+            assert status['ingest_queue'] == 0
+
+    asyncio.run(scenario())
+
+
+def test_polling_mode_has_no_webhook_route():
+    """Без webhook_path сервер отдаёт только служебные маршруты"""
+
+    async def scenario():
+        application = Application.builder().token('123:TEST').build()
+        server = WebhookServer(application)
+        async with TestClient(TestServer(server.build_app())) as client:
+            assert (await client.post('/webhook', json=UPDATE)).status in (404, 405)
+            assert (await client.get('/')).status == 200
+            status = await (await client.get('/status')).json()
+            assert status['mode'] == 'polling'
+
+    asyncio.run(scenario())
+
+
+class _Records(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def test_webhook_requires_secret():
+    """Webhook без секрета не запускается, если это не разрешено явно; с разрешением — предупреждение"""
+    check_webhook_secret('s3cret', False)
+    try:
+        check_webhook_secret(None, False)
+        assert False, "webhook запустился без секрета"
+    except RuntimeError as e:
+        assert 'WEBHOOK_SECRET' in str(e)
+
+    records = _Records()
+    logging.getLogger('bot').addHandler(records)
+    try:
+        check_webhook_secret('', True)
+    finally:
+        logging.getLogger('bot').removeHandler(records)
+    assert any('WEBHOOK_SECRET не задан' in message for message in records.messages)
+    print("✅ HTTP-сервер бота работает")
+
+
+if __name__ == "__main__":
+    test_webhook_routes()
+    test_polling_mode_has_no_webhook_route()
+    test_webhook_requires_secret()
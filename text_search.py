@@ -0,0 +1,138 @@
+import re
+from typing import List
+
+# Упрощённая реализация русского стеммера Snowball (Портер для русского языка)
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND_1 = ('вшись', 'вши', 'в')  # после а/я
+PERFECTIVE_GERUND_2 = ('ившись', 'ывшись', 'ивши', 'ывши', 'ив', 'ыв')
+REFLEXIVE = ('ся', 'сь')
+ADJECTIVE = ('ими', 'ыми', 'его', 'ого', 'ему', 'ому', 'ее', 'ие', 'ые', 'ое', 'ей', 'ий', 'ый', 'ой',
+             'ем', 'им', 'ым', 'ом', 'их', 'ых', 'ую', 'юю', 'ая', 'яя', 'ою', 'ею')
+PARTICIPLE_1 = ('ем', 'нн', 'вш', 'ющ', 'щ')  # после а/я
+PARTICIPLE_2 = ('ивш', 'ывш', 'ующ')
+VERB_1 = ('ете', 'йте', 'ешь', 'нно', 'ла', 'на', 'ли', 'ем', 'ло', 'но', 'ет', 'ют', 'ны', 'ть',
+          'й', 'л', 'н')  # после а/я
+VERB_2 = ('ейте', 'уйте', 'ила', 'ыла', 'ена', 'ите', 'или', 'ыли', 'ило', 'ыло', 'ено', 'ует', 'уют',
+          'ены', 'ить', 'ыть', 'ишь', 'ей', 'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ят', 'ит', 'ыт', 'ую', 'ю')
+NOUN = ('иями', 'ями', 'ами', 'ией', 'иям', 'ием', 'иях', 'ев', 'ов', 'ие', 'ье', 'еи', 'ии', 'ей', 'ой',
+        'ий', 'ям', 'ем', 'ам', 'ом', 'ах', 'ях', 'ию', 'ью', 'ия', 'ья', 'а', 'е', 'и', 'й', 'о', 'у',
+        'ы', 'ь', 'ю', 'я')
+SUPERLATIVE = ('ейше', 'ейш')
+DERIVATIONAL = ('ость', 'ост')
+
+_WORD_RE = re.compile(r'\w+')
+_CYRILLIC_RE = re.compile(r'^[а-я]+$')
+
+
+def _regions(word: str):
+    """Начала областей RV и R2 слова"""
+    rv = len(word)
+    for i, char in enumerate(word):
+        if char in VOWELS:
+            rv = i + 1
+            break
+
+    def next_region(start: int) -> int:
+        for i in range(start + 1, len(word)):
+            if word[i] not in VOWELS and word[i - 1] in VOWELS:
+                return i + 1
+        return len(word)
+
+    r1 = next_region(0)
+    r2 = next_region(r1)
+    return rv, r2
+
+
+def _strip(word: str, start: int, suffixes, after_a_ya: bool = False):
+    """Удаление самого длинного подходящего окончания в области [start:]"""
+    region = word[start:]
+    for suffix in sorted(suffixes, key=len, reverse=True):
+        if not region.endswith(suffix):
+            continue
+        cut = len(word) - len(suffix)
+        if after_a_ya:
+            if cut - 1 < start or word[cut - 1] not in 'ая':
+                continue
+        return word[:cut]
+    return None
+
+
+def _strip_group(word: str, start: int, group_1, group_2):
+    """Удаление окончания из двух групп: первая требует предшествующей а/я"""
+    candidates = [
+        result for result in (
+            _strip(word, start, group_1, after_a_ya=True),
+            _strip(word, start, group_2)
+        ) if result is not None
+    ]
+    if not candidates:
+        return None
+    return min(candidates, key=len)
+
+
+def stem_russian(word: str) -> str:
+    """Основа русского слова (для поиска с учётом словоформ)"""
+    word = word.lower().replace('ё', 'е')
+    if not _CYRILLIC_RE.match(word):
+        return word
+
+    rv, r2 = _regions(word)
+
+    # Шаг 1: деепричастия, затем возвратные, прилагательные, глаголы, существительные
+    result = _strip_group(word, rv, PERFECTIVE_GERUND_1, PERFECTIVE_GERUND_2)
+    if result is not None:
+        word = result
+    else:
+        word = _strip(word, rv, REFLEXIVE) or word
+        result = _strip(word, rv, ADJECTIVE)
+        if result is not None:
+            word = _strip_group(result, rv, PARTICIPLE_1, PARTICIPLE_2) or result
+        else:
+            result = _strip_group(word, rv, VERB_1, VERB_2)
+            if result is None:
+                result = _strip(word, rv, NOUN)
+            if result is not None:
+                word = result
+
+    # Шаг 2: окончание «и»
+    word = _strip(word, rv, ('и',)) or word
+
+    # Шаг 3: словообразовательные суффиксы в области R2
+    word = _strip(word, r2, DERIVATIONAL) or word
+
+    # Шаг 4: «нн» -> «н», превосходная степень, мягкий знак
+    result = _strip(word, rv, SUPERLATIVE)
+    if result is not None:
+        word = result
+    if word[rv:].endswith('нн'):
+        word = word[:-1]
+    elif word[rv:].endswith('ь'):
+        word = word[:-1]
+
+    return word
+
+
+def tokenize(query: str) -> List[str]:
+    """Разбиение поискового запроса на слова"""
+    return _WORD_RE.findall(query.lower())
+
+
+def build_match_query(query: str, stemming: bool = True) -> str:
+    """
+    Построение выражения MATCH для FTS5.
+    Русские слова при stemming=True заменяются основой с поиском по префиксу,
+    последнее слово запроса всегда ищется по префиксу.
+    Возвращает пустую строку, если в запросе нет слов.
+    """
+    tokens = tokenize(query)
+    terms = []
+    for i, token in enumerate(tokens):
+        prefix = i == len(tokens) - 1
+        if stemming and _CYRILLIC_RE.match(token.replace('ё', 'е')):
+            stem = stem_russian(token)
+            if len(stem) >= 3:
+                token, prefix = stem, True
+        quoted = '"' + token.replace('"', '""') + '"'
+        terms.append(quoted + '*' if prefix else quoted)
+    return ' '.join(terms)
@@ -0,0 +1,84 @@
+import asyncio
+from typing import Any, Awaitable, Dict, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+# Сколько обновлений может ждать обработки одновременно (ограничение памяти)
+MAX_PENDING_UPDATES = 1024
+
+
+class PerChatUpdateProcessor(BaseUpdateProcessor):
+    """
+    Параллельная обработка обновлений с сохранением порядка внутри чата.
+    Обновления одного чата выполняются строго по очереди, разных чатов —
+    параллельно, но не больше max_concurrent_updates одновременно.
+    Общий лимит (concurrency) захватывается уже после очереди чата, поэтому
+    обновления, ждущие своего чата, не занимают места и не задерживают другие чаты.
+    Посты каналов (см. is_light) общий лимит не занимают: их обработчик только
+    ставит пост в очередь сохранения, и он не должен ждать нажатий пользователей,
+    которые могут секундами стоять в лимитах доставки.
+    """
+
+    def __init__(self, max_concurrent_updates: int, max_pending_updates: int = MAX_PENDING_UPDATES):
+        if max_concurrent_updates < 1:
+            raise ValueError("`max_concurrent_updates` must be a positive integer!")
+        # Семафор базового класса захватывается до очереди чата, поэтому он
+        # ограничивает только число принятых в обработку обновлений
+        super().__init__(max(max_pending_updates, max_concurrent_updates))
+        self.concurrency = max_concurrent_updates
+        self._running = asyncio.BoundedSemaphore(max_concurrent_updates)
+        self._chat_locks: Dict[int, asyncio.Lock] = {}
+        self._chat_waiters: Dict[int, int] = {}
+
+    @staticmethod
+    def chat_key(update: object) -> Optional[int]:
+        """Ключ очереди: чат обновления, иначе пользователь; None — без упорядочивания"""
+        if not isinstance(update, Update):
+            return None
+        if update.effective_chat is not None:
+            return update.effective_chat.id
+        if update.effective_user is not None:
+            return update.effective_user.id
+        return None
+
+    @staticmethod
+    def is_light(update: object) -> bool:
+        """Лёгкое обновление: выполняется без общего лимита (порядок в чате сохраняется)"""
+        return isinstance(update, Update) and (
+            update.channel_post is not None or update.edited_channel_post is not None)
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = self.chat_key(update)
+        if key is None:
+            async with self._running:
+                await coroutine
+            return
+
+        lock = self._chat_locks.get(key)
+        if lock is None:
+            lock = self._chat_locks[key] = asyncio.Lock()
+        self._chat_waiters[key] = self._chat_waiters.get(key, 0) + 1
+        try:
+            async with lock:
+                if self.is_light(update):
+                    await coroutine
+                else:
+                    async with self._running:
+                        await coroutine
+        finally:
+            self._chat_waiters[key] -= 1
+            if not self._chat_waiters[key]:
+                del self._chat_waiters[key]
+                del self._chat_locks[key]
+
+    @property
+    def active_chats(self) -> int:
+        """Количество чатов с обрабатываемыми или ожидающими обновлениями"""
+        return len(self._chat_locks)
+
+    async def initialize(self) -> None:
+        """Ресурсы не требуются"""
+
+    async def shutdown(self) -> None:
+        """Ожидающие обновления дожидается Application"""
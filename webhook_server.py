@@ -0,0 +1,122 @@
+import hmac
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from aiohttp import web
+from telegram import Update
+from telegram.ext import Application
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+SECRET_TOKEN_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class WebhookServer:
+    """
+    HTTP-сервер бота на aiohttp в том же цикле событий, что и Application.
+    Маршруты: / и /health — проверка работы сервиса, /status — состояние бота,
+    /metrics — метрики в формате Prometheus,
+    POST webhook_path — обновления от Telegram (если включён режим webhook).
+    Обновление только ставится в очередь Application, поэтому Telegram
+    получает ответ сразу, а обработка идёт параллельно.
+    """
+
+    def __init__(self, application: Application, webhook_path: Optional[str] = None,
+                 secret_token: Optional[str] = None, status_provider: Callable[[], Dict] = None,
+                 metrics_provider: Callable[[], str] = REGISTRY.render):
+        self.application = application
+        self.webhook_path = webhook_path
+        self.secret_token = secret_token
+        self.status_provider = status_provider
+        self.metrics_provider = metrics_provider
+        self.started_at = datetime.now().isoformat()
+        self.updates_received = 0
+        self.updates_rejected = 0
+        self.last_update_at = None
+        self._runner = None
+
+    def build_app(self) -> web.Application:
+        """aiohttp-приложение со всеми маршрутами"""
+        app = web.Application()
+        app.router.add_get('/', self.handle_index)
+        app.router.add_get('/health', self.handle_health)
+        app.router.add_get('/status', self.handle_status)
+        app.router.add_get('/metrics', self.handle_metrics)
+        if self.webhook_path:
+            app.router.add_post(self.webhook_path, self.handle_webhook)
+        return app
+
+    async def start(self, host: str = '0.0.0.0', port: int = 8080):
+        """Запуск сервера"""
+        self._runner = web.AppRunner(self.build_app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        logger.info(f"🌐 HTTP-сервер запущен на порту {port}")
+
+    async def stop(self):
+        """Остановка сервера"""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def handle_index(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            "status": "running",
+            "message": "FloodBot работает!",
+            "timestamp": datetime.now().isoformat()
+        })
+
+    async def handle_health(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            "status": "healthy",
+            "bot_running": self.application.running,
+            "timestamp": datetime.now().isoformat()
+        })
+
+    async def handle_status(self, request: web.Request) -> web.Response:
+        status = {
+            "running": self.application.running,
+            "started_at": self.started_at,
+            "mode": "webhook" if self.webhook_path else "polling",
+            "updates_received": self.updates_received,
+            "updates_rejected": self.updates_rejected,
+            "last_update_at": self.last_update_at,
+        }
+        if self.status_provider is not None:
+            status.update(self.status_provider())
+        return web.json_response(status)
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        # Значения метрик уже в памяти, выдача не обращается к базе и сети
+        return web.Response(body=self.metrics_provider().encode(),
+                            headers={'Content-Type': METRICS_CONTENT_TYPE})
+
+    async def handle_webhook(self, request: web.Request) -> web.Response:
+        """Приём обновления от Telegram с проверкой секретного токена"""
+        if self.secret_token:
+            received = request.headers.get(SECRET_TOKEN_HEADER, '')
+            if not hmac.compare_digest(received.encode(), self.secret_token.encode()):
+                self.updates_rejected += 1
+                logger.warning(f"⚠️ Webhook: неверный секретный токен от {request.remote}")
+                return web.Response(status=403)
+
+        try:
+            data = await request.json()
+            if not isinstance(data, dict):
+                raise ValueError(f"ожидался объект, получено {type(data).__name__}")
+            update = Update.de_json(data, self.application.bot)
+        except (json.JSONDecodeError, ValueError, TypeError, KeyError) as e:
+            self.updates_rejected += 1
+            logger.warning(f"⚠️ Webhook: некорректное обновление: {e}")
+            return web.Response(status=400)
+
+        self.updates_received += 1
+        self.last_update_at = time.time()
+        await self.application.update_queue.put(update)
+        return web.Response()